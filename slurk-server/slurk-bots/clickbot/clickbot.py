@@ -67,6 +67,11 @@ class ClickBot:
             response.raise_for_status()
 
     def register_callbacks(self):
+        @self.sio.event
+        def connect():
+            # only subscribed bots receive `new_task_room`
+            self.sio.emit("subscribe_task", {"task": self.task_id})
+
         @self.sio.event
         def new_task_room(data):
             room_id = data["room"]
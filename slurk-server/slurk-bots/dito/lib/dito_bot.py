@@ -119,6 +119,11 @@ class DiToBot:
         self.sio.wait()
 
     def register_callbacks(self):
+        @self.sio.event
+        def connect():
+            # only subscribed bots receive `new_task_room`
+            self.sio.emit("subscribe_task", {"task": self.task_id})
+
         @self.sio.event
         def new_task_room(data):
             """Triggered after a new task room is created.
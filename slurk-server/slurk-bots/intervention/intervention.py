@@ -50,6 +50,11 @@ class InterventionBot:
         def joined_room(data):
             self.user = data["user"]
 
+        @self.sio.event
+        def connect():
+            # only subscribed bots receive `new_task_room`
+            self.sio.emit("subscribe_task", {"task": self.task_id})
+
         @self.sio.event
         def new_task_room(data):
             room_id = data["room"]
@@ -52,6 +52,11 @@ class MathBot:
         LOG.debug("Sent message successfully.")
 
     def register_callbacks(self):
+        @self.sio.event
+        def connect():
+            # only subscribed bots receive `new_task_room`
+            self.sio.emit("subscribe_task", {"task": self.task_id})
+
         @self.sio.event
         def new_task_room(data):
             """Join the room when the task matches the ID."""
@@ -5,6 +5,7 @@ import argparse
 import csv
 import json
 import logging
+import os
 import sys
 
 from openpyxl import Workbook
@@ -13,12 +14,44 @@ import query_api_lib as qal
 
 
 class CachingLogProcessor(object):
-    def __init__(self):
+    def __init__(self, log_cache: Optional[str] = None):
         self.tokens_tasks: Dict[str, str] = {}
         self.tokens_user_ids = defaultdict(set)
         # Keys are user_ids
         # Values are dicts with keys: rooms, name
         self.participants: Dict[str, Dict[str, str]] = defaultdict(dict)
+        # Logs are append-only, so a local copy only needs the logs after the newest cached one
+        self.log_cache = log_cache
+        self.logs = []
+        self.high_water_mark = 0
+        self.logs_synced = False
+        if log_cache is not None and os.path.exists(log_cache):
+            with open(log_cache, 'r') as log_cache_file:
+                cached = json.load(log_cache_file)
+            self.logs = cached['logs']
+            self.high_water_mark = cached['high_water_mark']
+
+    def sync_logs(self):
+        new_logs, self.high_water_mark = qal.query_api_since('logs', self.high_water_mark)
+        logging.info(f"Fetched {len(new_logs)} new log entries")
+        self.logs.extend(new_logs)
+        self.logs_synced = True
+        if self.log_cache is not None:
+            with open(self.log_cache, 'w') as log_cache_file:
+                json.dump({'high_water_mark': self.high_water_mark, 'logs': self.logs}, log_cache_file)
+
+    def get_logs(self, **filters):
+        if self.log_cache is None:
+            return qal.query_api_all('logs', params=filters)
+        if not self.logs_synced:
+            self.sync_logs()
+        return [log for log in self.logs if all(log[key] == value for key, value in filters.items())]
+
+    def get_room_message_events(self, room_id):
+        if self.log_cache is None:
+            return get_room_message_events(room_id)
+        # cached logs are stored in the order they were created
+        return [event for event in self.get_logs(room_id=room_id) if 'message' in event['event']]
 
     def get_username(self, user_id):
         if user_id in self.participants:
@@ -30,12 +63,12 @@ class CachingLogProcessor(object):
 
     def get_user_ids(self, token):
         if token not in self.tokens_user_ids:
-            users = qal.query_api(f"users", params={"token_id": token})
+            users = qal.query_api_all("users", params={"token_id": token})
             self.tokens_user_ids[token] = set([user['id'] for user in users])
         return self.tokens_user_ids[token]
 
     def get_participant_tasks(self, participant_tokens):
-        server_tokens = qal.query_api('tokens')
+        server_tokens = qal.query_api_all('tokens')
         # Select only those entries corresponding to participants
         matched_data = []
         for x in server_tokens:
@@ -76,7 +109,7 @@ class CachingLogProcessor(object):
         wb = Workbook()
         ws = wb.active
         ws.append(["date_created", "sender_name", "receiver_name", "message", "editor_comments"])
-        message_events = get_room_message_events(room_id)
+        message_events = self.get_room_message_events(room_id)
         for message_event in message_events:
             ws.append(self.extract_message_data_from_log_event(message_event))
         wb.save(filepath)
@@ -100,9 +133,9 @@ def read_participant_tokens_csv(filename):
 
 
 def get_room_message_events(room_id):
-    log_events = qal.query_api(f"logs", params={'room_id': room_id})
-    return sorted([event for event in log_events if 'message' in event['event']],
-                  key=lambda x: x['date_created'])
+    # the export endpoint already returns the logs in chronological order
+    log_events = qal.stream_api("logs/export", params={'room_id': room_id})
+    return [event for event in log_events if 'message' in event['event']]
 
 
 argument_parser = argparse.ArgumentParser(description=__doc__)
@@ -112,6 +145,8 @@ argument_parser.add_argument("--output", type=str, default=None,
                              help="pattern for filenames incl. dirs; default, print logs to stdout")
 argument_parser.add_argument("--debug_level", type=str, default=logging.CRITICAL,
                              help="python logging level to use")
+argument_parser.add_argument("--log_cache", type=str, default=None,
+                             help="a file to keep a local copy of the logs in, only newer logs are fetched")
 argument_parser.add_argument("--nochat_ids", type=str, default="",
                              help="comma separated list of room_ids which we already know do not contain chat info")
 subparsers = argument_parser.add_subparsers()
@@ -124,7 +159,7 @@ parsers_file.add_argument("tokens_file", type=str)
 
 def logs_from_logfile(logfile: Optional[str]):
     if args.logfile is None:
-        logs = qal.query_api('logs')
+        logs = qal.query_api_all('logs')
     elif args.logfile == "-":
         logs = json.loads(sys.stdin)
     else:
@@ -153,7 +188,7 @@ if __name__ == "__main__":
     else:
         nochat_ids = set()
 
-    log_processor = CachingLogProcessor()
+    log_processor = CachingLogProcessor(args.log_cache)
 
     for token_pair in token_pairs:
         logging.debug(token_pair)
@@ -162,7 +197,7 @@ if __name__ == "__main__":
 
         room_ids = set()
         for token_id in token_ids:
-            logs = qal.query_api('logs', params={"user_id": token_id})
+            logs = log_processor.get_logs(user_id=token_id)
 
             for log_event in logs:
                 if log_event['user_id'] in token_ids:
@@ -178,7 +213,7 @@ if __name__ == "__main__":
         if args.output is None:
             for room_id in room_ids:
                 print(f"Message logs for {room_id}")
-                for event in get_room_message_events(room_id):
+                for event in log_processor.get_room_message_events(room_id):
                     print("\t".join(log_processor.extract_message_data_from_log_event(event)))
         else:
             for room_id in room_ids:
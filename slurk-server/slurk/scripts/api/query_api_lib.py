@@ -40,5 +40,46 @@ def query_api(endpoint, params=None, data_json=None):
     return api_call("GET", endpoint, params, data_json)
 
 
+def query_api_all(endpoint, params=None):
+    """Query every page of a list endpoint by following the `Link` headers."""
+    url = API_URL + f"/{endpoint}"
+    entries = []
+    while url is not None:
+        response = requests.get(url, headers=DEFAULT_HEADERS, params=params)
+        entries.extend(check_response(response.json()))
+        # the next link already contains all query parameters
+        params = None
+        url = response.links.get("next", {}).get("url")
+    return entries
+
+
+def query_api_since(endpoint, since_id=0, params=None):
+    """Query all entries newer than `since_id` and the new high-water mark to continue from."""
+    url = API_URL + f"/{endpoint}"
+    params = dict(params or {}, since_id=since_id)
+    entries = []
+    high_water_mark = since_id
+    while url is not None:
+        response = requests.get(url, headers=DEFAULT_HEADERS, params=params)
+        entries.extend(check_response(response.json()))
+        high_water_mark = int(response.headers["X-High-Water-Mark"])
+        # the next link already contains all query parameters
+        params = None
+        url = response.links.get("next", {}).get("url")
+    return entries, high_water_mark
+
+
+def stream_api(endpoint, params=None):
+    """Iterate over the entries of an endpoint returning newline delimited JSON."""
+    with requests.get(API_URL + f"/{endpoint}",
+                      headers=DEFAULT_HEADERS,
+                      params=params,
+                      stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
 def submit_api(endpoint, params=None, data_json=None):
     return api_call("POST", endpoint, params, data_json)
@@ -0,0 +1,28 @@
+#!/usr/bin/env bash
+set -eu
+
+# Parameters:
+#   scripts/archive_logs.sh [days]
+# Environment variables:
+#   SLURK_TOKEN: Token to pass as authorization, defaults to `00000000-0000-0000-0000-000000000000`
+#   SLURK_HOST: Host name to use for the request, defaults to `http://localhost`
+#   SLURK_PORT: Port to use for the request, defaults to 5000
+
+TOKEN=${SLURK_TOKEN:=00000000-0000-0000-0000-000000000000}
+HOST=${SLURK_HOST:-http://localhost}
+PORT=${SLURK_PORT:-5000}
+PREFIX=${SLURK_PREFIX:-/chat}
+
+if [ "$#" -ge 1 ]; then
+  DATA="{\"days\": $1}"
+else
+  DATA="{}"
+fi
+
+response=$(curl -sX POST \
+    -H "Authorization: Bearer $TOKEN" \
+    -H "Content-Type: application/json" \
+    -H "Accept: application/json" \
+    -d "$DATA" \
+    $HOST:$PORT$PREFIX/slurk/api/logs/archive)
+echo "$response"
@@ -6,7 +6,10 @@ from werkzeug.middleware.dispatcher import DispatcherMiddleware
 from slurk.extensions import api as api_ext
 from slurk.extensions import database as database_ext
 from slurk.extensions import events as event_ext
+from slurk.extensions import log_archive as log_archive_ext
+from slurk.extensions import log_writer as log_writer_ext
 from slurk.extensions import login as login_ext
+from slurk.extensions import metrics as metrics_ext
 from slurk.extensions import openvidu as openvidu_ext
 from slurk.models import Token
 
@@ -47,6 +50,9 @@ def create_app(test_config=None, engine=None):
         openvidu_ext.init_app(slurk_app)  # NOQA
         api_ext.init_app(slurk_app)
         database_ext.init_app(slurk_app, engine)
+        log_writer_ext.init_app(slurk_app)
+        log_archive_ext.init_app(slurk_app)
+        metrics_ext.init_app(slurk_app)
 
         if slurk_app.config["DEBUG"]:
             admin_token = "00000000-0000-0000-0000-000000000000"
@@ -1,3 +1,4 @@
+import json
 import os
 import random
 import string
@@ -21,8 +22,89 @@ SECRET_KEY = os.environ.get(
 )
 DATABASE = os.environ.get("SLURK_DATABASE_URI", "sqlite:///:memory:")
 
+# Connection pool of databases like PostgreSQL. Under gevent every greenlet handling an
+# event may hold a connection, so the pool should match the expected concurrency
+DB_POOL_SIZE = int(os.environ.get("SLURK_DB_POOL_SIZE", default="10"))
+DB_MAX_OVERFLOW = int(os.environ.get("SLURK_DB_MAX_OVERFLOW", default="20"))
+# Seconds to wait for a connection before failing
+DB_POOL_TIMEOUT = float(os.environ.get("SLURK_DB_POOL_TIMEOUT", default="30"))
+# Seconds after which connections are replaced, -1 keeps them open
+DB_POOL_RECYCLE = int(os.environ.get("SLURK_DB_POOL_RECYCLE", default="1800"))
+# Test connections before using them, costs one query per checkout
+DB_POOL_PRE_PING = environ_as_boolean("SLURK_DB_POOL_PRE_PING", False)
+# Seconds after which a query is cancelled, only supported by PostgreSQL
+DB_STATEMENT_TIMEOUT = float(os.environ.get("SLURK_DB_STATEMENT_TIMEOUT", default="0"))
+# Let psycopg2 yield to other greenlets while waiting for PostgreSQL under gevent
+DB_COOPERATIVE = environ_as_boolean("SLURK_DB_COOPERATIVE", True)
+
+# Durability of chat logs: `sync`, `group`, `async`, or `spool`
+LOG_DURABILITY = os.environ.get("SLURK_LOG_DURABILITY", "sync")
+LOG_FLUSH_SIZE = int(os.environ.get("SLURK_LOG_FLUSH_SIZE", default="100"))
+LOG_FLUSH_INTERVAL = float(os.environ.get("SLURK_LOG_FLUSH_INTERVAL", default="0.5"))
+# Spool file for the `spool` durability, undrained entries are replayed on startup.
+# Every worker process needs a file of its own
+LOG_SPOOL_PATH = os.environ.get("SLURK_LOG_SPOOL_PATH")
+LOG_SPOOL_SIZE = int(
+    os.environ.get("SLURK_LOG_SPOOL_SIZE", default=str(64 * 1024 * 1024))
+)
+
+# Seconds for which new logs are held back from `since_id` listings, so logs committed
+# late by concurrent transactions are not skipped
+LOG_SYNC_WINDOW = float(os.environ.get("SLURK_LOG_SYNC_WINDOW", default="2"))
+
+# Directory for logs of cold rooms, archiving is disabled if not set
+LOG_ARCHIVE_PATH = os.environ.get("SLURK_LOG_ARCHIVE_PATH")
+LOG_ARCHIVE_AFTER_DAYS = int(
+    os.environ.get("SLURK_LOG_ARCHIVE_AFTER_DAYS", default="30")
+)
+
+# Seconds after which users, who stopped sending keypresses, are no longer typing
+TYPING_TIMEOUT = float(os.environ.get("SLURK_TYPING_TIMEOUT", default="5"))
+
+# Maximum number of live typing updates per second and user, and the number of updates
+# after which the full text is sent again
+TYPED_MESSAGE_RATE = float(os.environ.get("SLURK_TYPED_MESSAGE_RATE", default="10"))
+TYPED_MESSAGE_SNAPSHOT_INTERVAL = int(
+    os.environ.get("SLURK_TYPED_MESSAGE_SNAPSHOT_INTERVAL", default="20")
+)
+
+# Message queue shared by all workers, either `redis://host:port/db` or, for workers on
+# a single host, `local:///path/to/directory`. Only one worker is supported if not set
+MESSAGE_QUEUE = os.environ.get("SLURK_MESSAGE_QUEUE")
+MESSAGE_QUEUE_CHANNEL = os.environ.get("SLURK_MESSAGE_QUEUE_CHANNEL", "slurk")
+
+# Packets waiting to be sent to a client, after which droppable events like `mouse` are
+# held back, and after which the client is disconnected
+OUTBOUND_DROPPABLE_BACKLOG = int(
+    os.environ.get("SLURK_OUTBOUND_DROPPABLE_BACKLOG", default="32")
+)
+OUTBOUND_QUEUE_SIZE = int(os.environ.get("SLURK_OUTBOUND_QUEUE_SIZE", default="1000"))
+
+# Token bucket per user and event: at most `burst` events at once, refilled with
+# `rate_limit` events per second. Passed as JSON, which is merged into the defaults
+RATE_LIMITS = {
+    "text": {"rate_limit": 10, "burst": 50},
+    "image": {"rate_limit": 10, "burst": 50},
+    "command": {"rate_limit": 10, "burst": 50},
+    "bounding_box": {"rate_limit": 20, "burst": 100},
+    "mouse": {"rate_limit": 60, "burst": 120},
+    "keypress": {"rate_limit": 30, "burst": 60},
+    "typed_message": {"rate_limit": 30, "burst": 60},
+}
+RATE_LIMITS.update(json.loads(os.environ.get("SLURK_RATE_LIMITS", "{}")))
+
+# Record the duration of event handlers and requests and serve them at `/metrics`
+METRICS = environ_as_boolean("SLURK_METRICS", False)
+
+# Seconds for which the permissions of an API token are cached, 0 disables the cache
+TOKEN_CACHE_TTL = float(os.environ.get("SLURK_TOKEN_CACHE_TTL", default="60"))
+
 ETAG_DISABLED = environ_as_boolean("SLURK_DISABLE_ETAG", False)
 
+# Number of entities returned by list endpoints, if no `limit` is passed
+API_PAGE_SIZE = int(os.environ.get("SLURK_API_PAGE_SIZE", default="1000"))
+API_MAX_PAGE_SIZE = int(os.environ.get("SLURK_API_MAX_PAGE_SIZE", default="10000"))
+
 if "SLURK_OPENVIDU_URL" in os.environ:
     OPENVIDU_URL = os.environ["SLURK_OPENVIDU_URL"]
     OPENVIDU_SECRET = os.environ.get("SLURK_OPENVIDU_SECRET")
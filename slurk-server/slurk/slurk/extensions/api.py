@@ -120,12 +120,13 @@ class Blueprint(flask_smorest.Blueprint):
             rule = rule[:-1]
         return super().route(rule, parameters=parameters, **options)
 
-    def query(self, parameter, schema, check_etag=True):
+    def query(self, parameter, schema, check_etag=True, profile=None):
         """
         Used as decorator for getting an entity by id.
 
         Searches for "`parameter`_id" and passes the entity as "`parameter`" to the
-        decorated function.
+        decorated function. The relationships of a loader `profile` from
+        `slurk.models.loading` are loaded with the entity.
         """
         cls = schema.Meta.model
 
@@ -136,7 +137,10 @@ class Blueprint(flask_smorest.Blueprint):
                 id = kwargs.pop(parameter_id)
                 if isinstance(id, UUID):
                     id = str(id)
-                entry = current_app.session.query(cls).get(id)
+                query = current_app.session.query(cls)
+                if profile is not None:
+                    query = query.options(*profile())
+                entry = query.get(id)
                 if not entry:
                     abort(
                         NotFound,
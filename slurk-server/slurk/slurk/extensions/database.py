@@ -1,16 +1,83 @@
+import time
+
 from sqlalchemy import event, engine
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import QueuePool
 
 Base = declarative_base()
 
 
+class TimedQueuePool(QueuePool):
+    """Queue pool reporting how long checking out a connection took to `metrics`"""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kwargs):
+        super().__init__(
+            creator, pool_size=pool_size, max_overflow=max_overflow, **kwargs
+        )
+        self.max_overflow = max_overflow
+
+    def _do_get(self):
+        from slurk.extensions.metrics import metrics
+
+        if not metrics.enabled:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.observe_pool_wait(time.perf_counter() - start)
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """Waits for a psycopg2 connection by yielding to other greenlets
+
+    Installed with `psycopg2.extensions.set_wait_callback`, so queries do not block
+    the event loop of gevent."""
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import OperationalError, extensions
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def make_cooperative(url):
+    """Lets the driver of `url` yield to other greenlets while waiting for the database
+
+    Returns whether a wait callback was installed. Only needed if gevent patched the
+    standard library, which the gevent workers of Gunicorn do. Drivers written in pure
+    Python, like pg8000, are cooperative without it."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    if not monkey.is_module_patched("socket"):
+        return False
+
+    url = engine.url.make_url(url)
+    if url.get_backend_name() == "postgresql" and url.get_driver_name() == "psycopg2":
+        from psycopg2 import extensions
+
+        extensions.set_wait_callback(gevent_wait_callback)
+        return True
+    return False
+
+
 class Database:
     _engine = None
     _session = sessionmaker()
     _connect_args = {}
     _poolclass = None
+    _pool_args = {}
 
     def __init__(self, app=None, engine=None):
         if engine:
@@ -34,6 +101,31 @@ class Database:
             self._connect_args = {"check_same_thread": False}
             self._poolclass = StaticPool
 
+    def apply_pool_config(self, url, config):
+        """Configures the connection pool of a database without a special pool"""
+        url = engine.url.make_url(url)
+        if self._poolclass is not None:
+            return
+
+        self._pool_args = dict(
+            pool_pre_ping=config.get("DB_POOL_PRE_PING", False),
+            pool_recycle=config.get("DB_POOL_RECYCLE", -1),
+        )
+        if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+            self._poolclass = TimedQueuePool
+            self._pool_args.update(
+                pool_size=config.get("DB_POOL_SIZE", 5),
+                max_overflow=config.get("DB_MAX_OVERFLOW", 10),
+                pool_timeout=config.get("DB_POOL_TIMEOUT", 30),
+            )
+
+        statement_timeout = config.get("DB_STATEMENT_TIMEOUT")
+        if statement_timeout and url.get_backend_name() == "postgresql":
+            self._connect_args = dict(
+                self._connect_args,
+                options=f"-c statement_timeout={int(statement_timeout * 1000)}",
+            )
+
     def bind(self, engine):
         self._engine = engine
         self._session.configure(bind=engine)
@@ -51,6 +143,33 @@ class Database:
 
     def init(self):
         Base.metadata.create_all(bind=self.engine)
+        # `create_all` skips existing tables, so columns and indexes added later are
+        # created here
+        self._add_missing_columns()
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+
+    def _add_missing_columns(self):
+        """Adds nullable columns, which are missing in existing tables
+
+        Other changes of the schema have to be migrated by hand, see the deployment
+        documentation."""
+        from sqlalchemy import inspect
+
+        inspector = inspect(self.engine)
+        preparer = self.engine.dialect.identifier_preparer
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing = {c["name"] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing or not column.nullable:
+                        continue
+                    type = column.type.compile(dialect=self.engine.dialect)
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {preparer.format_column(column)} {type}"
+                    )
 
     def clear(self):
         Base.metadata.drop_all(bind=self.engine)
@@ -62,12 +181,16 @@ class Database:
 
         if not self.engine:
             self.apply_driver_hacks(current_app.config["DATABASE"])
+            self.apply_pool_config(current_app.config["DATABASE"], current_app.config)
+            if current_app.config.get("DB_COOPERATIVE", True):
+                make_cooperative(current_app.config["DATABASE"])
 
             self.bind(
                 engine=create_engine(
                     current_app.config["DATABASE"],
                     connect_args=self._connect_args,
                     poolclass=self._poolclass,
+                    **self._pool_args,
                 )
             )
 
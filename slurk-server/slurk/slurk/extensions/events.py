@@ -1,7 +1,17 @@
 from flask_socketio import SocketIO
 
+from slurk.extensions.message_queue import client_manager
+from slurk.extensions.outbound import outbound_queues
+
 socketio = SocketIO(ping_interval=5, ping_timeout=120)
 
 
 def init_app(app):
-    socketio.init_app(app)
+    socketio.init_app(
+        app,
+        client_manager=client_manager(
+            app.config.get("MESSAGE_QUEUE"),
+            channel=app.config.get("MESSAGE_QUEUE_CHANNEL", "slurk"),
+        ),
+    )
+    outbound_queues.init_app(app, socketio.server)
@@ -0,0 +1,346 @@
+import gzip
+import heapq
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+from itertools import chain
+from threading import Lock
+
+INDEX_FILE = "index.json"
+# Number of compressed bytes read from a segment at once
+READ_CHUNK_SIZE = 64 * 1024
+# Number of archived logs deleted per statement, below the parameter limit of SQLite
+DELETE_CHUNK_SIZE = 500
+# Number of logs loaded from the database at once while archiving
+ARCHIVE_CHUNK_SIZE = 1000
+
+
+def log_to_row(log):
+    return dict(
+        id=log.id,
+        date_created=log.date_created.isoformat(),
+        date_modified=log.date_modified.isoformat() if log.date_modified else None,
+        event=log.event,
+        user_id=log.user_id,
+        room_id=log.room_id,
+        receiver_id=log.receiver_id,
+        data=log.data,
+    )
+
+
+def row_to_entry(row):
+    entry = dict(row)
+    entry["date_created"] = datetime.fromisoformat(row["date_created"])
+    if row["date_modified"] is not None:
+        entry["date_modified"] = datetime.fromisoformat(row["date_modified"])
+    return entry
+
+
+class LogArchive:
+    """Moves logs of cold rooms from the database into compressed segment files
+
+    Every archived room has one append-only segment of gzip compressed, newline
+    delimited JSON. Each archival run appends a new gzip member. The index stores the
+    number of valid bytes, the offsets of the members, and the ID and creation time of
+    the last archived log of every segment. Logs are
+    deleted from the database only after the index has been replaced, so an interrupted
+    run leaves at most an unindexed tail, which is truncated by the next run.
+
+    Exactly the archived logs are deleted. Their IDs are kept in the index as `pending`
+    until they are deleted, so logs of an interrupted run are deleted by the next run,
+    while logs committed late with a lower ID are archived by it.
+
+    Runs are started in the background by `start`. The logs of a room are streamed
+    into the segment, and the index is only locked while it is replaced."""
+
+    def __init__(self, app=None):
+        self.path = None
+        self.after_days = 30
+        self._index = {}
+        self._index_mtime = None
+        # Guards the index file and the status
+        self._lock = Lock()
+        # Held during a run, so runs do not overlap
+        self._running = Lock()
+        self._status = dict(
+            running=False, date_started=None, date_finished=None, rooms=[], error=None
+        )
+        if app:
+            self.init_app(app)
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def init_app(self, app):
+        self.path = app.config.get("LOG_ARCHIVE_PATH")
+        self.after_days = app.config.get("LOG_ARCHIVE_AFTER_DAYS", 30)
+        self._index = {}
+        self._index_mtime = None
+        if self.path is not None:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _segment_path(self, room_id):
+        return os.path.join(self.path, f"room-{room_id}.ndjson.gz")
+
+    def index(self):
+        """Returns the index of archived rooms, reloaded if it was changed on disk"""
+        index_path = os.path.join(self.path, INDEX_FILE)
+        try:
+            mtime = os.stat(index_path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._index_mtime:
+            with open(index_path) as index_file:
+                self._index = {
+                    int(room_id): segment
+                    for room_id, segment in json.load(index_file).items()
+                }
+            self._index_mtime = mtime
+        return self._index
+
+    def _update_index(self, room_id, segment):
+        """Replaces the index entry of a room or, if `segment` is None, removes it"""
+        with self._lock:
+            index = dict(self.index())
+            if segment is None:
+                index.pop(room_id, None)
+            else:
+                index[room_id] = segment
+            self._write_index(index)
+
+    def _write_index(self, index):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        with open(f"{index_path}.tmp", "w") as index_file:
+            json.dump(
+                {str(room_id): entry for room_id, entry in index.items()}, index_file
+            )
+            index_file.flush()
+            os.fsync(index_file.fileno())
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def is_archived(self, room_id):
+        return self.enabled and room_id in self.index()
+
+    def last_id(self, room_id):
+        """Returns the ID of the last archived log of a room"""
+        segment = self.index().get(room_id) if self.enabled else None
+        return segment["last_id"] if segment is not None else 0
+
+    def pending(self, room_id):
+        """Returns the IDs of archived logs, which may still be in the database"""
+        segment = self.index().get(room_id) if self.enabled else None
+        return segment.get("pending", []) if segment is not None else []
+
+    def last_date(self, room_id):
+        """Returns the creation time of the newest archived log of a room or None"""
+        segment = self.index().get(room_id) if self.enabled else None
+        if segment is None or segment.get("last_date") is None:
+            return None
+        return datetime.fromisoformat(segment["last_date"])
+
+    def read(self, room_id):
+        """Yields the archived logs of a room in chronological order
+
+        The logs of every member are in chronological order, so the members are read
+        side by side and merged. Only a chunk of every member is held in memory."""
+        segment = self.index().get(room_id) if self.enabled else None
+        if segment is None:
+            return iter(())
+        path = self._segment_path(room_id)
+        offsets = segment.get("members", [0]) + [segment["size"]]
+        return heapq.merge(
+            *(
+                self._read_member(path, start, end)
+                for start, end in zip(offsets, offsets[1:])
+            ),
+            key=lambda log: (log.date_created, log.id),
+        )
+
+    @staticmethod
+    def _read_member(path, start, end):
+        from slurk.models import Log
+
+        with open(path, "rb") as segment_file:
+            segment_file.seek(start)
+            remaining = end - start
+            decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            buffer = b""
+            while remaining > 0:
+                chunk = segment_file.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                # Segments written before the offsets were stored are read as one
+                # member, which continues with the next gzip member
+                while chunk:
+                    buffer += decompressor.decompress(chunk)
+                    if not decompressor.eof:
+                        break
+                    chunk = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+                *lines, buffer = buffer.split(b"\n")
+                # Archived logs are not added to a session, so they can be listed like
+                # live logs
+                for line in lines:
+                    yield Log(**row_to_entry(json.loads(line)))
+
+    def cold_rooms(self, session, days):
+        """Returns the IDs of rooms with logs, which are read only or had no activity for `days` days
+
+        Read only rooms are finished, so they are archived regardless of `days`."""
+        from sqlalchemy import func, or_
+
+        from slurk.models import Log, Room
+
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        query = (
+            session.query(Log.room_id)
+            .join(Room, Room.id == Log.room_id)
+            .group_by(Log.room_id, Room.read_only)
+            .having(or_(Room.read_only, func.max(Log.date_created) < cutoff))
+        )
+        return [room_id for room_id, in query]
+
+    def status(self):
+        """Returns the state and result of the last run started by `start`"""
+        with self._lock:
+            return dict(self._status)
+
+    def start(self, app, days=None):
+        """Archives the logs of all cold rooms in a background task
+
+        Returns False without starting a run, if one is still in progress."""
+        from slurk.extensions.events import socketio
+
+        with self._lock:
+            if self._status["running"]:
+                return False
+            self._status = dict(
+                running=True,
+                date_started=datetime.utcnow(),
+                date_finished=None,
+                rooms=[],
+                error=None,
+            )
+        socketio.start_background_task(self._run, app, days)
+        return True
+
+    def _run(self, app, days):
+        from slurk.extensions.database import db
+        from slurk.extensions.log_writer import log_writer
+
+        archived, error = {}, None
+        with app.app_context():
+            try:
+                # Buffered entries have to be written before they can be archived
+                if log_writer.buffered:
+                    log_writer.flush()
+                with db.create_session() as session:
+                    archived = self.archive(session, days)
+            except Exception as e:
+                app.logger.exception("Could not archive logs")
+                error = str(e)
+        with self._lock:
+            self._status = dict(
+                self._status,
+                running=False,
+                date_finished=datetime.utcnow(),
+                rooms=[
+                    dict(room_id=room_id, count=count)
+                    for room_id, count in archived.items()
+                ],
+                error=error,
+            )
+
+    def archive(self, session, days=None):
+        """Archives the logs of all cold rooms and returns the number of archived logs per room"""
+        if days is None:
+            days = self.after_days
+
+        archived = {}
+        with self._running:
+            for room_id in self.cold_rooms(session, days):
+                count = self._archive_room(session, room_id)
+                if count:
+                    archived[room_id] = count
+        return archived
+
+    def _archive_room(self, session, room_id):
+        from slurk.models import Log
+
+        segment = self.index().get(room_id, dict(size=0, count=0, last_id=0))
+        # Pending logs are already archived, if the previous run was interrupted before
+        # deleting them
+        if segment.get("pending"):
+            self._delete(session, segment["pending"])
+            segment = dict(segment, pending=[])
+            self._update_index(room_id, segment)
+
+        logs = iter(
+            session.query(Log)
+            .filter(Log.room_id == room_id)
+            .order_by(Log.date_created.asc(), Log.id.asc())
+            .yield_per(ARCHIVE_CHUNK_SIZE)
+        )
+        first = next(logs, None)
+        if first is None:
+            return 0
+
+        ids = []
+        last_date = first.date_created
+        with open(self._segment_path(room_id), "ab") as segment_file:
+            # Drop the tail of an interrupted run, it is still in the database
+            segment_file.truncate(segment["size"])
+            with gzip.GzipFile(fileobj=segment_file, mode="wb") as member:
+                for log in chain([first], logs):
+                    member.write((json.dumps(log_to_row(log)) + "\n").encode())
+                    ids.append(log.id)
+                    last_date = max(last_date, log.date_created)
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+            size = segment_file.tell()
+
+        if segment.get("last_date") is not None:
+            last_date = max(last_date, datetime.fromisoformat(segment["last_date"]))
+        segment = dict(
+            size=size,
+            members=segment.get("members", [0] if segment["size"] else [])
+            + [segment["size"]],
+            count=segment["count"] + len(ids),
+            last_id=max(segment["last_id"], *ids),
+            last_date=last_date.isoformat(),
+            date_archived=datetime.utcnow().isoformat(),
+            pending=ids,
+        )
+        self._update_index(room_id, segment)
+
+        self._delete(session, ids)
+        self._update_index(room_id, dict(segment, pending=[]))
+        return len(ids)
+
+    @staticmethod
+    def _delete(session, ids):
+        from slurk.models import Log
+
+        for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+            chunk = ids[start : start + DELETE_CHUNK_SIZE]
+            session.query(Log).filter(Log.id.in_(chunk)).delete(
+                synchronize_session=False
+            )
+        session.commit()
+
+    def remove(self, room_id):
+        """Deletes the archived logs of a room"""
+        if not self.is_archived(room_id):
+            return
+        self._update_index(room_id, None)
+        os.remove(self._segment_path(room_id))
+
+
+log_archive = LogArchive()
+
+
+def init_app(app):
+    log_archive.init_app(app)
@@ -0,0 +1,138 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+from datetime import datetime
+
+# Offsets of the next record to write and of the next record to drain
+HEADER = struct.Struct("<QQ")
+# Length of the serialized row
+RECORD = struct.Struct("<I")
+
+
+def encode(row):
+    row = dict(row, date_created=row["date_created"].isoformat())
+    return json.dumps(row).encode()
+
+
+def decode(record):
+    row = json.loads(record)
+    row["date_created"] = datetime.fromisoformat(row["date_created"])
+    return row
+
+
+class LogSpool:
+    """Write-ahead spool of log rows in a memory-mapped file
+
+    Rows are appended behind the head offset, which is only advanced after the row has
+    been written completely, and drained from the tail offset after they have been
+    committed to the database. Both offsets are stored in the header of the file, so
+    rows which have not been drained when the process stops are replayed on the next
+    start. Once all rows are drained, the spool starts over at the beginning.
+
+    Rows which can never be written, e.g. because their room was deleted, are moved to
+    the dead letter file `<path>.rejected`. The spool is locked, so every process needs
+    a file of its own."""
+
+    def __init__(self, path, size):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ValueError(
+                    f"Log spool `{path}` is used by another process. Pass a separate file per worker as `SLURK_LOG_SPOOL_PATH`."
+                ) from None
+            size = max(size, os.fstat(fd).st_size)
+            os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        # The lock is held until the spool is closed
+        self._fd = fd
+        self._draining = False
+
+        head, tail = HEADER.unpack_from(self._mmap, 0)
+        if head == 0:
+            self._set_offsets(HEADER.size, HEADER.size)
+
+    @property
+    def size(self):
+        return len(self._mmap)
+
+    def _offsets(self):
+        return HEADER.unpack_from(self._mmap, 0)
+
+    def _set_offsets(self, head, tail):
+        HEADER.pack_into(self._mmap, 0, head, tail)
+
+    def __len__(self):
+        """Number of bytes waiting to be drained"""
+        head, tail = self._offsets()
+        return head - tail
+
+    def append(self, row):
+        """Appends a row and returns whether it fit into the spool"""
+        record = encode(row)
+        head, tail = self._offsets()
+        end = head + RECORD.size + len(record)
+        if end > self.size and not self._draining and tail > HEADER.size:
+            # Move pending rows to the beginning to make room
+            self._mmap.move(HEADER.size, tail, head - tail)
+            head, tail = HEADER.size + head - tail, HEADER.size
+            self._set_offsets(head, tail)
+            end = head + RECORD.size + len(record)
+        if end > self.size:
+            return False
+
+        RECORD.pack_into(self._mmap, head, len(record))
+        self._mmap[head + RECORD.size : end] = record
+        self._set_offsets(end, tail)
+        return True
+
+    def pending(self):
+        """Returns all rows which are not drained yet and the offset after each of them
+
+        Until `drained` is called, the rows are not moved."""
+        head, offset = self._offsets()
+        rows = []
+        offsets = []
+        while offset < head:
+            (length,) = RECORD.unpack_from(self._mmap, offset)
+            offset += RECORD.size
+            rows.append(decode(self._mmap[offset : offset + length]))
+            offset += length
+            offsets.append(offset)
+        self._draining = True
+        return rows, offsets
+
+    def reject(self, rows):
+        """Appends (row, error) pairs, which can never be written, to the dead letter file"""
+        with open(f"{self.path}.rejected", "ab") as rejected_file:
+            for row, error in rows:
+                rejected_file.write(encode(dict(row, error=str(error))) + b"\n")
+            rejected_file.flush()
+            os.fsync(rejected_file.fileno())
+
+    def drained(self, offset=None):
+        """Marks the rows up to `offset` as written to the database
+
+        If `offset` is None, the rows returned by `pending` could not be written and
+        are kept."""
+        self._draining = False
+        if offset is None:
+            return
+        head, _ = self._offsets()
+        if offset == head:
+            self._set_offsets(HEADER.size, HEADER.size)
+        else:
+            self._set_offsets(head, offset)
+        self._mmap.flush()
+
+    def close(self):
+        self._mmap.flush()
+        self._mmap.close()
+        os.close(self._fd)
@@ -0,0 +1,238 @@
+import atexit
+from datetime import datetime
+from threading import Event, Lock
+
+DURABILITY_MODES = ("sync", "group", "async", "spool")
+
+
+class _Batch:
+    def __init__(self):
+        self.rows = []
+        self.done = Event()
+        # id of a row -> error, for rows which could not be written
+        self.errors = {}
+
+
+class LogWriter:
+    """Buffers log rows and writes them to the database in bulk
+
+    The durability mode decides how long `write` waits:
+
+    - ``sync``: every row is committed on its own before returning
+    - ``group``: rows are collected and committed together, the caller waits
+      until the batch containing its row has been committed
+    - ``async``: rows are queued and the caller returns immediately
+    - ``spool``: rows are appended to a memory-mapped spool file and the caller
+      returns immediately. The spool is drained into the database in the background
+      and rows left in the spool are replayed on startup. If the spool is full,
+      rows are written like in ``group`` mode
+
+    Batches are flushed as soon as `flush_size` rows are queued or after
+    `flush_interval` seconds, whichever comes first."""
+
+    def __init__(self, app=None):
+        self.durability = "sync"
+        self.flush_size = 100
+        self.flush_interval = 0.5
+        self._batch = _Batch()
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._flusher = None
+        self._spool = None
+        self._spooled = 0
+        self._logger = None
+        self._registered = False
+        if app:
+            self.init_app(app)
+
+    @property
+    def buffered(self):
+        return self.durability != "sync"
+
+    def init_app(self, app):
+        durability = app.config.get("LOG_DURABILITY", "sync")
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Unknown log durability `{durability}`. Pass one of {', '.join(DURABILITY_MODES)} as `SLURK_LOG_DURABILITY`."
+            )
+        self.durability = durability
+        self.flush_size = app.config.get("LOG_FLUSH_SIZE", 100)
+        self.flush_interval = app.config.get("LOG_FLUSH_INTERVAL", 0.5)
+        self._logger = app.logger
+
+        spool_path = app.config.get("LOG_SPOOL_PATH")
+        if durability == "spool" and spool_path is None:
+            raise ValueError(
+                "Log spool is not configured. Pass the spool file as `SLURK_LOG_SPOOL_PATH`."
+            )
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        if spool_path is not None:
+            from slurk.extensions.log_spool import LogSpool
+
+            self._spool = LogSpool(
+                spool_path, app.config.get("LOG_SPOOL_SIZE", 64 * 1024 * 1024)
+            )
+            # Replay rows, which were not drained before the last shutdown
+            if len(self._spool) > 0:
+                self.flush()
+
+        if not self._registered:
+            atexit.register(self.flush)
+            self._registered = True
+
+    def write(self, event, user_id=None, room_id=None, receiver_id=None, data=None):
+        row = dict(
+            event=event,
+            user_id=user_id,
+            room_id=room_id,
+            receiver_id=receiver_id,
+            data=data if data is not None else {},
+            date_created=datetime.utcnow(),
+        )
+        with self._lock:
+            if self.durability == "spool" and self._spool.append(row):
+                batch = None
+                self._spooled += 1
+                full = self._spooled >= self.flush_size
+            else:
+                batch = self._batch
+                batch.rows.append(row)
+                full = len(batch.rows) >= self.flush_size
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+        if self.durability in ("group", "spool") and batch is not None:
+            batch.done.wait()
+            error = batch.errors.get(id(row))
+            if error is not None:
+                raise error
+
+    @staticmethod
+    def _insert(rows):
+        """Writes `rows` in a single transaction and returns the error of each row
+
+        If the transaction fails, the rows are written one by one, so a single invalid
+        row does not discard the others. The errors are None for rows which were
+        written. Errors other than integrity errors, like an unavailable database,
+        affect all rows, which are not tried further."""
+        from sqlalchemy.exc import IntegrityError
+
+        from slurk.extensions.database import db
+        from slurk.models import Log
+
+        def insert(rows):
+            with db.create_session() as session:
+                session.execute(Log.__table__.insert(), rows)
+                session.commit()
+
+        try:
+            insert(rows)
+            return [None] * len(rows)
+        except IntegrityError:
+            pass
+        except Exception as e:
+            return [e] * len(rows)
+
+        errors = []
+        for i, row in enumerate(rows):
+            try:
+                insert([row])
+                errors.append(None)
+            except IntegrityError as e:
+                errors.append(e)
+            except Exception as e:
+                errors.extend([e] * (len(rows) - i))
+                break
+        return errors
+
+    def flush(self):
+        """Write all queued rows, in a single transaction unless one of them is invalid
+
+        Spooled rows are drained up to the first one which could not be written for
+        another reason than being invalid. Invalid rows are moved to the dead letter
+        file of the spool, so they do not block the rows behind them."""
+        from sqlalchemy.exc import IntegrityError
+
+        from slurk.extensions.database import db
+
+        # Spooled rows are only released after they are written, so flushes must not overlap
+        with self._flush_lock:
+            with self._lock:
+                batch, self._batch = self._batch, _Batch()
+                spooled, offsets, offset = [], [], None
+                if self._spool is not None and len(self._spool) > 0:
+                    spooled, offsets = self._spool.pending()
+                    self._spooled = 0
+
+            rows = spooled + batch.rows
+            if rows and db.engine is not None:
+                errors = self._insert(rows)
+                for row, error in zip(batch.rows, errors[len(spooled) :]):
+                    if error is not None:
+                        batch.errors[id(row)] = error
+                # The remaining spooled rows are kept and written with the next flush
+                drained = next(
+                    (
+                        i
+                        for i, error in enumerate(errors[: len(spooled)])
+                        if error is not None and not isinstance(error, IntegrityError)
+                    ),
+                    len(spooled),
+                )
+                rejected = [
+                    (row, error)
+                    for row, error in zip(spooled[:drained], errors[:drained])
+                    if error is not None
+                ]
+                if rejected:
+                    self._spool.reject(rejected)
+                if drained > 0:
+                    offset = offsets[drained - 1]
+                self._log_errors(rows, errors)
+            if spooled:
+                with self._lock:
+                    self._spool.drained(offset)
+        batch.done.set()
+        return len(rows)
+
+    def _log_errors(self, rows, errors):
+        from sqlalchemy.exc import IntegrityError
+
+        if self._logger is None:
+            return
+        # Invalid rows are logged one by one, other errors apply to all remaining rows
+        unwritten = []
+        for row, error in zip(rows, errors):
+            if isinstance(error, IntegrityError):
+                self._logger.error(f"Could not write log entry {row}: {error}")
+            elif error is not None:
+                unwritten.append(error)
+        if unwritten:
+            self._logger.error(
+                f"Could not write {len(unwritten)} log entries: {unwritten[0]}"
+            )
+
+    def _ensure_flusher(self):
+        from slurk.extensions.events import socketio
+
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+log_writer = LogWriter()
+
+
+def init_app(app):
+    log_writer.init_app(app)
@@ -0,0 +1,141 @@
+import atexit
+import logging
+import os
+import socket
+from contextlib import suppress
+from urllib.parse import urlparse
+
+import socketio
+
+# Largest message the local queue can deliver, bigger ones need Redis
+LOCAL_MAX_MESSAGE_SIZE = 1024 * 1024
+
+_handlers = {}
+
+
+def on_message(name):
+    """Registers a function called with the data of every `name` message from other workers"""
+
+    def decorator(handler):
+        _handlers[name] = handler
+        return handler
+
+    return decorator
+
+
+def publish(name, data):
+    """Sends `data` to the handlers of `name` in all other workers
+
+    Does nothing if no message queue is configured."""
+    from slurk.extensions.events import socketio as socketio_ext
+
+    manager = getattr(socketio_ext.server, "manager", None)
+    if isinstance(manager, WorkerMessages):
+        manager.publish_message(name, data)
+
+
+class WorkerMessages:
+    """Adds messages between slurk workers to a Socket.IO client manager
+
+    The messages share the channel of the Socket.IO events, but are handled by the
+    functions registered with `on_message` instead."""
+
+    def publish_message(self, name, data):
+        self._publish(dict(method="slurk", name=name, data=data, host_id=self.host_id))
+
+    def _listen(self):
+        for message in super()._listen():
+            data = message
+            if not isinstance(data, dict):
+                try:
+                    data = self.json.loads(message)
+                except ValueError:
+                    yield message
+                    continue
+            if not isinstance(data, dict) or data.get("method") != "slurk":
+                yield data
+                continue
+            handler = _handlers.get(data.get("name"))
+            if data.get("host_id") == self.host_id or handler is None:
+                continue
+            try:
+                handler(data.get("data"))
+            except Exception:
+                logging.getLogger(__name__).exception(
+                    f'Handler error for worker message "{data.get("name")}"'
+                )
+
+
+class LocalManager(socketio.PubSubManager):
+    """Client manager sharing events between the workers on a single host
+
+    Every worker binds a Unix datagram socket in the directory of a ``local:///path``
+    URL and sends each message to the sockets of all other workers. It does not need
+    an additional service, but messages are limited to `LOCAL_MAX_MESSAGE_SIZE`."""
+
+    name = "local"
+
+    def __init__(
+        self, url, channel="socketio", write_only=False, logger=None, json=None
+    ):
+        super().__init__(
+            channel=channel, write_only=write_only, logger=logger, json=json
+        )
+        self.path = os.path.join(urlparse(url).path, channel)
+        os.makedirs(self.path, exist_ok=True)
+
+        self.address = None
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.socket.setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, LOCAL_MAX_MESSAGE_SIZE
+        )
+        if not write_only:
+            self.address = os.path.join(self.path, f"{self.host_id}.sock")
+            self.socket.bind(self.address)
+            atexit.register(self._unlink, self.address)
+
+    @staticmethod
+    def _unlink(address):
+        with suppress(FileNotFoundError):
+            os.remove(address)
+
+    def _publish(self, data):
+        message = self.json.dumps(data).encode()
+        for name in os.listdir(self.path):
+            address = os.path.join(self.path, name)
+            if address == self.address or not name.endswith(".sock"):
+                continue
+            try:
+                self.socket.sendto(message, address)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The worker has stopped without removing its socket
+                self._unlink(address)
+            except OSError:
+                self._get_logger().exception(
+                    f"Could not send {len(message)} bytes to {address}"
+                )
+
+    def _listen(self):
+        while True:
+            yield self.socket.recv(LOCAL_MAX_MESSAGE_SIZE)
+
+
+class LocalQueue(WorkerMessages, LocalManager):
+    pass
+
+
+class RedisQueue(WorkerMessages, socketio.RedisManager):
+    pass
+
+
+def client_manager(url, channel="slurk"):
+    """Returns the client manager for a message queue URL or None if `url` is not set"""
+    if not url:
+        return None
+    if url.startswith("local://"):
+        return LocalQueue(url, channel=channel)
+    if url.startswith(("redis://", "rediss://")):
+        return RedisQueue(url, channel=channel)
+    raise ValueError(
+        f'Unsupported message queue "{url}", use `redis://` or `local://` URLs'
+    )
@@ -0,0 +1,293 @@
+import json
+import time
+from bisect import bisect_left
+from threading import Lock, local
+
+from flask import Response, abort, request
+from flask_socketio import SocketIO
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+EMIT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Prometheus histogram with one series per combination of label values"""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket, sum]
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = [
+                (labels, list(counts), sum_)
+                for labels, (counts, sum_) in self._series.items()
+            ]
+        for labels, counts, sum_ in sorted(series):
+            labels = [
+                f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels)
+            ]
+            label = "{" + ",".join(labels) + "}" if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format(bound)
+                bucket = ",".join(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{bucket}}} {cumulative}")
+            lines.append(f"{self.name}_sum{label} {_format(sum_)}")
+            lines.append(f"{self.name}_count{label} {cumulative}")
+        return lines
+
+
+class _Measurement:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.emits = 0
+
+
+class Metrics:
+    """Records the time spent in Socket.IO event handlers and HTTP routes
+
+    For every event and route, histograms of the duration, the time spent waiting for
+    the database, the number of emitted events, and the size of the payload are
+    served in the Prometheus text format at ``/metrics``. Nothing is recorded and the
+    endpoint responds with 404 unless ``METRICS`` is set."""
+
+    def __init__(self):
+        self.enabled = False
+        self.pool_wait = Histogram(
+            "slurk_database_pool_wait_seconds",
+            "Time spent waiting for a database connection from the pool in seconds",
+            (),
+            DURATION_BUCKETS,
+        )
+        self._local = local()
+        self._apps = set()
+        self._socketio = None
+        self._server = None
+        self._emit = None
+
+        self.histograms = {}
+        for kind, labels in (("socket", ("event",)), ("http", ("method", "rule"))):
+            handler = "event handler" if kind == "socket" else "request"
+            self.histograms[kind] = (
+                Histogram(
+                    f"slurk_{kind}_duration_seconds",
+                    f"Duration of the {handler} in seconds",
+                    labels,
+                    DURATION_BUCKETS,
+                ),
+                Histogram(
+                    f"slurk_{kind}_database_seconds",
+                    f"Time the {handler} spent executing database queries in seconds",
+                    labels,
+                    DURATION_BUCKETS,
+                ),
+                Histogram(
+                    f"slurk_{kind}_emits",
+                    f"Socket.IO events emitted by the {handler}",
+                    labels,
+                    EMIT_BUCKETS,
+                ),
+                Histogram(
+                    f"slurk_{kind}_payload_bytes",
+                    f"Size of the {handler} payload in bytes",
+                    labels,
+                    SIZE_BUCKETS,
+                ),
+            )
+
+    def init_app(self, app, socketio):
+        app.add_url_rule("/metrics", "metrics", self.view)
+        if app.config.get("METRICS", False):
+            self.enable(app, socketio)
+        else:
+            self.disable()
+
+    def enable(self, app, socketio):
+        """Starts recording, installs the hooks only needed while metrics are enabled"""
+        self.enabled = True
+        if app not in self._apps:
+            self._apps.add(app)
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+
+        self._socketio = socketio
+        socketio._handle_event = self._handle_event
+        if self._server is not socketio.server:
+            self._server = socketio.server
+            self._emit = socketio.server.emit
+            socketio.server.emit = self._count_emit
+
+        if not event.contains(Engine, "before_cursor_execute", self._before_execute):
+            event.listen(Engine, "before_cursor_execute", self._before_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_execute)
+
+    def disable(self):
+        self.enabled = False
+        if self._socketio is not None:
+            vars(self._socketio).pop("_handle_event", None)
+            self._socketio = None
+        if self._server is not None:
+            self._server.emit = self._emit
+            self._server = self._emit = None
+        if event.contains(Engine, "before_cursor_execute", self._before_execute):
+            event.remove(Engine, "before_cursor_execute", self._before_execute)
+            event.remove(Engine, "after_cursor_execute", self._after_execute)
+
+    def clear(self):
+        self.pool_wait.clear()
+        for histograms in self.histograms.values():
+            for histogram in histograms:
+                histogram.clear()
+
+    def observe_pool_wait(self, seconds):
+        self.pool_wait.observe((), seconds)
+
+    @staticmethod
+    def pool_gauges():
+        """Returns the name, description, and value of the gauges of the database pool"""
+        from slurk.extensions.database import TimedQueuePool, db
+
+        pool = db.engine.pool if db.engine is not None else None
+        if not isinstance(pool, TimedQueuePool):
+            return []
+        capacity = pool.size() + max(pool.max_overflow, 0)
+        return [
+            (
+                "slurk_database_pool_size",
+                "Connections kept open in the pool",
+                pool.size(),
+            ),
+            (
+                "slurk_database_pool_max_overflow",
+                "Connections which may be opened in addition to the pool size",
+                pool.max_overflow,
+            ),
+            (
+                "slurk_database_pool_checked_out",
+                "Connections currently in use",
+                pool.checkedout(),
+            ),
+            (
+                "slurk_database_pool_saturation",
+                "Share of the available connections currently in use",
+                pool.checkedout() / capacity if pool.max_overflow >= 0 else 0.0,
+            ),
+        ]
+
+    def render(self):
+        lines = []
+        for histograms in self.histograms.values():
+            for histogram in histograms:
+                lines.extend(histogram.render())
+        lines.extend(self.pool_wait.render())
+        for name, documentation, value in self.pool_gauges():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+    def view(self):
+        if not self.enabled:
+            abort(404)
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+    def _observe(self, kind, labels, measurement, size):
+        duration, database, emits, payload = self.histograms[kind]
+        duration.observe(labels, time.perf_counter() - measurement.start)
+        database.observe(labels, measurement.db_time)
+        emits.observe(labels, measurement.emits)
+        payload.observe(labels, size)
+
+    def _handle_event(self, handler, message, namespace, sid, *args):
+        previous = getattr(self._local, "measurement", None)
+        measurement = self._local.measurement = _Measurement()
+        try:
+            return SocketIO._handle_event(
+                self._socketio, handler, message, namespace, sid, *args
+            )
+        finally:
+            self._local.measurement = previous
+            try:
+                size = len(json.dumps(args, separators=(",", ":"), default=str))
+            except ValueError:
+                size = 0
+            self._observe("socket", (message,), measurement, size)
+
+    def _count_emit(self, *args, **kwargs):
+        measurement = getattr(self._local, "measurement", None)
+        if measurement is not None:
+            measurement.emits += 1
+        return self._emit(*args, **kwargs)
+
+    def _before_request(self):
+        if self.enabled:
+            self._local.request = self._local.measurement = _Measurement()
+
+    def _teardown_request(self, exc):
+        # Also called for the request contexts of Socket.IO events, which are measured
+        # in `_handle_event`
+        measurement = getattr(self._local, "request", None)
+        if measurement is None:
+            return
+        self._local.request = self._local.measurement = None
+        rule = request.url_rule.rule if request.url_rule is not None else None
+        self._observe(
+            "http",
+            (request.method, rule or "<unmatched>"),
+            measurement,
+            request.content_length or 0,
+        )
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, many):
+        conn.info["metrics_query_start"] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, many):
+        start = conn.info.pop("metrics_query_start", None)
+        measurement = getattr(self._local, "measurement", None)
+        if start is not None and measurement is not None:
+            measurement.db_time += time.perf_counter() - start
+
+
+metrics = Metrics()
+
+
+def init_app(app):
+    from slurk.extensions.events import socketio
+
+    metrics.init_app(app, socketio)
@@ -0,0 +1,134 @@
+import json
+import logging
+import re
+from collections import OrderedDict
+
+from socketio import packet
+
+# Events which may be dropped for clients that fall behind. The latest one per event
+# and user is delivered once the client caught up. All other events are reliable,
+# including `typed_message`, whose deltas only apply to the previous update.
+DROPPABLE_EVENTS = {"mouse", "start_typing", "stop_typing"}
+
+# Event name of an encoded Socket.IO event: type, attachments, namespace, and ack id
+EVENT_NAME = re.compile(r'[25](?:[0-9]+-)?(?:/[^,]*,)?[0-9]*\["((?:[^"\\]|\\.)*)"')
+
+
+def event_name(encoded):
+    match = EVENT_NAME.match(encoded) if isinstance(encoded, str) else None
+    return match.group(1) if match else None
+
+
+def sender_id(data):
+    user = data.get("user") if isinstance(data, dict) else None
+    return user.get("id") if isinstance(user, dict) else None
+
+
+class OutboundQueues:
+    """Bounds the packets queued for each Socket.IO session
+
+    The backlog of a session is the number of packets its Engine.IO socket has not
+    written to the client yet. Once it reaches ``OUTBOUND_DROPPABLE_BACKLOG``, events in
+    `DROPPABLE_EVENTS` are held back, replacing earlier ones of the same event and
+    user, and sent when the backlog has dropped. A session whose backlog of reliable
+    events reaches ``OUTBOUND_QUEUE_SIZE`` is disconnected, the client reconnects and
+    fetches missed messages from the logs."""
+
+    def __init__(self):
+        self.max_size = 1000
+        self.droppable_backlog = 32
+        self.flush_interval = 0.05
+        self._server = None
+        self._send_packet = None
+        self._send_eio_packet = None
+        # Engine.IO session -> (event, sender) -> function sending the held back packet
+        self._pending = {}
+        self._disconnecting = set()
+
+    def init_app(self, app, server):
+        self.max_size = app.config.get("OUTBOUND_QUEUE_SIZE", 1000)
+        self.droppable_backlog = app.config.get("OUTBOUND_DROPPABLE_BACKLOG", 32)
+        self._server = server
+        self._pending = {}
+        self._disconnecting = set()
+
+        # Every packet for a single session passes one of these
+        self._send_packet = server._send_packet
+        server._send_packet = self.send_packet
+        if hasattr(server, "_send_eio_packet"):
+            self._send_eio_packet = server._send_eio_packet
+            server._send_eio_packet = self.send_eio_packet
+
+    def send_packet(self, eio_sid, pkt):
+        event = data = None
+        if pkt.packet_type in (packet.EVENT, packet.BINARY_EVENT) and pkt.data:
+            event = pkt.data[0]
+            data = pkt.data[1] if len(pkt.data) > 1 else None
+        self._send(
+            eio_sid, event, lambda: data, lambda: self._send_packet(eio_sid, pkt)
+        )
+
+    def send_eio_packet(self, eio_sid, eio_pkt):
+        def data():
+            try:
+                return json.loads(eio_pkt.data[eio_pkt.data.index("[") :])[1]
+            except (ValueError, IndexError):
+                return None
+
+        self._send(
+            eio_sid,
+            event_name(eio_pkt.data),
+            data,
+            lambda: self._send_eio_packet(eio_sid, eio_pkt),
+        )
+
+    def backlog(self, eio_sid):
+        socket = self._server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    def _send(self, eio_sid, event, data, send):
+        if eio_sid in self._disconnecting:
+            return
+
+        backlog = self.backlog(eio_sid)
+        if event in DROPPABLE_EVENTS:
+            if backlog < self.droppable_backlog and eio_sid not in self._pending:
+                send()
+                return
+            pending = self._pending.get(eio_sid)
+            if pending is None:
+                pending = self._pending[eio_sid] = OrderedDict()
+                self._server.start_background_task(self._flush, eio_sid)
+            key = (event, sender_id(data()))
+            pending.pop(key, None)
+            pending[key] = send
+            return
+
+        if backlog >= self.max_size:
+            logging.getLogger(__name__).warning(
+                f"Disconnecting {eio_sid}, {backlog} packets are not sent yet"
+            )
+            self._disconnecting.add(eio_sid)
+            self._pending.pop(eio_sid, None)
+            self._server.start_background_task(self._disconnect, eio_sid)
+            return
+        send()
+
+    def _flush(self, eio_sid):
+        """Sends the held back packets of a session once it caught up"""
+        while eio_sid in self._pending:
+            self._server.sleep(self.flush_interval)
+            if eio_sid not in self._server.eio.sockets:
+                self._pending.pop(eio_sid, None)
+            elif self.backlog(eio_sid) < self.droppable_backlog:
+                for send in self._pending.pop(eio_sid, {}).values():
+                    send()
+
+    def _disconnect(self, eio_sid):
+        try:
+            self._server.eio.disconnect(eio_sid)
+        finally:
+            self._disconnecting.discard(eio_sid)
+
+
+outbound_queues = OutboundQueues()
@@ -6,7 +6,7 @@ from flask.globals import current_app
 
 from sqlalchemy import Column, String
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql.sqltypes import Boolean, PickleType
+from sqlalchemy.sql.sqltypes import Boolean, JSON, PickleType
 
 from .common import Common
 
@@ -210,6 +210,7 @@ class Layout(Common):
     show_latency = Column(Boolean, nullable=False)
     read_only = Column(Boolean, nullable=False)
     openvidu_settings = Column(PickleType, nullable=False)
+    event_policy = Column(JSON)
 
     @classmethod
     def from_json(cls, data):
@@ -228,4 +229,5 @@ class Layout(Common):
             show_latency=data.get("show_latency", True),
             read_only=data.get("read_only", True),
             openvidu_settings=data.get("openvidu_settings"),
+            event_policy=data.get("event_policy"),
         )
@@ -0,0 +1,65 @@
+from functools import wraps
+
+from sqlalchemy.orm import configure_mappers, joinedload, selectinload
+
+from .room import Room
+from .token import Token
+from .user import User
+
+
+def profile(build):
+    """Builds the loader options of a profile once
+
+    Backrefs like `Token.permissions` only exist after the mappers are configured, so
+    the options are built on first use."""
+    options = None
+
+    @wraps(build)
+    def wrapper():
+        nonlocal options
+        if options is None:
+            configure_mappers()
+            options = build()
+        return options
+
+    return wrapper
+
+
+# Relationships are lazy-loaded, so following them emits one SELECT per relationship
+# and object. The profiles below load what a use case reads up front. Relationships to
+# a single entry are joined, collections of several rooms are selected at once.
+
+
+@profile
+def user_join():
+    """Users joining or leaving rooms, OpenVidu reads the permissions of their token"""
+    return (joinedload(User.token).joinedload(Token.permissions),)
+
+
+@profile
+def room_join():
+    """Rooms being joined or left, whose members are checked, whose layout is logged,
+    and whose layout and session are read by OpenVidu"""
+    return (
+        joinedload(Room.layout),
+        joinedload(Room.session),
+        selectinload(Room.users),
+    )
+
+
+@profile
+def room_joined():
+    """Rooms after the membership was committed, the members are not checked again"""
+    return (joinedload(Room.layout), joinedload(Room.session))
+
+
+@profile
+def room_event():
+    """Rooms receiving a chat event or being left, whose layout is read"""
+    return (joinedload(Room.layout),)
+
+
+@profile
+def room_listing():
+    """A single room listing its users"""
+    return (joinedload(Room.users),)
@@ -1,4 +1,5 @@
-from sqlalchemy import String, Integer, ForeignKey, JSON, Column
+from sqlalchemy import DDL, String, Integer, ForeignKey, JSON, Column, Index, event
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 
 from .common import Common
@@ -6,12 +7,25 @@ from .common import Common
 
 class Log(Common):
     __tablename__ = "Log"
+    __table_args__ = (
+        # Logs of a room in chronological order
+        Index("ix_Log_room_id_date_created", "room_id", "date_created"),
+        # Logs of a user in chronological order
+        Index("ix_Log_user_id_date_created", "user_id", "date_created"),
+        # Private messages of a user and cascading deletes of receivers
+        Index("ix_Log_receiver_id_date_created", "receiver_id", "date_created"),
+        # Unfiltered listing of all logs
+        Index("ix_Log_date_created", "date_created"),
+        # IDs of archived and deleted logs must not be reused, as clients sync by ID
+        {"sqlite_autoincrement": True},
+    )
 
     event = Column(String, nullable=False)
     user_id = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"))
     room_id = Column(Integer, ForeignKey("Room.id", ondelete="CASCADE"))
     receiver_id = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"))
-    data = Column(JSON, nullable=False)
+    # Stored as JSONB on PostgreSQL, so it can be searched using the GIN index below
+    data = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False)
     user = relationship("User", foreign_keys=[user_id])
     receiver = relationship("User", foreign_keys=[receiver_id])
 
@@ -30,9 +44,38 @@ class Log(Common):
         if event == "disconnect":
             current_app.logger.info(f"{user.name} disconnected")
 
-        log = Log(event=event, user=user, room=room, data=data, receiver=receiver)
+        from slurk.extensions.log_writer import log_writer
+
+        if log_writer.buffered:
+            log_writer.write(
+                event,
+                user_id=user.id if user else None,
+                room_id=room.id if room else None,
+                receiver_id=receiver.id if receiver else None,
+                data=data,
+            )
+            return None
+
+        # Only IDs are needed, so `user`, `room`, and `receiver` may also be cached entries
+        log = Log(
+            event=event,
+            user_id=user.id if user else None,
+            room_id=room.id if room else None,
+            receiver_id=receiver.id if receiver else None,
+            data=data,
+        )
 
         db = current_app.session
         db.add(log)
         db.commit()
         return log
+
+
+# Content of logs, e.g. `data @> '{"id": "content-area"}'`, only supported by PostgreSQL
+event.listen(
+    Log.__table__,
+    "after_create",
+    DDL(
+        'CREATE INDEX IF NOT EXISTS "ix_Log_data" ON "Log" USING gin (data jsonb_path_ops)'
+    ).execute_if(dialect="postgresql"),
+)
@@ -36,19 +36,36 @@ class User(Common):
     def get_id(self):
         return self.id
 
+    def _commit_membership(self, room, user_options=(), room_options=()):
+        """Commits a changed membership and reloads the user and `room` with the
+        relationships read afterwards, which were expired by the commit"""
+        from flask.globals import current_app
+
+        from .room import Room
+
+        db = current_app.session
+        user_id, room_id = self.id, room.id
+        db.commit()
+        db.query(User).options(*user_options).populate_existing().get(user_id)
+        db.query(Room).options(*room_options).populate_existing().get(room_id)
+
     def join_room(self, room):
         from flask.globals import current_app
         from flask_socketio import join_room
 
         from slurk.views.api.openvidu.schemas import WebRtcConnectionSchema
         from slurk.extensions.events import socketio
+        from slurk.views.chat.capabilities import join_capability_rooms
+
+        from .loading import room_joined, user_join
 
         if self not in room.users:
             room.users.append(self)
-            current_app.session.commit()
+            self._commit_membership(room, user_join(), room_joined())
 
         if self.session_id is not None:
             join_room(str(room.id), self.session_id, "/")
+            join_capability_rooms(self.id, self.session_id, room.id)
 
             user = dict(id=self.id, name=self.name)
             room_id = room.id
@@ -149,36 +166,50 @@ class User(Common):
                 post_connection()
 
     def leave_room(self, room, event_only=False):
-        from flask.globals import current_app
         from flask_socketio import leave_room
 
         from slurk.extensions.events import socketio
+        from slurk.views.chat.capabilities import leave_capability_rooms
+        from slurk.views.chat.live_typing import live_typing
+        from slurk.views.chat.policy import event_policy
+        from slurk.views.chat.typing import typing_tracker
+
+        from .loading import room_event
 
         if self in room.users and not event_only:
             room.users.remove(self)
-            current_app.session.commit()
+            self._commit_membership(room, room_options=room_event())
 
-        if self.session_id is not None:
+        # Logging commits and expires both, so the values are read beforehand
+        user = dict(id=self.id, name=self.name)
+        room_id = room.id
+        session_id = self.session_id
+
+        if session_id is not None:
+            event_policy.flush(self, room)
+            typing_tracker.stop(self.id, room_id)
+            live_typing.forget(self.id)
             Log.add("leave", self, room)
 
             socketio.emit(
                 "left_room",
                 {
-                    "room": room.id,
-                    "user": self.id,
+                    "room": room_id,
+                    "user": user["id"],
                 },
-                room=self.session_id,
+                room=session_id,
             )
 
-            leave_room(str(room.id), self.session_id, "/")
+            leave_room(str(room_id), session_id, "/")
+            leave_capability_rooms(session_id, room_id)
 
         socketio.emit(
             "status",
             dict(
                 type="leave",
-                user=dict(id=self.id, name=self.name),
-                room=room.id,
+                user=user,
+                room=room_id,
                 timestamp=str(datetime.utcnow()),
             ),
-            room=str(room.id),
+            room=str(room_id),
         )
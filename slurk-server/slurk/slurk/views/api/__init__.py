@@ -131,10 +131,15 @@ class BaseSchema(ma.Schema):
                     field.metadata = {
                         "description": field.metadata["filter_description"]
                     }
+            fields.update(schema.filter_arguments())
             return schema._create_schema("Filter", fields)
 
         return create_schema(cls())
 
+    def filter_arguments(self):
+        """Additional query arguments for the `Filter` schema"""
+        return {}
+
     @classmethod
     @property
     def Update(cls):
@@ -171,14 +176,116 @@ class CommonSchema(BaseSchema):
         description="Server time when this entity was last modified",
     )
 
+    def filter_arguments(self):
+        return dict(
+            limit=ma.fields.Integer(
+                validate=ma.validate.Range(min=1),
+                description="Maximum number of entities returned. Defaults to the server page size",
+            ),
+            after_id=self._cursor_field(
+                "Only return entities listed after the entity with this ID"
+            ),
+            before_id=self._cursor_field(
+                "Only return entities listed before the entity with this ID"
+            ),
+        )
+
+    def _cursor_field(self, description):
+        id_field = self.declared_fields["id"]
+        if isinstance(id_field, ma.fields.Integer):
+            return Id(self.Meta.model, description=description)
+        return type(id_field)(description=description)
+
+    def query(self, args):
+        """Returns a query for all entities matching the filter arguments"""
+        return current_app.session.query(self.Meta.model).filter_by(**args)
+
     def list(self, args):
-        return (
-            current_app.session.query(self.Meta.model)
-            .filter_by(**args)
-            .order_by(self.Meta.model.date_created.desc())
-            .all()
+        """Lists entities from newest to oldest using keyset pagination
+
+        At most `limit` entities are returned, which are listed after `after_id` or before
+        `before_id`. Links to the neighboring pages are passed in the `Link` header."""
+        from sqlalchemy import select, tuple_
+
+        model = self.Meta.model
+
+        args = dict(args)
+        limit = self.page_size(args.pop("limit", None))
+        after_id = args.pop("after_id", None)
+        before_id = args.pop("before_id", None)
+
+        def cursor(id):
+            # Compare against the stored values, so the database does not need to
+            # compare its own timestamps with timestamps converted by Python
+            return (
+                select(model.date_created, model.id)
+                .where(model.id == id)
+                .scalar_subquery()
+            )
+
+        key = tuple_(model.date_created, model.id)
+        query = self.query(args)
+        if after_id is not None:
+            query = query.filter(key < cursor(after_id))
+        if before_id is not None:
+            query = query.filter(key > cursor(before_id))
+
+        if before_id is not None and after_id is None:
+            entities = (
+                query.order_by(model.date_created.asc(), model.id.asc())
+                .limit(limit + 1)
+                .all()
+            )
+            has_prev = len(entities) > limit
+            entities = entities[:limit][::-1]
+            has_next = True
+        else:
+            entities = (
+                query.order_by(model.date_created.desc(), model.id.desc())
+                .limit(limit + 1)
+                .all()
+            )
+            has_next = len(entities) > limit
+            entities = entities[:limit]
+            has_prev = after_id is not None
+
+        self.add_page_links(entities, limit, has_next, has_prev)
+        return entities
+
+    @staticmethod
+    def page_size(limit):
+        """Returns the number of entities listed per page, if `limit` is requested"""
+        return min(
+            limit or current_app.config.get("API_PAGE_SIZE", 1000),
+            current_app.config.get("API_MAX_PAGE_SIZE", 10000),
         )
 
+    @staticmethod
+    def add_page_links(entities, limit, has_next, has_prev):
+        """Adds links to the neighboring pages of `entities` to the `Link` header"""
+        from flask import after_this_request, request
+        from werkzeug.urls import url_encode
+
+        def page_link(rel, **cursor):
+            params = request.args.to_dict(flat=False)
+            params.pop("after_id", None)
+            params.pop("before_id", None)
+            params.update(limit=limit, **cursor)
+            return f'<{request.base_url}?{url_encode(params)}>; rel="{rel}"'
+
+        links = []
+        if entities and has_next:
+            links.append(page_link("next", after_id=entities[-1].id))
+        if entities and has_prev:
+            links.append(page_link("prev", before_id=entities[0].id))
+
+        if links:
+
+            @after_this_request
+            def add_link_header(response):
+                response.headers["Link"] = ", ".join(links)
+                return response
+
     def post(self, item):
         if isinstance(item, self.Meta.model):
             entity = item
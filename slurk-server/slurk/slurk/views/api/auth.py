@@ -1,11 +1,73 @@
+import time
 from functools import wraps
+from threading import Lock
+
 from flask.globals import current_app
 from flask_httpauth import HTTPTokenAuth as _FlaskHTTPTokenAuth
 from werkzeug.exceptions import Unauthorized
 from sqlalchemy.exc import StatementError
 
 from slurk.extensions.api import abort
-from slurk.models import Token
+from slurk.extensions.message_queue import on_message, publish
+from slurk.models import Permissions, Token
+
+
+class TokenCache:
+    """Caches whether a token may access the API for ``TOKEN_CACHE_TTL`` seconds
+
+    Entries are dropped when a token or permissions are replaced, updated, or deleted
+    through the API, in all workers if a message queue is configured. Changes made
+    directly in the database are picked up after the TTL."""
+
+    def __init__(self):
+        # token id -> (api permission, expiry time)
+        self._entries = {}
+        # Incremented on every invalidation, entries loaded before are not stored
+        self._generation = 0
+        self._lock = Lock()
+
+    def api(self, token_id):
+        """Returns whether the token has the `api` permission or None if it does not exist"""
+        now = time.monotonic()
+        entry = self._entries.get(token_id)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        generation = self._generation
+        row = (
+            current_app.session.query(Permissions.api)
+            .join(Token, Token.permissions_id == Permissions.id)
+            .filter(Token.id == token_id)
+            .one_or_none()
+        )
+        if row is None:
+            return None
+
+        ttl = current_app.config.get("TOKEN_CACHE_TTL", 60)
+        if ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[token_id] = (row.api, now + ttl)
+        return row.api
+
+    def invalidate(self, token_id=None, publish_change=True):
+        """Drops the entry of a token or, if `token_id` is None, all entries"""
+        with self._lock:
+            self._generation += 1
+            if token_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(token_id), None)
+        if publish_change:
+            publish("token_cache", str(token_id) if token_id is not None else None)
+
+
+token_cache = TokenCache()
+
+
+@on_message("token_cache")
+def _invalidate_published(token_id):
+    token_cache.invalidate(token_id, publish_change=False)
 
 
 class HTTPTokenAuth(_FlaskHTTPTokenAuth):
@@ -31,9 +93,7 @@ def unauthorized():
 
 @auth.verify_token
 def verify_token(token):
-    db = current_app.session
     try:
-        token = db.query(Token).get(token)
+        return token_cache.api(token)
     except StatementError:
         abort(Unauthorized)
-    return token and token.permissions.api
@@ -97,6 +97,63 @@ class OpenViduSettingsFallbackSchema(BaseSchema):
     )
 
 
+class RateLimitPolicySchema(BaseSchema):
+    rate_limit = ma.fields.Float(
+        allow_none=True,
+        validate=ma.validate.Range(min=0, min_inclusive=False),
+        description="Events per second a user may send on average. Further events are rejected",
+    )
+    burst = ma.fields.Integer(
+        allow_none=True,
+        validate=ma.validate.Range(min=1),
+        description="Events a user may send at once before the rate limit applies",
+    )
+
+
+class EventPolicySchema(RateLimitPolicySchema):
+    max_rate = ma.fields.Float(
+        missing=None,
+        allow_none=True,
+        validate=ma.validate.Range(min=0, min_inclusive=False),
+        description="Maximum number of events per second and user. Further events are dropped",
+    )
+    batch_interval = ma.fields.Float(
+        missing=None,
+        allow_none=True,
+        validate=ma.validate.Range(min=0, min_inclusive=False),
+        description="Events within this many seconds are logged as a single entry with a list of samples",
+    )
+
+
+class EventPoliciesSchema(BaseSchema):
+    mouse = ma.fields.Nested(
+        EventPolicySchema,
+        missing=None,
+        allow_none=True,
+        description="Policy for mouse events. Clicks are never dropped",
+    )
+    text = ma.fields.Nested(
+        RateLimitPolicySchema,
+        allow_none=True,
+        description="Rate limit for text messages",
+    )
+    image = ma.fields.Nested(
+        RateLimitPolicySchema,
+        allow_none=True,
+        description="Rate limit for images",
+    )
+    command = ma.fields.Nested(
+        RateLimitPolicySchema,
+        allow_none=True,
+        description="Rate limit for commands",
+    )
+    bounding_box = ma.fields.Nested(
+        RateLimitPolicySchema,
+        allow_none=True,
+        description="Rate limit for bounding boxes",
+    )
+
+
 class LayoutSchema(CommonSchema):
     class Meta:
         model = Layout
@@ -160,6 +217,11 @@ class LayoutSchema(CommonSchema):
         missing=OpenViduSettingsFallbackSchema().load({}),
         description="Settings for connections used for this layout",
     )
+    event_policy = ma.fields.Nested(
+        EventPoliciesSchema,
+        missing={},
+        description="Downsampling and coalescing of high-frequency events",
+    )
 
     def put(self, old, new):
         layout = Layout.from_json(new)
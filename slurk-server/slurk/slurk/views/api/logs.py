@@ -1,14 +1,89 @@
+from collections import deque
+import csv
+from datetime import datetime, timedelta
+import heapq
+import io
+from itertools import chain, dropwhile, islice, takewhile
+import json
+import re
+
+from flask import Response, request
+from flask.globals import current_app
+from flask.helpers import stream_with_context
 from flask.views import MethodView
 import marshmallow as ma
+from marshmallow.validate import OneOf
+from sqlalchemy import Integer, cast, func, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from webargs.fields import DelimitedList
+from werkzeug.exceptions import NotImplemented, UnprocessableEntity
 
-from slurk.extensions.api import Blueprint
+from slurk.extensions.api import Blueprint, abort
+from slurk.extensions.log_archive import log_archive
+from slurk.extensions.log_writer import log_writer
 from slurk.models import Log, User, Room
-from slurk.views.api import CommonSchema, Id
+from slurk.views.api import BaseSchema, CommonSchema, Id
 
 
 blp = Blueprint(Log.__tablename__, __name__)
 
 
+def data_filters(query_args):
+    """Parses `data.<key>=<value>` query arguments into a list of (path, value) pairs
+
+    Nested keys are separated by dots. Values are parsed as JSON if possible and
+    used as string otherwise, so `data.i=1` matches the number 1 while `data.i="1"`
+    matches the string."""
+    filters = []
+    errors = {}
+    for name, value in query_args.items(multi=True):
+        if not name.startswith("data."):
+            continue
+        path = name.split(".")[1:]
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+        if not all(path):
+            errors.setdefault(name, []).append("Invalid key.")
+        elif isinstance(value, (dict, list)):
+            errors.setdefault(name, []).append(
+                "Only strings, numbers, booleans, and null can be filtered."
+            )
+        else:
+            filters.append((path, value))
+    if errors:
+        abort(UnprocessableEntity, query=errors)
+    return filters
+
+
+def filter_data(query, filters, dialect):
+    """Restricts `query` to logs whose data matches all `filters`
+
+    PostgreSQL answers containment queries from the GIN index on `Log.data`, other
+    databases compare the values extracted from the JSON documents."""
+    for path, value in filters:
+        if dialect == "postgresql":
+            document = value
+            for key in reversed(path):
+                document = {key: document}
+            query = query.filter(type_coerce(Log.data, JSONB).contains(document))
+            continue
+
+        json_path = "$" + "".join(f".{json.dumps(key)}" for key in path)
+        json_type = func.json_type(Log.data, json_path)
+        if value is None:
+            query = query.filter(json_type == "null")
+        elif isinstance(value, bool):
+            query = query.filter(json_type == ("true" if value else "false"))
+        else:
+            types = ("text",) if isinstance(value, str) else ("integer", "real")
+            query = query.filter(
+                json_type.in_(types), func.json_extract(Log.data, json_path) == value
+            )
+    return query
+
+
 class LogSchema(CommonSchema):
     class Meta:
         model = Log
@@ -38,6 +113,343 @@ class LogSchema(CommonSchema):
     )
     data = ma.fields.Dict(missing={}, description="Data stored inside this log entry")
 
+    def filter_arguments(self):
+        arguments = super().filter_arguments()
+        arguments["since_id"] = ma.fields.Integer(
+            validate=ma.validate.Range(min=0),
+            description="Only return logs created after the log with this ID in chronological order",
+        )
+        return arguments
+
+    def _cursor_field(self, description):
+        # Archived logs are not stored in the database anymore
+        return ma.fields.Integer(
+            validate=ma.validate.Range(min=1), description=description
+        )
+
+    def query(self, args):
+        return filter_data(
+            super().query(args),
+            data_filters(request.args),
+            current_app.session.get_bind().dialect.name,
+        )
+
+    def list(self, args):
+        # Buffered entries have to be written before they can be listed
+        if log_writer.buffered:
+            log_writer.flush()
+
+        if "since_id" in args and args.keys() & {"after_id", "before_id"}:
+            abort(
+                UnprocessableEntity,
+                query="`since_id` cannot be combined with `after_id` or `before_id`",
+            )
+        if log_archive.is_archived(args.get("room_id")):
+            return self.list_archived(args)
+        if "since_id" not in args:
+            return super().list(args)
+        return self.list_since(args)
+
+    def list_since(self, args):
+        """Lists logs newer than `since_id` from oldest to newest
+
+        Logs are usually only appended, so clients may keep a local copy
+        and only fetch logs after the newest one they have seen. The ID of the newest
+        listed log is passed in the `X-High-Water-Mark` header and is used as `since_id`
+        for the next request."""
+        args = dict(args)
+        limit = self.page_size(args.pop("limit", None))
+        since_id = args.pop("since_id")
+
+        query = self.query(args).filter(Log.id > since_id)
+        cutoff = sync_cutoff()
+        if cutoff is not None:
+            query = query.filter(Log.date_created <= cutoff)
+        logs = query.order_by(Log.id.asc()).limit(limit + 1).all()
+        self.add_high_water_mark(logs[:limit], since_id, limit, len(logs) > limit)
+        return logs[:limit]
+
+    def list_archived(self, args):
+        """Lists logs of an archived room in the same order and pages as `list` and `list_since`
+
+        A page of live logs is queried like for other rooms and merged with the
+        archived logs, which are streamed until the page is complete. The archive is
+        not read, if all logs on the page are newer than the archived ones."""
+        args = dict(args)
+        limit = self.page_size(args.pop("limit", None))
+        after_id = args.pop("after_id", None)
+        before_id = args.pop("before_id", None)
+        since_id = args.pop("since_id", None)
+
+        room_id = args["room_id"]
+        filters = data_filters(request.args)
+        query = self.query(args).filter(Log.id.notin_(log_archive.pending(room_id)))
+
+        def archived(logs):
+            return (log for log in logs if matches(log, args, filters))
+
+        if since_id is not None:
+            cutoff = sync_cutoff()
+            query = query.filter(Log.id > since_id)
+            if cutoff is not None:
+                query = query.filter(Log.date_created <= cutoff)
+            logs = query.order_by(Log.id.asc()).limit(limit + 1).all()
+            if since_id < log_archive.last_id(room_id):
+                logs = heapq.nsmallest(
+                    limit + 1,
+                    chain(
+                        logs,
+                        (
+                            log
+                            for log in archived(log_archive.read(room_id))
+                            if log.id > since_id and synced(log, cutoff)
+                        ),
+                    ),
+                    key=log_id,
+                )
+            self.add_high_water_mark(logs[:limit], since_id, limit, len(logs) > limit)
+            return logs[:limit]
+
+        def cursor(id):
+            log = current_app.session.query(Log).get(id)
+            if log is None:
+                log = next(
+                    (log for log in log_archive.read(room_id) if log.id == id), None
+                )
+            return log_key(log) if log is not None else None
+
+        after = cursor(after_id) if after_id is not None else None
+        before = cursor(before_id) if before_id is not None else None
+        # Timestamps converted by Python may be stored differently, e.g. without
+        # fractional seconds, so the database only narrows the live logs down to a
+        # second around the cursors and the keys are compared here
+        if after is not None:
+            query = query.filter(Log.date_created < after[0] + timedelta(seconds=1))
+        if before is not None:
+            query = query.filter(Log.date_created > before[0] - timedelta(seconds=1))
+
+        def between(logs):
+            return (
+                log
+                for log in logs
+                if (after is None or log_key(log) < after)
+                and (before is None or log_key(log) > before)
+            )
+
+        last_date = log_archive.last_date(room_id)
+        if after_id is not None and after is None:
+            logs = []
+        elif before_id is not None and before is None:
+            logs = []
+        elif before_id is not None and after_id is None:
+            logs = query.order_by(Log.date_created.asc(), Log.id.asc())
+            logs = list(islice(between(logs.yield_per(limit + 1)), limit + 1))
+            if last_date is None or before[0] <= last_date:
+                newer = dropwhile(
+                    lambda log: log_key(log) <= before, log_archive.read(room_id)
+                )
+                logs = heapq.nsmallest(
+                    limit + 1,
+                    chain(logs, islice(archived(newer), limit + 1)),
+                    key=log_key,
+                )
+        else:
+            logs = query.order_by(Log.date_created.desc(), Log.id.desc())
+            logs = list(islice(between(logs.yield_per(limit + 1)), limit + 1))
+            if (
+                len(logs) <= limit
+                or last_date is None
+                or logs[-1].date_created <= last_date
+            ):
+                older = log_archive.read(room_id)
+                if after is not None:
+                    older = takewhile(lambda log: log_key(log) < after, older)
+                older = deque(archived(between(older)), maxlen=limit + 1)
+                logs = heapq.nlargest(limit + 1, chain(logs, older), key=log_key)
+        logs = sorted(logs, key=log_key, reverse=True)
+
+        if before_id is not None and after_id is None:
+            has_prev = len(logs) > limit
+            logs = logs[-limit:]
+            has_next = True
+        else:
+            has_next = len(logs) > limit
+            logs = logs[:limit]
+            has_prev = after_id is not None
+
+        self.add_page_links(logs, limit, has_next, has_prev)
+        return logs
+
+    @staticmethod
+    def add_high_water_mark(logs, since_id, limit, has_next):
+        """Passes the ID of the newest log in the `X-High-Water-Mark` header"""
+        from flask import after_this_request
+        from werkzeug.urls import url_encode
+
+        high_water_mark = logs[-1].id if logs else since_id
+
+        @after_this_request
+        def add_cursor_headers(response):
+            response.headers["X-High-Water-Mark"] = str(high_water_mark)
+            if has_next:
+                params = request.args.to_dict(flat=False)
+                params.update(limit=limit, since_id=high_water_mark)
+                response.headers[
+                    "Link"
+                ] = f'<{request.base_url}?{url_encode(params)}>; rel="next"'
+            return response
+
+
+def sync_cutoff():
+    """Returns the time after which logs are not listed by `since_id` yet
+
+    IDs are allocated before a transaction commits, so a log with a lower ID may become
+    visible after a newer one was listed. Such logs would be skipped by clients, which
+    continue after the newer one. Logs are therefore held back for `LOG_SYNC_WINDOW`
+    seconds, which gives concurrent transactions time to commit."""
+    window = current_app.config.get("LOG_SYNC_WINDOW", 2)
+    if window <= 0:
+        return None
+    return datetime.utcnow() - timedelta(seconds=window)
+
+
+def synced(log, cutoff):
+    """Returns whether `log` was created before the `sync_cutoff`"""
+    return cutoff is None or log.date_created <= cutoff
+
+
+def log_key(log):
+    return log.date_created, log.id
+
+
+def log_id(log):
+    return log.id
+
+
+def room_logs(room_id):
+    """Yields the archived and the live logs of a room in chronological order"""
+    live_logs = (
+        current_app.session.query(Log)
+        .filter(Log.room_id == room_id, Log.id.notin_(log_archive.pending(room_id)))
+        .order_by(Log.date_created.asc(), Log.id.asc())
+        .yield_per(EXPORT_CHUNK_SIZE)
+    )
+    return heapq.merge(log_archive.read(room_id), live_logs, key=log_key)
+
+
+def matches(log, args, filters):
+    """Returns whether `log` matches the filter arguments and `data.<key>` filters"""
+    if any(getattr(log, name) != value for name, value in args.items()):
+        return False
+    for path, value in filters:
+        data = log.data
+        for key in path:
+            if not isinstance(data, dict) or key not in data:
+                return False
+            data = data[key]
+        # Like in JSON, booleans and null are only equal to themselves
+        if isinstance(value, bool) or isinstance(data, bool) or value is None:
+            if data is not value:
+                return False
+        elif data != value:
+            return False
+    return True
+
+
+class LogExportSchema(LogSchema.Filter):
+    class Meta(LogSchema.Filter.Meta):
+        exclude = ("limit", "after_id", "before_id")
+
+    format = ma.fields.String(
+        validate=OneOf(["ndjson", "csv"]),
+        missing="ndjson",
+        description="Export as newline delimited JSON or as CSV",
+    )
+
+
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_CHUNK_SIZE = 1000
+
+
+def export_logs(logs, format):
+    """Serializes `logs` chunk by chunk without loading all logs at once"""
+    schema = LogSchema.Response()
+    columns = list(schema.fields.keys())
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    if format == "csv":
+        writer.writeheader()
+
+    for i, log in enumerate(logs, start=1):
+        entry = schema.dump(log)
+        if format == "csv":
+            entry["data"] = json.dumps(entry["data"])
+            writer.writerow(entry)
+        else:
+            buffer.write(json.dumps(entry) + "\n")
+
+        if i % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class Duration(ma.fields.String):
+    """A duration like `30s`, `5m`, `1h`, or `1d`, which is deserialized to seconds"""
+
+    UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        value = super()._deserialize(value, attr, data, **kwargs)
+        match = re.fullmatch(r"(\d+)([smhd])", value)
+        if not match or int(match.group(1)) == 0:
+            raise ma.ValidationError(
+                "Duration must be a positive number followed by `s`, `m`, `h`, or `d`"
+            )
+        return int(match.group(1)) * self.UNITS[match.group(2)]
+
+
+STATS_GROUPS = ("event", "user_id", "room_id", "receiver_id")
+
+
+class LogStatsSchema(LogSchema.Filter):
+    class Meta(LogSchema.Filter.Meta):
+        exclude = ("limit", "after_id", "before_id", "since_id")
+
+    group_by = DelimitedList(
+        ma.fields.String(validate=OneOf(STATS_GROUPS)),
+        missing=[],
+        description=f"Comma separated columns to group by: {', '.join(STATS_GROUPS)}",
+    )
+    bucket = Duration(
+        missing=None,
+        description="Additionally group by time intervals of this length, e.g. `30s`, `5m`, `1h`, or `1d`",
+    )
+
+
+class LogStatsResponseSchema(BaseSchema):
+    event = ma.fields.String(description="Event of this group")
+    user_id = ma.fields.Integer(allow_none=True, description="User of this group")
+    room_id = ma.fields.Integer(allow_none=True, description="Room of this group")
+    receiver_id = ma.fields.Integer(
+        allow_none=True, description="Receiver of this group"
+    )
+    bucket = ma.fields.DateTime(description="Start of the time interval")
+    count = ma.fields.Integer(description="Number of logs")
+    first = ma.fields.DateTime(description="Creation time of the first log")
+    last = ma.fields.DateTime(description="Creation time of the last log")
+    message_length = ma.fields.Integer(
+        description="Total number of characters in messages"
+    )
+
+
+def epoch_seconds(column, dialect):
+    if dialect == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return cast(func.extract("epoch", column), Integer)
+
 
 @blp.route("/")
 class Logs(MethodView):
@@ -58,6 +470,156 @@ class Logs(MethodView):
         return LogSchema().post(item)
 
 
+@blp.route("/export")
+class LogsExport(MethodView):
+    @blp.arguments(LogExportSchema, location="query")
+    @blp.response(200)
+    @blp.login_required
+    def get(self, args):
+        """Export logs in chronological order
+
+        The logs are streamed, so arbitrarily many logs can be exported."""
+        if log_writer.buffered:
+            log_writer.flush()
+
+        format = args.pop("format")
+        since_id = args.pop("since_id", None)
+        cutoff = sync_cutoff() if since_id is not None else None
+        if log_archive.is_archived(args.get("room_id")):
+            filters = data_filters(request.args)
+            logs = (
+                log
+                for log in room_logs(args["room_id"])
+                if matches(log, args, filters)
+                and (since_id is None or log.id > since_id and synced(log, cutoff))
+            )
+        else:
+            query = LogSchema().query(args)
+            if since_id is not None:
+                query = query.filter(Log.id > since_id)
+            if cutoff is not None:
+                query = query.filter(Log.date_created <= cutoff)
+            logs = query.order_by(Log.date_created.asc(), Log.id.asc()).yield_per(
+                EXPORT_CHUNK_SIZE
+            )
+        return Response(
+            stream_with_context(export_logs(logs, format)),
+            mimetype=EXPORT_MIMETYPES[format],
+        )
+
+
+@blp.route("/stats")
+class LogsStats(MethodView):
+    @blp.etag
+    @blp.arguments(LogStatsSchema, location="query")
+    @blp.response(200, LogStatsResponseSchema(many=True))
+    @blp.login_required
+    def get(self, args):
+        """Aggregate logs
+
+        Counts the logs matching the filters per group and returns the time of the first
+        and last log and the total length of messages in each group."""
+        if log_writer.buffered:
+            log_writer.flush()
+
+        db = current_app.session
+        dialect = db.get_bind().dialect.name
+        group_by = list(dict.fromkeys(args.pop("group_by")))
+        bucket = args.pop("bucket")
+
+        groups = [getattr(Log, name).label(name) for name in group_by]
+        if bucket is not None:
+            epoch = epoch_seconds(Log.date_created, dialect)
+            groups.append((epoch / bucket * bucket).label("bucket"))
+
+        query = (
+            db.query(
+                *groups,
+                func.count(Log.id).label("count"),
+                func.min(Log.date_created).label("first"),
+                func.max(Log.date_created).label("last"),
+                func.coalesce(
+                    func.sum(func.length(Log.data["message"].as_string())), 0
+                ).label("message_length"),
+            )
+            .filter(*(getattr(Log, name) == value for name, value in args.items()))
+            .group_by(*groups)
+            .order_by(*groups)
+        )
+        query = filter_data(query, data_filters(request.args), dialect)
+
+        stats = []
+        for row in query:
+            entry = row._asdict()
+            if bucket is not None:
+                entry["bucket"] = datetime.utcfromtimestamp(entry["bucket"])
+            stats.append(entry)
+        return stats
+
+
+class LogArchiveSchema(BaseSchema):
+    days = ma.fields.Integer(
+        validate=ma.validate.Range(min=0),
+        missing=None,
+        description="Archive rooms without logs in this many days. Defaults to `SLURK_LOG_ARCHIVE_AFTER_DAYS`",
+    )
+
+
+class LogArchiveResponseSchema(BaseSchema):
+    room_id = ma.fields.Integer(description="Archived room")
+    count = ma.fields.Integer(description="Number of logs moved into the archive")
+
+
+class LogArchiveStatusSchema(BaseSchema):
+    running = ma.fields.Boolean(description="Whether logs are being archived")
+    date_started = ma.fields.DateTime(
+        allow_none=True, description="Start of the last run"
+    )
+    date_finished = ma.fields.DateTime(
+        allow_none=True, description="End of the last run"
+    )
+    rooms = ma.fields.Nested(
+        LogArchiveResponseSchema,
+        many=True,
+        description="Rooms archived by the last run",
+    )
+    error = ma.fields.String(
+        allow_none=True, description="Error, which stopped the last run"
+    )
+
+
+def require_log_archive():
+    if not log_archive.enabled:
+        abort(
+            NotImplemented,
+            query="Log archive is not enabled. Define `SLURK_LOG_ARCHIVE_PATH` in order to activate it.",
+        )
+
+
+@blp.route("/archive")
+class LogsArchive(MethodView):
+    @blp.response(200, LogArchiveStatusSchema)
+    @blp.login_required
+    def get(self):
+        """Get the status of the last archival run of this server"""
+        require_log_archive()
+        return log_archive.status()
+
+    @blp.arguments(LogArchiveSchema)
+    @blp.response(202, LogArchiveStatusSchema)
+    @blp.login_required
+    def post(self, args):
+        """Archive logs of cold rooms
+
+        Logs of rooms, which are read only or had no logs for `days` days, are moved from
+        the database into compressed files. They are still listed by the log endpoints.
+        Logs are archived in the background, the result is returned by `GET`. If a run
+        is in progress, no other one is started."""
+        require_log_archive()
+        log_archive.start(current_app._get_current_object(), args["days"])
+        return log_archive.status()
+
+
 @blp.route("/<int:log_id>")
 class LogById(MethodView):
     @blp.etag
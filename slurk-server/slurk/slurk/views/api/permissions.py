@@ -1,11 +1,14 @@
+from flask.globals import current_app
 from flask.views import MethodView
 from flask_smorest.error_handler import ErrorSchema
 import marshmallow as ma
 from marshmallow.validate import OneOf
 
 from slurk.extensions.api import Blueprint
-from slurk.models import Permissions
+from slurk.models import Permissions, Token, User
 from slurk.views.api import CommonSchema
+from slurk.views.api.auth import token_cache
+from slurk.views.chat.capabilities import update_capability_rooms
 
 
 blp = Blueprint(Permissions.__tablename__, __name__)
@@ -62,6 +65,30 @@ class PermissionsSchema(CommonSchema):
         filter_description="Filter for OpenVidu role",
     )
 
+    def put(self, old, new):
+        permissions = super().put(old, new)
+        token_cache.invalidate()
+        self.update_users(permissions)
+        return permissions
+
+    def patch(self, old, new):
+        permissions = super().patch(old, new)
+        token_cache.invalidate()
+        self.update_users(permissions)
+        return permissions
+
+    def delete(self, entity):
+        super().delete(entity)
+        token_cache.invalidate()
+
+    @staticmethod
+    def update_users(permissions):
+        update_capability_rooms(
+            current_app.session.query(User)
+            .join(Token, User.token_id == Token.id)
+            .filter(Token.permissions_id == permissions.id, User.session_id.isnot(None))
+        )
+
 
 @blp.route("/")
 class Permissions(MethodView):
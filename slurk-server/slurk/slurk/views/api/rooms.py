@@ -9,11 +9,14 @@ import marshmallow as ma
 
 from slurk.extensions.api import Blueprint
 from slurk.extensions.events import socketio
+from slurk.extensions.log_archive import log_archive
+from slurk.extensions.log_writer import log_writer
 from slurk.models import Room, User, Layout, Log
+from slurk.models.loading import room_join, room_listing, user_join
 from slurk.views.api.openvidu.fields import SessionId as OpenViduSessionId
 
 from .users import UserSchema, blp as user_blp
-from .logs import LogSchema
+from .logs import LogSchema, room_logs
 from . import CommonSchema, Id
 
 
@@ -93,13 +96,15 @@ class RoomById(MethodView):
     @blp.login_required
     def delete(self, *, room):
         """Delete a room identified by ID"""
+        room_id = room.id
         RoomSchema().delete(room)
+        log_archive.remove(room_id)
 
 
 @blp.route("/<int:room_id>/users")
 class UsersByRoomById(MethodView):
     @blp.etag
-    @blp.query("room", RoomSchema)
+    @blp.query("room", RoomSchema, profile=room_listing)
     @blp.response(200, UserSchema.Response(many=True))
     def get(self, *, room):
         """List active users by rooms"""
@@ -121,8 +126,8 @@ class RoomsByUserById(MethodView):
 @user_blp.route("/<int:user_id>/rooms/<int:room_id>")
 class UserRoom(MethodView):
     @blp.etag
-    @blp.query("user", UserSchema)
-    @blp.query("room", RoomSchema)
+    @blp.query("user", UserSchema, profile=user_join)
+    @blp.query("room", RoomSchema, profile=room_join)
     @blp.response(201, UserSchema.Response)
     @blp.login_required
     def post(self, *, user, room):
@@ -132,7 +137,7 @@ class UserRoom(MethodView):
 
     @blp.etag
     @blp.query("user", UserSchema)
-    @blp.query("room", RoomSchema, check_etag=False)
+    @blp.query("room", RoomSchema, check_etag=False, profile=room_join)
     @blp.response(204)
     @blp.login_required
     def delete(self, *, user, room):
@@ -152,6 +157,16 @@ class LogsByUserByRoomById(MethodView):
         if not authenticated and current_user != user:
             abort(HTTPStatus.UNAUTHORIZED)
 
+        if log_writer.buffered:
+            log_writer.flush()
+
+        if log_archive.is_archived(room.id):
+            return [
+                log
+                for log in room_logs(room.id)
+                if log.receiver_id is None or user.id in (log.user_id, log.receiver_id)
+            ]
+
         return (
             current_app.session.query(Log)
             .filter_by(room_id=room.id)
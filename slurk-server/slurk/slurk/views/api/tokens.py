@@ -4,8 +4,10 @@ from flask_smorest.error_handler import ErrorSchema
 import marshmallow as ma
 
 from slurk.extensions.api import Blueprint
-from slurk.models import Token, Permissions, Room, Task
+from slurk.models import Token, Permissions, Room, Task, User
 from slurk.views.api import BaseSchema, CommonSchema, Id
+from slurk.views.api.auth import token_cache
+from slurk.views.chat.capabilities import update_capability_rooms
 
 
 blp = Blueprint(Token.__tablename__ + "s", __name__)
@@ -85,6 +87,31 @@ class TokenSchema(CommonSchema):
         description="Settings for connections used for this token. If a setting is missing, the room default is used",
     )
 
+    def put(self, old, new):
+        token = super().put(old, new)
+        token_cache.invalidate(token.id)
+        self.update_users(token)
+        return token
+
+    def patch(self, old, new):
+        token = super().patch(old, new)
+        token_cache.invalidate(token.id)
+        self.update_users(token)
+        return token
+
+    def delete(self, entity):
+        token_id = entity.id
+        super().delete(entity)
+        token_cache.invalidate(token_id)
+
+    @staticmethod
+    def update_users(token):
+        update_capability_rooms(
+            current_app.session.query(User).filter(
+                User.token_id == token.id, User.session_id.isnot(None)
+            )
+        )
+
 
 @blp.route("/")
 class Tokens(MethodView):
@@ -6,6 +6,7 @@ import marshmallow as ma
 
 from slurk.extensions.api import Blueprint, abort
 from slurk.models import User, Task, Token
+from slurk.views.chat.capabilities import update_capability_rooms
 
 from . import CommonSchema
 from .tasks import TaskSchema
@@ -36,6 +37,18 @@ class UserSchema(CommonSchema):
         filter_description="Filter for a SocketIO session ID",
     )
 
+    def put(self, old, new):
+        user = super().put(old, new)
+        update_capability_rooms([user])
+        return user
+
+    def patch(self, old, new):
+        user = super().patch(old, new)
+        # The permissions only change with the token
+        if "token_id" in new:
+            update_capability_rooms([user])
+        return user
+
 
 @blp.route("/")
 class Users(MethodView):
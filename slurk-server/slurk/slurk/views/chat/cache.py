@@ -0,0 +1,235 @@
+from collections import namedtuple
+from threading import Lock
+
+from flask.globals import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from slurk.extensions.message_queue import on_message, publish
+from slurk.models import Layout, Permissions, Room, Token, User
+from slurk.models.common import user_room
+
+PERMISSION_FLAGS = [
+    column.name
+    for column in Permissions.__table__.columns
+    if column.name not in ("id", "date_created", "date_modified")
+]
+
+RoomEntry = namedtuple("RoomEntry", ["id", "read_only", "users", "event_policy"])
+UserEntry = namedtuple(
+    "UserEntry", ["id", "name", "token_id", "session_id", "rooms", "permissions"]
+)
+PermissionFlags = namedtuple("PermissionFlags", PERMISSION_FLAGS)
+
+
+def is_id(value):
+    """Returns whether `value`, e.g. from a client payload, is an ID
+
+    Entries are cached by integer IDs, so a room requested as `"1"` would be loaded
+    into an entry of its own, which is not dropped when room 1 changes."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class ChatCache:
+    """Write-through cache of room membership and permissions used by chat events
+
+    Entries are loaded on first use. Joining or leaving a room updates the cached
+    entries after the transaction is committed. Other changes to users, rooms, layouts,
+    tokens, or permissions drop the affected entries, so they are reloaded on next use.
+    With a message queue, other workers apply the changes as well. Entries are never
+    modified, so they can be iterated while the cache is updated."""
+
+    def __init__(self):
+        self._rooms = {}
+        self._users = {}
+        # Incremented on every change, entries loaded before are not stored
+        self._generation = 0
+        self._lock = Lock()
+
+    def room(self, room_id):
+        """Returns the room with the IDs of its users and the event policy of its layout
+        or None if it does not exist"""
+        if not is_id(room_id):
+            return None
+        entry = self._rooms.get(room_id)
+        if entry is not None:
+            return entry
+
+        generation = self._generation
+        db = current_app.session
+        row = (
+            db.query(Room.read_only, Layout.read_only, Layout.event_policy)
+            .join(Layout, Room.layout_id == Layout.id)
+            .filter(Room.id == room_id)
+            .one_or_none()
+        )
+        if row is None:
+            return None
+        users = db.query(user_room.c.user_id).filter(user_room.c.room_id == room_id)
+        entry = RoomEntry(
+            id=room_id,
+            read_only=row[0] or row[1],
+            users=frozenset(user_id for user_id, in users),
+            event_policy=row[2] or {},
+        )
+        self._store(self._rooms, room_id, entry, generation)
+        return entry
+
+    def user(self, user_id):
+        """Returns the user with its rooms and permissions or None if it does not exist"""
+        if not is_id(user_id):
+            return None
+        entry = self._users.get(user_id)
+        if entry is not None:
+            return entry
+
+        generation = self._generation
+        db = current_app.session
+        row = (
+            db.query(
+                User.name,
+                User.token_id,
+                User.session_id,
+                *(getattr(Permissions, flag) for flag in PERMISSION_FLAGS),
+            )
+            .join(Token, User.token_id == Token.id)
+            .join(Permissions, Token.permissions_id == Permissions.id)
+            .filter(User.id == user_id)
+            .one_or_none()
+        )
+        if row is None:
+            return None
+        rooms = db.query(user_room.c.room_id).filter(user_room.c.user_id == user_id)
+        entry = UserEntry(
+            id=user_id,
+            name=row[0],
+            token_id=row[1],
+            session_id=row[2],
+            rooms=frozenset(room_id for room_id, in rooms),
+            permissions=PermissionFlags(*row[3:]),
+        )
+        self._store(self._users, user_id, entry, generation)
+        return entry
+
+    def _store(self, entries, key, entry, generation):
+        with self._lock:
+            if generation == self._generation:
+                entries[key] = entry
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._rooms.clear()
+            self._users.clear()
+
+    def apply(self, changes):
+        """Applies the changes of a committed transaction"""
+        with self._lock:
+            self._generation += 1
+            if changes["all_rooms"]:
+                self._rooms.clear()
+            if changes["all_users"]:
+                self._users.clear()
+            for room_id in changes["rooms"]:
+                self._rooms.pop(room_id, None)
+            for user_id in changes["users"]:
+                self._users.pop(user_id, None)
+
+            for room_id, user_id, joined in changes["membership"]:
+                room = self._rooms.get(room_id)
+                if room is not None:
+                    users = room.users | {user_id} if joined else room.users - {user_id}
+                    self._rooms[room_id] = room._replace(users=users)
+                user = self._users.get(user_id)
+                if user is not None:
+                    rooms = user.rooms | {room_id} if joined else user.rooms - {room_id}
+                    self._users[user_id] = user._replace(rooms=rooms)
+
+
+chat_cache = ChatCache()
+
+
+def _changes(session):
+    return session.info.setdefault(
+        "chat_cache",
+        dict(
+            memberships=[],
+            membership=[],
+            rooms=set(),
+            users=set(),
+            all_rooms=False,
+            all_users=False,
+        ),
+    )
+
+
+def _membership_changed(joined):
+    def listener(room, user, initiator):
+        session = object_session(room) or object_session(user)
+        if session is not None:
+            _changes(session)["memberships"].append((room, user, joined))
+
+    return listener
+
+
+event.listen(Room.users, "append", _membership_changed(True))
+event.listen(Room.users, "remove", _membership_changed(False))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changes = _changes(session)
+
+    # IDs of new users and rooms are only known after the flush
+    for room, user, joined in changes["memberships"]:
+        if room.id is not None and user.id is not None:
+            changes["membership"].append((room.id, user.id, joined))
+    changes["memberships"].clear()
+
+    for entity in session.dirty:
+        if not session.is_modified(entity, include_collections=False):
+            continue
+        if isinstance(entity, User):
+            changes["users"].add(entity.id)
+        elif isinstance(entity, Room):
+            changes["rooms"].add(entity.id)
+        elif isinstance(entity, Layout):
+            changes["all_rooms"] = True
+        elif isinstance(entity, (Token, Permissions)):
+            changes["all_users"] = True
+
+    for entity in session.deleted:
+        if isinstance(entity, User):
+            changes["users"].add(entity.id)
+            changes["all_rooms"] = True
+        elif isinstance(entity, Room):
+            changes["rooms"].add(entity.id)
+            changes["all_users"] = True
+        elif isinstance(entity, (Layout, Token, Permissions)):
+            changes["all_rooms"] = True
+            changes["all_users"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    changes = session.info.pop("chat_cache", None)
+    if changes is None:
+        return
+    chat_cache.apply(changes)
+
+    # Other workers have their own cache
+    del changes["memberships"]
+    if any(changes.values()):
+        changes["rooms"] = list(changes["rooms"])
+        changes["users"] = list(changes["users"])
+        publish("chat_cache", changes)
+
+
+@on_message("chat_cache")
+def _apply_published_changes(changes):
+    chat_cache.apply(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session, previous_transaction):
+    session.info.pop("chat_cache", None)
@@ -0,0 +1,43 @@
+from flask_socketio import join_room, leave_room
+
+from slurk.views.chat.cache import chat_cache
+
+# Suffix of a derived Socket.IO room -> permission required to be placed in it
+CAPABILITY_ROOMS = {
+    "bbox": "receive_bounding_box",
+}
+
+
+def capability_room(room_id, capability):
+    """Returns the Socket.IO room of all sessions in a room, which have `capability`
+
+    Events only some users of a room may receive are sent to this room with a single
+    emit, e.g. ``socketio.emit("bounding_box", data, room=capability_room(1, "bbox"))``.
+    """
+    return f"{room_id}:{capability}"
+
+
+def join_capability_rooms(user_id, session_id, room_id):
+    """Places a session into the derived rooms of a room matching the user's permissions"""
+    permissions = chat_cache.user(user_id).permissions
+    for capability, permission in CAPABILITY_ROOMS.items():
+        if getattr(permissions, permission):
+            join_room(capability_room(room_id, capability), session_id, "/")
+        else:
+            leave_room(capability_room(room_id, capability), session_id, "/")
+
+
+def leave_capability_rooms(session_id, room_id):
+    for capability in CAPABILITY_ROOMS:
+        leave_room(capability_room(room_id, capability), session_id, "/")
+
+
+def update_capability_rooms(users):
+    """Moves connected users into the derived rooms matching their current permissions
+
+    Has to be called after the permissions of the users have been changed."""
+    for user in users:
+        if user.session_id is None:
+            continue
+        for room_id in chat_cache.user(user.id).rooms:
+            join_capability_rooms(user.id, user.session_id, room_id)
@@ -2,15 +2,62 @@ from datetime import datetime
 
 from flask.globals import current_app
 from flask_login import login_required, current_user
+from flask_socketio import join_room, leave_room, rooms
 
 from slurk.extensions.events import socketio
-from slurk.models import User, Room, Log, Task
+from slurk.models import Room, Log, Task
+from slurk.models.loading import room_event, room_listing
+from slurk.views.chat.cache import chat_cache, is_id
+from slurk.views.chat.capabilities import capability_room
+from slurk.views.chat.live_typing import live_typing
+from slurk.views.chat.policy import event_policy
+from slurk.views.chat.rate_limit import rate_limited
+from slurk.views.chat.typing import typing_tracker
+
+
+def task_subscription(task_id):
+    """Returns the Socket.IO room of sessions subscribed to a task or, if `task_id` is
+    None, to all tasks"""
+    return f"task:{task_id}" if task_id is not None else "task:*"
+
+
+@socketio.event
+@login_required
+def subscribe_task(payload):
+    """Subscribes the session to `new_task_room` events of a task or of all tasks"""
+    if not chat_cache.user(current_user.id).permissions.api:
+        return False, "insufficient rights"
+
+    task_id = payload.get("task")
+    if task_id is not None and current_app.session.query(Task).get(task_id) is None:
+        return False, f'Task "{task_id}" does not exist'
+
+    # Every event is only received once, either for all tasks or for single tasks
+    subscriptions = [room for room in rooms() if room.startswith("task:")]
+    if task_subscription(None) in subscriptions:
+        return True
+    if task_id is None:
+        for room in subscriptions:
+            leave_room(room)
+    join_room(task_subscription(task_id))
+    return True
+
+
+@socketio.event
+@login_required
+def unsubscribe_task(payload):
+    leave_room(task_subscription(payload.get("task")))
+    return True
 
 
 @socketio.event
 def room_created(payload):
     db = current_app.session
-    room = db.query(Room).get(payload["room"]) if "room" in payload else None
+    room = (
+        db.query(Room).options(*room_listing()).get(payload["room"])
+        if "room" in payload
+        else None
+    )
     task = db.query(Task).get(payload["task"]) if "task" in payload else None
 
     if "room" not in payload:
@@ -20,32 +67,31 @@ def room_created(payload):
     if "task" in payload and task is None:
         return False, f'Task "{task}" does not exist'
 
-    socketio.emit("new_room", {"room": room.id}, broadcast=True)
+    # Without a room, the event is sent to all clients
+    socketio.emit("new_room", {"room": room.id})
 
     if task is not None:
         users = []
         for user in room.users:
             users.append({"id": user.id, "name": user.name})
 
-        socketio.emit(
-            "new_task_room",
-            {"room": room.id, "task": task.id, "users": users},
-            broadcast=True,
-        )
+        data = {"room": room.id, "task": task.id, "users": users}
+        socketio.emit("new_task_room", data, room=task_subscription(task.id))
+        socketio.emit("new_task_room", data, room=task_subscription(None))
     return True
 
 
 @socketio.event
+@rate_limited("bounding_box")
 def bounding_box(payload):
     if "room" not in payload:
         return False, 'missing argument: "room"'
 
-    db = current_app.session
-    room = db.query(Room).get(payload.pop("room"))
+    room = chat_cache.room(payload.pop("room"))
 
     if not room:
         return False, "Room not found"
-    if current_user not in room.users:
+    if current_user.id not in room.users:
         return False, "User not in this room"
 
     if "type" not in payload:
@@ -57,16 +103,16 @@ def bounding_box(payload):
 
     user = {"id": current_user.get_id(), "name": current_user.name}
 
-    for usr in room.users:
-        if usr.token.permissions.receive_bounding_box and usr.session_id:
-            socketio.emit(
-                "bounding_box",
-                {"user": user, "room": room.id, **payload},
-                room=usr.session_id,
-            )
+    socketio.emit(
+        "bounding_box",
+        {"user": user, "room": room.id, **payload},
+        room=capability_room(room.id, "bbox"),
+    )
+    return True
 
 
 @socketio.event
+@rate_limited("keypress")
 def keypress(message):
     typing = message.get("typing", None)
     if typing is None:
@@ -76,41 +122,26 @@ def keypress(message):
     if not current_user_id:
         return
 
-    for room in current_user.rooms:
-        user = {
-            "id": current_user_id,
-            "name": current_user.name,
-        }
-        if typing:
-            socketio.emit("start_typing", {"user": user}, room=str(room.id))
-        else:
-            socketio.emit("stop_typing", {"user": user}, room=str(room.id))
+    typing_tracker.update(current_user, typing)
 
 
 @socketio.event
+@rate_limited("typed_message")
 def typed_message(payload):
     """
     This function handles live-typing mode. It is called when 'typed_message'
-    event is fired and broadcasts the current message that the user typed to
-    the room through 'user_message' event.
+    event is fired and relays the changes to the message that the user is typing
+    to their rooms through the 'typed_message' event.
     """
     current_user_id = current_user.get_id()
     if not current_user_id:
-        return
+        return False, "invalid session id"
 
-    for room in current_user.rooms:
-        user = {
-            "id": current_user_id,
-            "name": current_user.name,
-        }
-        socketio.emit(
-            "typed_message",
-            {"user": user, "text": payload["text"]},
-            room=str(room.id),
-        )
+    return live_typing.update(current_user, payload)
 
 
 @socketio.event
+@rate_limited("mouse")
 def mouse(payload):
     current_user_id = current_user.get_id()
     if not current_user_id:
@@ -119,7 +150,11 @@ def mouse(payload):
     user = dict(id=current_user_id, name=current_user.name)
 
     db = current_app.session
-    room = db.query(Room).get(payload["room"]) if "room" in payload else None
+    room = (
+        db.query(Room).options(*room_event()).get(payload["room"])
+        if "room" in payload
+        else None
+    )
 
     if room is None:
         return False, "Room not found"
@@ -130,6 +165,9 @@ def mouse(payload):
         element_id=payload.get("element_id"),
     )
 
+    if not event_policy.accept("mouse", current_user, room, data):
+        return
+
     socketio.emit(
         "mouse",
         dict(
@@ -140,45 +178,48 @@ def mouse(payload):
         ),
         room=str(room.id),
     )
-    Log.add(event="mouse", user=current_user, room=room, data=data)
+    event_policy.log("mouse", current_user, room, data)
 
 
 def emit_message(event, payload, data):
     if "room" not in payload:
         return False, 'missing argument: "room"'
+    for key in ("room", "receiver_id", "impersonate"):
+        if payload.get(key) is not None and not is_id(payload[key]):
+            return False, f'"{key}" must be an ID'
 
-    db = current_app.session
-    room = db.query(Room).get(payload["room"])
+    room = chat_cache.room(payload["room"])
 
     if not room:
         return False, "Room not found"
 
+    permissions = chat_cache.user(current_user.id).permissions
     broadcast = data["broadcast"] = payload.get("broadcast", False)
 
     if broadcast:
-        if not current_user.token.permissions.broadcast:
+        if not permissions.broadcast:
             return False, "You are not allowed to broadcast"
 
         target = None
         private = False
     else:
         if "receiver_id" in payload:
-            if not current_user.token.permissions.send_privately:
+            if not permissions.send_privately:
                 return False, "You are not allowed to send privately"
             receiver_id = payload["receiver_id"]
-            receiver = db.query(User).get(receiver_id)
+            receiver = chat_cache.user(receiver_id)
             if not receiver:
                 return False, f'User "{receiver_id}" does not exist'
             if not receiver.session_id:
                 return False, f'User "{receiver_id}" is not logged in'
-            if room not in receiver.rooms:
+            if room.id not in receiver.rooms:
                 return False, f'User "{receiver_id}" is not in this room'
             target = receiver.session_id
             private = True
         else:
-            if current_user not in room.users:
+            if current_user.id not in room.users:
                 return False, "Not in room"
-            if room.layout.read_only or room.read_only:
+            if room.read_only:
                 return False, f"Room {room.id} is read-only"
             target = str(room.id)
             private = False
@@ -187,9 +228,8 @@ def emit_message(event, payload, data):
     impersonate = payload.get("impersonate")
     if impersonate:
         # only impersonate someone who is in the room
-        for user in room.users:
-            if user.id == impersonate:
-                sender = dict(id=user.id, name=user.name)
+        if impersonate in room.users:
+            sender = dict(id=impersonate, name=chat_cache.user(impersonate).name)
 
     socketio.emit(
         event,
@@ -200,8 +240,8 @@ def emit_message(event, payload, data):
             private=private,
             **data,
         ),
+        # Broadcast to everyone if there is no target
         room=target,
-        broadcast=broadcast,
     )
 
     Log.add(
@@ -212,23 +252,22 @@ def emit_message(event, payload, data):
         data=data,
     )
 
-    for room in current_user.rooms:
-        socketio.emit("stop_typing", {"user": sender}, room=str(room.id))
+    typing_tracker.stop(current_user.id)
 
     return True
 
 
 @socketio.event
 @login_required
+@rate_limited("text")
 def text(payload):
     current_user_id = current_user.get_id()
     if not current_user_id:
         return False, "invalid session id"
 
+    permissions = chat_cache.user(current_user_id).permissions
     html = payload.get("html", False)
-    if not current_user.token.permissions.send_html_message and (
-        html or not current_user.token.permissions.send_message
-    ):
+    if not permissions.send_html_message and (html or not permissions.send_message):
         return False, "insufficient rights"
     if "message" not in payload:
         return False, 'missing argument: "message"'
@@ -242,11 +281,12 @@ def text(payload):
 
 @socketio.event
 @login_required
+@rate_limited("command")
 def message_command(payload):
     current_user_id = current_user.get_id()
     if not current_user_id:
         return False, "invalid session id"
-    if not current_user.token.permissions.send_command:
+    if not chat_cache.user(current_user_id).permissions.send_command:
         return False, "insufficient rights"
     if "command" not in payload:
         return False, 'missing argument: "command"'
@@ -256,11 +296,12 @@ def message_command(payload):
 
 @socketio.event
 @login_required
+@rate_limited("image")
 def image(payload):
     current_user_id = current_user.get_id()
     if not current_user_id:
         return False, "invalid session id"
-    if not current_user.token.permissions.send_image:
+    if not chat_cache.user(current_user_id).permissions.send_image:
         return False, "insufficient rights"
     if "url" not in payload:
         return False, 'missing argument: "url"'
@@ -0,0 +1,169 @@
+import os
+import time
+
+from flask.globals import current_app
+
+from slurk.extensions.events import socketio
+from slurk.views.chat.cache import chat_cache
+
+
+def utf16_length(text):
+    """Returns the length of `text` in UTF-16 code units like `String.length`"""
+    return len(text.encode("utf-16-le", "surrogatepass")) // 2
+
+
+def apply_ops(text, ops):
+    """Applies insert and delete operations to `text` in order
+
+    Positions and counts are UTF-16 code units like in JavaScript, so a character
+    outside of the Basic Multilingual Plane, like an emoji, counts twice. Raises
+    `ValueError` if an operation is malformed or out of range."""
+    if not isinstance(ops, list):
+        raise ValueError('"ops" must be a list')
+    # Two bytes per code unit, surrogates sent on their own by a client are kept
+    units = text.encode("utf-16-le", "surrogatepass")
+    for op in ops:
+        if not isinstance(op, dict):
+            raise ValueError("Operation must be an object")
+        pos = op.get("pos")
+        if type(pos) is not int or not 0 <= pos <= len(units) // 2:
+            raise ValueError(f"Invalid position: {pos}")
+        if op.get("op") == "insert":
+            insert = op.get("text")
+            if not isinstance(insert, str):
+                raise ValueError(f"Invalid text: {insert}")
+            insert = insert.encode("utf-16-le", "surrogatepass")
+            units = units[: pos * 2] + insert + units[pos * 2 :]
+        elif op.get("op") == "delete":
+            count = op.get("count")
+            if type(count) is not int or not 0 <= count <= len(units) // 2 - pos:
+                raise ValueError(f"Invalid count: {count}")
+            units = units[: pos * 2] + units[(pos + count) * 2 :]
+        else:
+            raise ValueError(f'Unknown operation: {op.get("op")}')
+    return units.decode("utf-16-le", "surrogatepass")
+
+
+def diff_ops(old, new):
+    """Returns the operations to turn `old` into `new`
+
+    Only the differing range between the common prefix and suffix is replaced. The
+    range is found on characters, so no surrogate pair is split, and its position and
+    length are converted to UTF-16 code units like in `apply_ops`."""
+    prefix = len(os.path.commonprefix([old, new]))
+    suffix = len(os.path.commonprefix([old[prefix:][::-1], new[prefix:][::-1]]))
+    pos = utf16_length(old[:prefix])
+    ops = []
+    if len(old) - prefix - suffix > 0:
+        count = utf16_length(old[prefix : len(old) - suffix])
+        ops.append(dict(op="delete", pos=pos, count=count))
+    if len(new) - prefix - suffix > 0:
+        ops.append(dict(op="insert", pos=pos, text=new[prefix : len(new) - suffix]))
+    return ops
+
+
+class LiveTyping:
+    """Relays the messages users are currently typing as deltas
+
+    Clients send insert and delete operations against their previous text together
+    with a sequence number. Per user, updates are sent to the rooms at most
+    ``TYPED_MESSAGE_RATE`` times per second, updates in between are merged. Every
+    ``TYPED_MESSAGE_SNAPSHOT_INTERVAL`` updates, and when the text is cleared, the full
+    text is sent instead, so users who joined later or missed an update catch up.
+
+    Updates are sent to the rooms the user is in when they are sent. The state of a
+    user is dropped when the user leaves a room or disconnects."""
+
+    def __init__(self):
+        # user id -> received and sent state of the typed message
+        self._messages = {}
+
+    def text(self, user_id):
+        message = self._messages.get(user_id)
+        return message["text"] if message is not None else ""
+
+    def update(self, user, payload):
+        """Applies a typed message of `user` and returns the acknowledgement"""
+        message = self._messages.get(user.id)
+        if message is None:
+            message = dict(
+                user=dict(id=user.id, name=user.name),
+                seq=0,
+                text="",
+                sent_seq=0,
+                sent_text="",
+                sent_at=0.0,
+                pending=False,
+            )
+
+        seq = payload.get("seq", message["seq"] + 1)
+        if type(seq) is not int:
+            return False, f"Invalid sequence number: {seq}"
+        if "text" in payload:
+            text = payload["text"]
+            if not isinstance(text, str):
+                return False, '"text" must be a string'
+        elif "ops" in payload:
+            if seq != message["seq"] + 1:
+                return False, f"Expected sequence number {message['seq'] + 1}"
+            try:
+                text = apply_ops(message["text"], payload["ops"])
+            except ValueError as e:
+                return False, str(e)
+        else:
+            return False, 'Missing argument "text" or "ops"'
+
+        config = current_app.config
+        interval = 1 / config.get("TYPED_MESSAGE_RATE", 10)
+        snapshot_interval = config.get("TYPED_MESSAGE_SNAPSHOT_INTERVAL", 20)
+
+        message.update(seq=seq, text=text)
+        self._messages[user.id] = message
+
+        wait = message["sent_at"] + interval - time.monotonic()
+        if wait <= 0 or text == "":
+            self._send(message, snapshot_interval)
+        elif not message["pending"]:
+            message["pending"] = True
+            socketio.start_background_task(
+                self._send_later,
+                current_app._get_current_object(),
+                message,
+                wait,
+                snapshot_interval,
+            )
+        return True
+
+    def forget(self, user_id):
+        """Drops the typed message of a user, e.g. after leaving a room"""
+        self._messages.pop(user_id, None)
+
+    def _send_later(self, app, message, wait, snapshot_interval):
+        socketio.sleep(wait)
+        message["pending"] = False
+        with app.app_context():
+            self._send(message, snapshot_interval)
+
+    def _send(self, message, snapshot_interval):
+        user_id = message["user"]["id"]
+        # The user left a room or disconnected in the meantime
+        if self._messages.get(user_id) is not message:
+            return
+        if message["sent_seq"] > 0 and message["text"] == message["sent_text"]:
+            return
+
+        message["sent_seq"] += 1
+        data = dict(user=message["user"], seq=message["sent_seq"])
+        if (message["sent_seq"] - 1) % snapshot_interval == 0 or message["text"] == "":
+            data["text"] = message["text"]
+        else:
+            data["ops"] = diff_ops(message["sent_text"], message["text"])
+        message["sent_text"] = message["text"]
+        message["sent_at"] = time.monotonic()
+
+        entry = chat_cache.user(user_id)
+        for room_id in entry.rooms if entry is not None else ():
+            socketio.emit("typed_message", data, room=str(room_id))
+
+
+live_typing = LiveTyping()
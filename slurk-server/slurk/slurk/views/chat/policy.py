@@ -0,0 +1,135 @@
+import atexit
+import time
+from collections import namedtuple
+from datetime import datetime
+from threading import Lock
+
+from flask.globals import current_app
+
+from slurk.extensions.events import socketio
+from slurk.models import Log
+
+# Batches are written in the background, where only the IDs are known
+Ref = namedtuple("Ref", ["id"])
+
+
+class EventPolicy:
+    """Downsamples and coalesces high-frequency events as configured by the layout of a room
+
+    Each event can be configured in `Layout.event_policy` with
+
+    - ``max_rate``: Maximum number of samples per second and user. Additional samples,
+      which are not listed in `ALWAYS_ACCEPTED`, are dropped before they are sent to
+      the room or logged
+    - ``batch_interval``: Samples within this many seconds are stored as a single log
+      entry with the samples listed in ``data["samples"]``. Batches are written once
+      their interval has passed, when the user leaves the room, and on shutdown
+    """
+
+    # Samples of those types are never dropped
+    ALWAYS_ACCEPTED = {"mouse": {"click"}}
+
+    def __init__(self):
+        self._last_accepted = {}
+        # (event, user id, room id) -> (deadline, samples)
+        self._batches = {}
+        self._lock = Lock()
+        self._flusher = None
+
+    @staticmethod
+    def settings(event, room):
+        policies = room.layout.event_policy or {}
+        return policies.get(event) or {}
+
+    def accept(self, event, user, room, sample):
+        """Returns whether the sample should be sent and logged"""
+        max_rate = self.settings(event, room).get("max_rate")
+        if not max_rate or sample.get("type") in self.ALWAYS_ACCEPTED.get(event, ()):
+            return True
+
+        key = (event, user.id, room.id)
+        now = time.monotonic()
+        if now - self._last_accepted.get(key, float("-inf")) < 1 / max_rate:
+            return False
+        self._last_accepted[key] = now
+        return True
+
+    def log(self, event, user, room, sample):
+        """Logs the sample, either directly or as part of a batch"""
+        batch_interval = self.settings(event, room).get("batch_interval")
+        if not batch_interval:
+            Log.add(event=event, user=user, room=room, data=sample)
+            return
+
+        key = (event, user.id, room.id)
+        now = time.monotonic()
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is not None and now >= batch[0]:
+                expired = self._batches.pop(key)[1]
+                batch = None
+            else:
+                expired = None
+            if batch is None:
+                batch = self._batches[key] = (now + batch_interval, [])
+            batch[1].append(dict(timestamp=str(datetime.utcnow()), **sample))
+        if expired is not None:
+            self._write(key, expired)
+        self._ensure_flusher()
+
+    def flush(self, user, room):
+        """Logs all pending batches of the user in the room"""
+        self._flush(lambda key, deadline: key[1] == user.id and key[2] == room.id)
+        for key in list(self._last_accepted.keys()):
+            if key[1] == user.id and key[2] == room.id:
+                self._last_accepted.pop(key, None)
+
+    def flush_expired(self):
+        """Logs all batches whose interval has passed"""
+        now = time.monotonic()
+        self._flush(lambda key, deadline: now >= deadline)
+
+    def flush_all(self):
+        """Logs all pending batches"""
+        self._flush(lambda key, deadline: True)
+
+    def _flush(self, predicate):
+        with self._lock:
+            keys = [
+                key for key, batch in self._batches.items() if predicate(key, batch[0])
+            ]
+            batches = [(key, self._batches.pop(key)[1]) for key in keys]
+        for key, samples in batches:
+            self._write(key, samples)
+
+    @staticmethod
+    def _write(key, samples):
+        event, user_id, room_id = key
+        Log.add(
+            event=event,
+            user=Ref(user_id),
+            room=Ref(room_id),
+            data=dict(samples=samples),
+        )
+
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            app = current_app._get_current_object()
+            self._flusher = socketio.start_background_task(self._run, app)
+            atexit.register(self._shutdown, app)
+
+    def _run(self, app):
+        while True:
+            socketio.sleep(1)
+            with app.app_context():
+                try:
+                    self.flush_expired()
+                except Exception:
+                    app.logger.exception("Could not log batched events")
+
+    def _shutdown(self, app):
+        with app.app_context():
+            self.flush_all()
+
+
+event_policy = EventPolicy()
@@ -0,0 +1,107 @@
+import functools
+import time
+from threading import Lock
+
+from flask.globals import current_app
+from flask_login import current_user
+
+from slurk.views.chat.cache import chat_cache
+
+# Seconds between two removals of full buckets
+EXPIRE_INTERVAL = 60
+
+
+class RateLimiter:
+    """Limits how many events of each type a user may send with token buckets
+
+    Every user has a bucket per event, which holds up to ``burst`` events and is
+    refilled with ``rate_limit`` events per second. The defaults are configured in
+    ``RATE_LIMITS`` and can be overridden in the event policy of the layout of the
+    room an event is sent to. Events exceeding the limit are rejected.
+
+    A bucket which is full again behaves like a new one, so it is removed. Buckets are
+    kept when users disconnect, reconnecting does not refill them."""
+
+    def __init__(self):
+        # (user id, event) -> [available events, time of the last update, time at
+        # which the bucket is full again]
+        self._buckets = {}
+        self._expired = time.monotonic()
+        self._lock = Lock()
+
+    @staticmethod
+    def settings(event, room=None):
+        settings = dict(current_app.config.get("RATE_LIMITS", {}).get(event) or {})
+        if room is not None:
+            policy = room.event_policy.get(event) or {}
+            settings.update(
+                (key, policy[key])
+                for key in ("rate_limit", "burst")
+                if policy.get(key) is not None
+            )
+        return settings
+
+    def acquire(self, user_id, event, room=None):
+        """Takes an event from the bucket of the user
+
+        Returns None if the event may be sent, otherwise the reason it was rejected."""
+        settings = self.settings(event, room)
+        rate = settings.get("rate_limit")
+        if not rate:
+            return None
+        burst = max(settings.get("burst") or rate, 1)
+
+        now = time.monotonic()
+        with self._lock:
+            if now - self._expired >= EXPIRE_INTERVAL:
+                self._expire(now)
+            available, updated, _ = self._buckets.get(
+                (user_id, event), (burst, now, now)
+            )
+            available = min(burst, available + (now - updated) * rate)
+            if available < 1:
+                self._buckets[(user_id, event)] = [
+                    available,
+                    now,
+                    now + (burst - available) / rate,
+                ]
+                retry = (1 - available) / rate
+                return (
+                    f'Rate limit for "{event}" exceeded, retry in {retry:.2f} seconds'
+                )
+            self._buckets[(user_id, event)] = [
+                available - 1,
+                now,
+                now + (burst - available + 1) / rate,
+            ]
+        return None
+
+    def _expire(self, now):
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+        self._expired = now
+
+
+rate_limiter = RateLimiter()
+
+
+def rate_limited(event):
+    """Rejects calls of a Socket.IO event handler exceeding the rate limit of `event`
+
+    The limit of the layout applies if the payload contains a room."""
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(payload):
+            user_id = current_user.get_id()
+            if user_id is not None:
+                room_id = payload.get("room") if isinstance(payload, dict) else None
+                room = chat_cache.room(room_id) if isinstance(room_id, int) else None
+                reason = rate_limiter.acquire(user_id, event, room)
+                if reason is not None:
+                    return False, reason
+            return handler(payload)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,70 @@
+import time
+
+from flask.globals import current_app
+
+from slurk.extensions.events import socketio
+from slurk.views.chat.cache import chat_cache
+
+
+class TypingTracker:
+    """Tracks which users are typing in which rooms
+
+    ``start_typing`` and ``stop_typing`` are only emitted when a user starts or stops
+    typing in a room. Users, who did not report typing for ``TYPING_TIMEOUT`` seconds,
+    are stopped by the server."""
+
+    def __init__(self):
+        # user id -> (user, {room id: deadline})
+        self._typing = {}
+        self._expirer = None
+
+    def is_typing(self, user_id, room_id):
+        return room_id in self._typing.get(user_id, (None, {}))[1]
+
+    def update(self, user, typing):
+        """Handles a keypress of `user`"""
+        if not typing:
+            self.stop(user.id)
+            return
+
+        timeout = current_app.config.get("TYPING_TIMEOUT", 5)
+        deadline = time.monotonic() + timeout
+        sender, rooms = self._typing.setdefault(
+            user.id, (dict(id=user.id, name=user.name), {})
+        )
+        for room_id in chat_cache.user(user.id).rooms:
+            if room_id not in rooms:
+                socketio.emit("start_typing", {"user": sender}, room=str(room_id))
+            rooms[room_id] = deadline
+        self._ensure_expirer(timeout)
+
+    def stop(self, user_id, room_id=None):
+        """Stops typing of a user in a room or, if `room_id` is None, in all rooms"""
+        if user_id not in self._typing:
+            return
+        sender, rooms = self._typing[user_id]
+        for typing_room_id in [room_id] if room_id is not None else list(rooms):
+            if rooms.pop(typing_room_id, None) is not None:
+                socketio.emit("stop_typing", {"user": sender}, room=str(typing_room_id))
+        if not rooms:
+            del self._typing[user_id]
+
+    def expire(self):
+        """Stops typing of all users, whose deadline has passed"""
+        now = time.monotonic()
+        for user_id, (_, rooms) in list(self._typing.items()):
+            for room_id, deadline in list(rooms.items()):
+                if deadline <= now:
+                    self.stop(user_id, room_id)
+
+    def _ensure_expirer(self, timeout):
+        if self._expirer is None:
+            self._expirer = socketio.start_background_task(self._run, timeout)
+
+    def _run(self, timeout):
+        while True:
+            socketio.sleep(min(timeout, 1))
+            self.expire()
+
+
+typing_tracker = TypingTracker()
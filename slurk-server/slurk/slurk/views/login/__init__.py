@@ -13,8 +13,10 @@ from flask_login import login_user
 
 from slurk.extensions.login import login_manager
 from slurk.models import User, Token
+from slurk.models.loading import user_join
 
 from .forms import LoginForm
+from .principal import principals
 import slurk.views.login.events  # NOQA
 
 
@@ -27,12 +29,21 @@ def register_blueprints(api):
 
 @login_manager.user_loader
 def load_user(id):
+    # Events of a connected Socket.IO session use its principal
+    principal = principals.get(getattr(request, "sid", None), int(id))
+    if principal is not None:
+        return principal
+
     current_app.logger.debug(f"loading user from id {id}")
-    return current_app.session.query(User).get(int(id))
+    return current_app.session.query(User).options(*user_join()).get(int(id))
 
 
 @login_manager.request_loader
 def load_user_from_request(request):
+    principal = principals.get(getattr(request, "sid", None))
+    if principal is not None:
+        return principal
+
     token_id = request.headers.get("Authorization") or request.args.get("token")
     user_id = request.args.get("user") or request.headers.get("user")
 
@@ -45,6 +56,7 @@ def load_user_from_request(request):
 
     return (
         current_app.session.query(User)
+        .options(*user_join())
         .filter_by(token_id=token_id, id=user_id)
         .one_or_none()
     )
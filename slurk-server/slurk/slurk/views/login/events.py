@@ -2,7 +2,9 @@ from flask import request, current_app
 from flask_login import login_required, logout_user, current_user
 
 from slurk.extensions.events import socketio
-from slurk.models import Log
+from slurk.models import Log, User
+from slurk.models.loading import room_event, room_join
+from slurk.views.login.principal import principals
 
 
 @socketio.on("connect")
@@ -10,17 +12,21 @@ from slurk.models import Log
 def connect():
     current_user.session_id = request.sid
     current_app.session.commit()
-    for room in current_user.rooms:
+    for room in current_user.rooms.options(*room_join()):
         current_user.join_room(room)
+    principals.add(request.sid, current_user.id)
     Log.add("connect", current_user)
 
 
 @socketio.on("disconnect")
 @login_required
 def disconnect():
-    for room in current_user.rooms:
-        current_user.leave_room(room, event_only=True)
-    current_user.session_id = None
+    # `current_user` is the principal of the session, which can not be modified
+    user = current_app.session.query(User).get(current_user.id)
+    principals.remove(request.sid)
+    for room in user.rooms.options(*room_event()):
+        user.leave_room(room, event_only=True)
+    user.session_id = None
     current_app.session.commit()
-    Log.add("disconnect", current_user)
+    Log.add("disconnect", user)
     logout_user()
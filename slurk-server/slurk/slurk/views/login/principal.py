@@ -0,0 +1,85 @@
+from threading import Lock
+
+from slurk.views.chat.cache import chat_cache
+
+
+class Principal:
+    """The user of a Socket.IO session as `current_user` of its events
+
+    Name, token, permissions, and rooms are read from the `chat_cache` entry of the
+    user, which is updated when the user joins or leaves a room and dropped when the
+    user, its token, or its permissions change. Handling an event therefore does not
+    load the `User` from the database. Code modifying the user has to load it."""
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user_id, session_id):
+        self.id = user_id
+        self.session_id = session_id
+
+    def get_id(self):
+        return self.id
+
+    @property
+    def entry(self):
+        return chat_cache.user(self.id)
+
+    @property
+    def name(self):
+        return self.entry.name
+
+    @property
+    def token_id(self):
+        return self.entry.token_id
+
+    @property
+    def permissions(self):
+        return self.entry.permissions
+
+    @property
+    def room_ids(self):
+        return self.entry.rooms
+
+    def __eq__(self, other):
+        return not getattr(other, "is_anonymous", True) and other.get_id() == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<Principal {self.id} ({self.session_id})>"
+
+
+class Principals:
+    """Principals of the Socket.IO sessions connected to this worker"""
+
+    def __init__(self):
+        # Socket.IO session id -> principal
+        self._principals = {}
+        self._lock = Lock()
+
+    def add(self, session_id, user_id):
+        principal = Principal(user_id, session_id)
+        with self._lock:
+            self._principals[session_id] = principal
+        return principal
+
+    def get(self, session_id, user_id=None):
+        """Returns the principal of a session or None if it is unknown, the user does
+        not exist anymore, or it is not `user_id`"""
+        principal = self._principals.get(session_id) if session_id else None
+        if principal is None or user_id is not None and principal.id != user_id:
+            return None
+        if principal.entry is None:
+            self.remove(session_id)
+            return None
+        return principal
+
+    def remove(self, session_id):
+        with self._lock:
+            self._principals.pop(session_id, None)
+
+
+principals = Principals()
@@ -4,6 +4,7 @@ let keypress = undefined;
 let incoming_text = undefined;
 let incoming_image = undefined;
 let is_typing = -1;
+let last_typing_emit = 0;
 
 $(document).ready(() => {
     socket.on("text_message", function (data) {
@@ -63,8 +64,11 @@ $(document).ready(() => {
         if (keypress === undefined || $("#text").is("[readonly]")) {
             return;
         }
-        if (is_typing === -1) {
+        // the server stops typing after a few seconds without keypresses
+        let now = Date.now();
+        if (is_typing === -1 || now - last_typing_emit >= 1000) {
             socket.emit("keypress", { "typing": true });
+            last_typing_emit = now;
         }
         is_typing = 0;
         let code = e.keyCode || e.which;
@@ -1,7 +1,49 @@
 let old_value = "";
+let typed_seq = 0;
 let typed_messages = {};
 
 
+// applies the insert and delete operations of a typed message
+function applyTypedOps(text, ops) {
+    for (let op of ops) {
+        if (op.op === "insert") {
+            text = text.slice(0, op.pos) + op.text + text.slice(op.pos);
+        } else if (op.op === "delete") {
+            text = text.slice(0, op.pos) + text.slice(op.pos + op.count);
+        }
+    }
+    return text;
+}
+
+// returns the operations to turn `old_text` into `new_text`
+function diffTypedOps(old_text, new_text) {
+    let prefix = 0;
+    while (prefix < old_text.length && prefix < new_text.length && old_text[prefix] === new_text[prefix]) {
+        prefix++;
+    }
+    let suffix = 0;
+    while (suffix < old_text.length - prefix && suffix < new_text.length - prefix
+        && old_text[old_text.length - 1 - suffix] === new_text[new_text.length - 1 - suffix]) {
+        suffix++;
+    }
+    let ops = [];
+    if (old_text.length - prefix - suffix > 0) {
+        ops.push({ "op": "delete", "pos": prefix, "count": old_text.length - prefix - suffix });
+    }
+    if (new_text.length - prefix - suffix > 0) {
+        ops.push({ "op": "insert", "pos": prefix, "text": new_text.slice(prefix, new_text.length - suffix) });
+    }
+    return ops;
+}
+
+// sends the full text, if the server could not apply an update
+function sendTypedSnapshot(success) {
+    if (success !== true) {
+        typed_seq += 1;
+        socket.emit("typed_message", { "seq": typed_seq, "text": old_value });
+    }
+}
+
 function showMessagePreview(data) {
     if (self_user === undefined || data.user.id === self_user.id) {
         return;
@@ -13,20 +55,30 @@ function showMessagePreview(data) {
         scrollbar_at_bottom = true;
     }
 
-    if (data.text == "") {
-        delete typed_messages[data.user.name];
+    let typed = typed_messages[data.user.id];
+    if (data.text !== undefined) {
+        typed = { "name": data.user.name, "seq": data.seq, "text": data.text };
+    } else if (typed !== undefined && data.seq === typed.seq + 1) {
+        typed = { "name": data.user.name, "seq": data.seq, "text": applyTypedOps(typed.text, data.ops) };
+    } else {
+        // an update was missed, wait for the next snapshot
+        return;
+    }
+
+    if (typed.text === "") {
+        delete typed_messages[data.user.id];
     } else {
-        typed_messages[data.user.name] = data.text;
+        typed_messages[data.user.id] = typed;
     }
 
     $("#typing").empty();
-    for (let user_name in typed_messages) {
+    for (let user_id in typed_messages) {
         let bubble = $(
         "<li class='other'>" +
         "  <div class='message-box'>" +
         "    <div class='dot-flashing'></div>" +
-        "    <span class='message'>" + user_name + "</span>" +
-            "    <div>" + typed_messages[user_name] + "</div>" +  
+        "    <span class='message'>" + typed_messages[user_id].name + "</span>" +
+        "    <div>" + typed_messages[user_id].text + "</div>" +
         "  </div>" +
         "</li>");
         $("#typing").append(bubble);
@@ -47,10 +99,10 @@ function updateMessage() {
         $("#text").val(old_value);
         alert("You may not edit a typed message.");
     } else {
+        let ops = diffTypedOps(old_value, new_value);
         old_value = new_value;
-        socket.emit("typed_message", {
-            "text": old_value
-        });
+        typed_seq += 1;
+        socket.emit("typed_message", { "seq": typed_seq, "ops": ops }, sendTypedSnapshot);
     }
 }
 
@@ -58,9 +110,7 @@ function submitMessage(event) {
     let code = event.keyCode || event.which;
     if (code === 13) {
         old_value = "";
-        socket.emit("typed_message", {
-            "text": old_value
-        });
+        sendTypedSnapshot(false);
     }
 }
 
@@ -75,11 +125,11 @@ function submitMessageOnInactivity(data) {
             keypress(self_room, self_user, time / 1000, old_value);
 
             old_value = "";
+            sendTypedSnapshot(false);
             $("#text").val("");
         }
     } else {
-        data.text = "";
-        showMessagePreview(data);
+        showMessagePreview({ "user": data.user, "text": "" });
     }
 }
 
@@ -215,6 +215,14 @@ class TestPostValid:
         assert response.status_code == HTTPStatus.CREATED, parse_error(response)
         assert all([(s in response.json["script"]) for s in scripts])
 
+    def test_event_policy(self, client):
+        event_policy = {"mouse": {"max_rate": 10.0, "batch_interval": 1.0}}
+        content = {"title": "Test Room", "event_policy": event_policy}
+
+        response = client.post("/slurk/api/layouts", json=content)
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        assert response.json["event_policy"] == event_policy
+
 
 @pytest.mark.depends(on=[f"{PREFIX}::TestRequestOptions::test_request_option[POST]"])
 class TestPostInvalid:
@@ -236,6 +244,19 @@ class TestPostInvalid:
             {"json": {"title": "Test Room", "html_obj": []}},
             HTTPStatus.UNPROCESSABLE_ENTITY,
         ),
+        (
+            {
+                "json": {
+                    "title": "Test Room",
+                    "event_policy": {"mouse": {"max_rate": 0}},
+                }
+            },
+            HTTPStatus.UNPROCESSABLE_ENTITY,
+        ),
+        (
+            {"json": {"title": "Test Room", "event_policy": {"keypress": {}}}},
+            HTTPStatus.UNPROCESSABLE_ENTITY,
+        ),
     ]
 
     @pytest.mark.parametrize("content, status", REQUEST_CONTENT)
@@ -556,3 +577,22 @@ class TestPatchInvalid(LayoutsTable, InvalidWithEtagTemplate):
 
         response = client.patch(f'/slurk/api/layouts/{layouts.json["id"]}', **content)
         assert response.status_code == status, parse_error(response)
+
+
+def test_missing_event_policy_column(tmp_path):
+    from sqlalchemy import create_engine, inspect
+
+    from slurk.extensions.database import Database
+
+    # Databases created before layouts had an event policy
+    engine = create_engine(f"sqlite:///{tmp_path / 'slurk.db'}")
+    database = Database()
+    # Not bound, as the session factory is shared with the database of the app
+    database._engine = engine
+    database.init()
+    with engine.begin() as connection:
+        connection.exec_driver_sql('ALTER TABLE "Layout" DROP COLUMN event_policy')
+
+    database.init()
+    columns = {c["name"] for c in inspect(engine).get_columns("Layout")}
+    assert "event_policy" in columns
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Test requests to the `logs` table."""
 
+from datetime import datetime, timedelta
 from http import HTTPStatus
 import json
 import os
@@ -368,3 +369,739 @@ class TestPatchInvalid(LogsTable, InvalidWithEtagTemplate):
 
         response = client.patch(f'/slurk/api/logs/{logs.json["id"]}', **content)
         assert response.status_code == status, parse_error(response)
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        "tests/api/test_rooms.py::TestPostValid",
+    ]
+)
+class TestBufferedWriter:
+    @pytest.mark.parametrize("durability", ["sync", "async"])
+    def test_logs_are_listed(self, client, rooms, durability, monkeypatch):
+        from slurk.extensions.log_writer import log_writer
+
+        monkeypatch.setattr(log_writer, "durability", durability)
+        monkeypatch.setattr(log_writer, "flush_size", 1000)
+        monkeypatch.setattr(log_writer, "flush_interval", 3600)
+
+        response = client.patch(
+            f'/slurk/api/rooms/{rooms.json["id"]}/attribute/id/test-field',
+            json={"attribute": "color", "value": durability},
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT, parse_error(response)
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": rooms.json["id"], "event": "set_attribute"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["data"]["value"] for log in response.json] == [durability]
+
+    def test_invalid_row(self, client, rooms, monkeypatch):
+        from slurk.extensions.log_writer import log_writer
+
+        monkeypatch.setattr(log_writer, "durability", "async")
+        monkeypatch.setattr(log_writer, "flush_size", 1000)
+        monkeypatch.setattr(log_writer, "flush_interval", 3600)
+
+        # The room does not exist, so only this row is rejected by the database
+        log_writer.write("set_attribute", room_id=999999, data={"value": "invalid"})
+        log_writer.write(
+            "set_attribute", room_id=rooms.json["id"], data={"value": "valid"}
+        )
+        assert log_writer.flush() == 2
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": rooms.json["id"], "event": "set_attribute"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["data"]["value"] for log in response.json][0] == "valid"
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        "tests/api/test_rooms.py::TestPostValid",
+    ]
+)
+class TestSpool:
+    @pytest.fixture
+    def spool_path(self, app, tmp_path):
+        from slurk.extensions.log_writer import log_writer
+
+        app.config["LOG_SPOOL_PATH"] = str(tmp_path / "log.spool")
+        yield app.config["LOG_SPOOL_PATH"]
+        del app.config["LOG_SPOOL_PATH"]
+        log_writer.init_app(app)
+
+    def list_attributes(self, client, room_id):
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": room_id, "event": "set_attribute"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        return [log["data"]["value"] for log in response.json]
+
+    def test_database_unavailable(self, app, client, rooms, spool_path, monkeypatch):
+        from slurk.extensions.database import db
+        from slurk.extensions.log_writer import log_writer
+
+        app.config["LOG_DURABILITY"] = "spool"
+        try:
+            log_writer.init_app(app)
+        finally:
+            app.config["LOG_DURABILITY"] = "sync"
+        monkeypatch.setattr(log_writer, "flush_interval", 3600)
+
+        def unavailable():
+            raise ConnectionError("database unavailable")
+
+        monkeypatch.setattr(db, "create_session", unavailable)
+        # the event is acknowledged although it cannot be written yet
+        log_writer.write(
+            "set_attribute", room_id=rooms.json["id"], data={"value": "spooled"}
+        )
+        assert log_writer.flush() == 1
+        assert len(log_writer._spool) > 0
+
+        monkeypatch.undo()
+        assert self.list_attributes(client, rooms.json["id"]) == ["spooled"]
+        assert len(log_writer._spool) == 0
+
+    def test_invalid_row(self, app, client, rooms, spool_path, monkeypatch):
+        from slurk.extensions.log_writer import log_writer
+
+        app.config["LOG_DURABILITY"] = "spool"
+        try:
+            log_writer.init_app(app)
+        finally:
+            app.config["LOG_DURABILITY"] = "sync"
+        monkeypatch.setattr(log_writer, "flush_interval", 3600)
+
+        log_writer.write("set_attribute", room_id=999999, data={"value": "invalid"})
+        log_writer.write(
+            "set_attribute", room_id=rooms.json["id"], data={"value": "valid"}
+        )
+        assert log_writer.flush() == 2
+        # the invalid row does not block the spool
+        assert len(log_writer._spool) == 0
+        assert self.list_attributes(client, rooms.json["id"])[0] == "valid"
+
+        with open(f"{spool_path}.rejected") as rejected_file:
+            rejected = [json.loads(line) for line in rejected_file]
+        assert len(rejected) == 1
+        assert rejected[0]["room_id"] == 999999
+        assert rejected[0]["error"]
+
+    def test_locked(self, app, spool_path):
+        from slurk.extensions.log_spool import LogSpool
+
+        spool = LogSpool(spool_path, 4096)
+        try:
+            with pytest.raises(ValueError, match="separate file per worker"):
+                LogSpool(spool_path, 4096)
+        finally:
+            spool.close()
+
+    def test_recovery(self, app, client, rooms, spool_path):
+        from slurk.extensions.log_spool import LogSpool
+        from slurk.extensions.log_writer import log_writer
+
+        spool = LogSpool(spool_path, 4096)
+        for value in ["first", "second"]:
+            assert spool.append(
+                dict(
+                    event="set_attribute",
+                    user_id=None,
+                    room_id=rooms.json["id"],
+                    receiver_id=None,
+                    data={"value": value},
+                    date_created=datetime.utcnow(),
+                )
+            )
+        spool.close()
+
+        log_writer.init_app(app)
+        assert len(log_writer._spool) == 0
+        assert self.list_attributes(client, rooms.json["id"]) == ["second", "first"]
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        f"{PREFIX}::TestPostValid",
+    ]
+)
+class TestGetPaginated:
+    def test_valid_request(self, client):
+        ids = []
+        for i in range(5):
+            response = client.post(
+                "/slurk/api/logs", json={"event": "Paginated Event", "data": {"i": i}}
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            ids.append(response.json["id"])
+        # logs are listed from newest to oldest
+        ids.reverse()
+
+        response = client.get(
+            "/slurk/api/logs", query_string={"event": "Paginated Event", "limit": 2}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["id"] for log in response.json] == ids[:2]
+        assert 'rel="next"' in response.headers["Link"]
+        assert 'rel="prev"' not in response.headers["Link"]
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Paginated Event", "limit": 2, "after_id": ids[1]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["id"] for log in response.json] == ids[2:4]
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Paginated Event", "limit": 2, "after_id": ids[3]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["id"] for log in response.json] == ids[4:]
+        assert 'rel="next"' not in response.headers["Link"]
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Paginated Event", "limit": 2, "before_id": ids[4]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["id"] for log in response.json] == ids[2:4]
+
+    @pytest.mark.parametrize(
+        "query_string", [{"limit": 0}, {"after_id": -42}, {"before_id": "invalid"}]
+    )
+    def test_invalid_request(self, client, query_string):
+        response = client.get("/slurk/api/logs", query_string=query_string)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        f"{PREFIX}::TestPostValid",
+    ]
+)
+class TestGetSince:
+    @pytest.fixture
+    def no_sync_window(self, app, monkeypatch):
+        monkeypatch.setitem(app.config, "LOG_SYNC_WINDOW", 0)
+
+    def test_valid_request(self, client, no_sync_window):
+        ids = []
+        for i in range(3):
+            response = client.post(
+                "/slurk/api/logs", json={"event": "Synced Event", "data": {"i": i}}
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            ids.append(response.json["id"])
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Synced Event", "since_id": 0, "limit": 2},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        # logs are listed from oldest to newest
+        assert [log["id"] for log in response.json] == ids[:2]
+        assert response.headers["X-High-Water-Mark"] == str(ids[1])
+        assert f"since_id={ids[1]}" in response.headers["Link"]
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Synced Event", "since_id": ids[1]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert [log["id"] for log in response.json] == ids[2:]
+        assert response.headers["X-High-Water-Mark"] == str(ids[2])
+        assert "Link" not in response.headers
+
+        # without new logs the high-water mark stays the same
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"event": "Synced Event", "since_id": ids[2]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == []
+        assert response.headers["X-High-Water-Mark"] == str(ids[2])
+
+        response = client.get(
+            "/slurk/api/logs/export",
+            query_string={"event": "Synced Event", "since_id": ids[0]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ids[1:]
+
+    def test_sync_window(self, app, client, monkeypatch):
+        from slurk.views.api import logs
+
+        response = client.post("/slurk/api/logs", json={"event": "Held Event"})
+        log_id = response.json["id"]
+        query_string = {"event": "Held Event", "since_id": log_id - 1}
+
+        # Recent logs are held back, as older IDs may still be committed
+        response = client.get("/slurk/api/logs", query_string=query_string)
+        assert response.json == []
+        assert response.headers["X-High-Water-Mark"] == str(log_id - 1)
+
+        class Later(datetime):
+            @classmethod
+            def utcnow(cls):
+                window = app.config.get("LOG_SYNC_WINDOW", 2)
+                return datetime.utcnow() + timedelta(seconds=window + 1)
+
+        monkeypatch.setattr(logs, "datetime", Later)
+        response = client.get("/slurk/api/logs", query_string=query_string)
+        assert [log["id"] for log in response.json] == [log_id]
+
+    @pytest.mark.parametrize(
+        "query_string",
+        [{"since_id": -1}, {"since_id": "invalid"}, {"since_id": 0, "after_id": 1}],
+    )
+    def test_invalid_request(self, client, query_string):
+        response = client.get("/slurk/api/logs", query_string=query_string)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        f"{PREFIX}::TestPostValid",
+    ]
+)
+class TestGetDataFilter:
+    @pytest.fixture(scope="class")
+    def data_logs(self, client):
+        ids = []
+        for data in [
+            {"id": "content-area", "text": "Phase 1"},
+            {"id": "header", "text": "Phase 1"},
+            {"id": "content-area", "count": 1, "shown": True},
+            {"id": "content-area", "count": "1", "shown": False},
+            {"id": "content-area", "command": {"name": "done"}, "value": None},
+        ]:
+            response = client.post(
+                "/slurk/api/logs", json={"event": "Data Event", "data": data}
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            ids.append(response.json["id"])
+        return ids
+
+    @pytest.mark.parametrize(
+        "query_string, expected",
+        [
+            ({"data.id": "content-area"}, [0, 2, 3, 4]),
+            ({"data.id": "content-area", "data.text": "Phase 1"}, [0]),
+            ({"data.count": "1"}, [2]),
+            ({"data.count": '"1"'}, [3]),
+            ({"data.shown": "false"}, [3]),
+            ({"data.command.name": "done"}, [4]),
+            ({"data.value": "null"}, [4]),
+            ({"data.missing": "content-area"}, []),
+        ],
+    )
+    def test_valid_request(self, client, data_logs, query_string, expected):
+        response = client.get(
+            "/slurk/api/logs", query_string={"event": "Data Event", **query_string}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert sorted(log["id"] for log in response.json) == [
+            data_logs[i] for i in expected
+        ]
+
+    def test_export(self, client, data_logs):
+        response = client.get(
+            "/slurk/api/logs/export",
+            query_string={"event": "Data Event", "data.command.name": "done"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == [data_logs[4]]
+
+    @pytest.mark.parametrize(
+        "query_string",
+        [{"data.": "value"}, {"data.a..b": "value"}, {"data.id": '{"a": 1}'}],
+    )
+    def test_invalid_request(self, client, query_string):
+        response = client.get("/slurk/api/logs", query_string=query_string)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestGetValid",
+        f"{PREFIX}::TestPostValid",
+        "tests/api/test_rooms.py::TestPostValid",
+    ]
+)
+class TestArchive:
+    @pytest.fixture
+    def archive(self, tmp_path, monkeypatch):
+        from slurk.extensions.log_archive import log_archive
+
+        monkeypatch.setattr(log_archive, "path", str(tmp_path))
+        return log_archive
+
+    @staticmethod
+    def archive_logs(client, **content):
+        """Starts archiving and returns the status after the run finished"""
+        from slurk.extensions.events import socketio
+
+        response = client.post("/slurk/api/logs/archive", json=content)
+        assert response.status_code == HTTPStatus.ACCEPTED, parse_error(response)
+        assert response.json["running"]
+        while response.json["running"]:
+            socketio.sleep(0.01)
+            response = client.get("/slurk/api/logs/archive")
+            assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json["error"] is None
+        return response
+
+    def test_archived_logs_are_listed(
+        self, app, client, layouts, users, archive, monkeypatch
+    ):
+        monkeypatch.setitem(app.config, "LOG_SYNC_WINDOW", 0)
+        response = client.post(
+            "/slurk/api/rooms",
+            json={"layout_id": layouts.json["id"], "read_only": True},
+        )
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        room_id = response.json["id"]
+
+        for i in range(3):
+            response = client.post(
+                "/slurk/api/logs",
+                json={"event": "Archived Event", "room_id": room_id, "data": {"i": i}},
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        live = client.get("/slurk/api/logs", query_string={"room_id": room_id}).json
+
+        response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 3} in response.json["rooms"]
+        assert archive.is_archived(room_id)
+
+        # new logs of the room are kept in the database until the next run
+        response = client.post(
+            "/slurk/api/logs",
+            json={"event": "Archived Event", "room_id": room_id, "data": {"i": 3}},
+        )
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        live.insert(0, response.json)
+
+        response = client.get("/slurk/api/logs", query_string={"room_id": room_id})
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == live
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": room_id, "limit": 2, "after_id": live[1]["id"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == live[2:]
+
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": room_id, "since_id": live[2]["id"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == live[1::-1]
+        assert response.headers["X-High-Water-Mark"] == str(live[0]["id"])
+
+        response = client.get(
+            "/slurk/api/logs", query_string={"room_id": room_id, "data.i": 1}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == live[2:3]
+
+        response = client.get(
+            "/slurk/api/logs/export", query_string={"room_id": room_id}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line) for line in lines] == live[::-1]
+
+        response = client.get(
+            f'/slurk/api/rooms/{room_id}/users/{users.json["id"]}/logs'
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.json == live[::-1]
+
+        response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 1} in response.json["rooms"]
+        response = client.get("/slurk/api/logs", query_string={"room_id": room_id})
+        assert response.json == live
+
+        response = client.delete(
+            f"/slurk/api/rooms/{room_id}",
+            headers={
+                "If-Match": client.get(f"/slurk/api/rooms/{room_id}").headers["ETag"]
+            },
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT, parse_error(response)
+        assert not archive.is_archived(room_id)
+
+    def test_late_logs_are_archived(self, client, layouts, archive, monkeypatch):
+        from slurk.extensions.database import db
+        from slurk.models import Log
+
+        response = client.post(
+            "/slurk/api/rooms",
+            json={"layout_id": layouts.json["id"], "read_only": True},
+        )
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        room_id = response.json["id"]
+
+        ids = []
+        for i in range(3):
+            response = client.post(
+                "/slurk/api/logs",
+                json={"event": "Late Event", "room_id": room_id, "data": {"i": i}},
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            ids.append(response.json["id"])
+
+        # the second log is committed after the logs of the room were selected, but
+        # has a lower ID than the last archived log
+        session = db.create_session()
+        try:
+            late = session.query(Log).get(ids[1])
+            session.expunge(late)
+            session.query(Log).filter_by(id=ids[1]).delete()
+            session.commit()
+        finally:
+            session.close()
+        delete = archive._delete
+
+        def commit_late(session, archived):
+            session.merge(late)
+            session.commit()
+            delete(session, archived)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(archive, "_delete", commit_late)
+            response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 2} in response.json["rooms"]
+        assert archive.pending(room_id) == []
+
+        response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 1} in response.json["rooms"]
+
+        response = client.get(
+            "/slurk/api/logs/export", query_string={"room_id": room_id}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        lines = response.get_data(as_text=True).splitlines()
+        assert sorted(json.loads(line)["id"] for line in lines) == ids
+
+    def test_pages_are_streamed(self, client, layouts, archive, monkeypatch):
+        from slurk.extensions.database import db
+        from slurk.models import Log
+
+        response = client.post(
+            "/slurk/api/rooms",
+            json={"layout_id": layouts.json["id"], "read_only": True},
+        )
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        room_id = response.json["id"]
+
+        def post(i, days):
+            response = client.post(
+                "/slurk/api/logs",
+                json={"event": "Paged Event", "room_id": room_id, "data": {"i": i}},
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            session = db.create_session()
+            try:
+                log = session.query(Log).get(response.json["id"])
+                log.date_created = datetime.utcnow() - timedelta(days=days)
+                session.commit()
+            finally:
+                session.close()
+
+        # the archive gets one member per run, the second one has an older log than
+        # the first one
+        for i in range(3):
+            post(i, days=3 - i)
+        response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 3} in response.json["rooms"]
+        post(3, days=5)
+        post(4, days=1)
+        response = self.archive_logs(client, days=36500)
+        assert {"room_id": room_id, "count": 2} in response.json["rooms"]
+        for i in range(5, 8):
+            post(i, days=0)
+
+        order = [3, 0, 1, 2, 4, 5, 6, 7]
+        response = client.get(
+            "/slurk/api/logs/export", query_string={"room_id": room_id}
+        )
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["data"]["i"] for line in lines] == order
+
+        def list_logs(**query):
+            response = client.get(
+                "/slurk/api/logs", query_string={"room_id": room_id, **query}
+            )
+            assert response.status_code == HTTPStatus.OK, parse_error(response)
+            return response.json
+
+        logs = []
+        page = list_logs(limit=3)
+        while page:
+            logs += page
+            page = list_logs(limit=3, after_id=page[-1]["id"])
+        assert [log["data"]["i"] for log in logs] == order[::-1]
+
+        page = list_logs(limit=3, before_id=logs[-1]["id"])
+        assert [log["data"]["i"] for log in page] == [2, 1, 0]
+        page = list_logs(after_id=logs[0]["id"], before_id=logs[4]["id"])
+        assert [log["data"]["i"] for log in page] == [6, 5, 4]
+
+        # pages of logs newer than the archived ones are listed from the database
+        def unavailable(room_id):
+            raise OSError("archive unavailable")
+
+        monkeypatch.setattr(archive, "read", unavailable)
+        assert list_logs(limit=2) == logs[:2]
+        assert list_logs(limit=1, before_id=logs[2]["id"]) == logs[1:2]
+
+    def test_disabled(self, client):
+        response = client.post("/slurk/api/logs/archive", json={})
+        assert response.status_code == HTTPStatus.NOT_IMPLEMENTED, parse_error(response)
+
+    @pytest.mark.parametrize("content", [{"days": -1}, {"days": "invalid"}])
+    def test_invalid_request(self, client, content, archive):
+        response = client.post("/slurk/api/logs/archive", json=content)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
+
+
+@pytest.mark.depends(on=[f"{PREFIX}::TestPostValid"])
+class TestExport:
+    @pytest.fixture(scope="class")
+    def exported_logs(self, client):
+        logs = []
+        for i in range(3):
+            response = client.post(
+                "/slurk/api/logs", json={"event": "Exported Event", "data": {"i": i}}
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+            logs.append(response.json)
+        return logs
+
+    def test_ndjson(self, client, exported_logs):
+        response = client.get(
+            "/slurk/api/logs/export", query_string={"event": "Exported Event"}
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.mimetype == "application/x-ndjson"
+
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line) for line in lines] == exported_logs
+
+    def test_csv(self, client, exported_logs):
+        import csv
+
+        response = client.get(
+            "/slurk/api/logs/export",
+            query_string={"event": "Exported Event", "format": "csv"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert response.mimetype == "text/csv"
+
+        rows = list(csv.DictReader(response.get_data(as_text=True).splitlines()))
+        assert [int(row["id"]) for row in rows] == [log["id"] for log in exported_logs]
+        assert [json.loads(row["data"]) for row in rows] == [
+            log["data"] for log in exported_logs
+        ]
+
+    @pytest.mark.parametrize("query_string", [{"format": "xml"}, {"room_id": -42}])
+    def test_invalid_request(self, client, query_string):
+        response = client.get("/slurk/api/logs/export", query_string=query_string)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
+
+    def test_unauthenticated_access(self, client):
+        response = client.get(
+            "/slurk/api/logs/export", headers={"Authorization": "Bearer invalid_token"}
+        )
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, parse_error(response)
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestPostValid",
+        "tests/api/test_rooms.py::TestPostValid",
+    ]
+)
+class TestStats:
+    def test_valid_request(self, client, rooms):
+        room_id = rooms.json["id"]
+        for message in ["Hello", "How are you?"]:
+            response = client.post(
+                "/slurk/api/logs",
+                json={
+                    "event": "text_message",
+                    "room_id": room_id,
+                    "data": {"message": message},
+                },
+            )
+            assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        response = client.post(
+            "/slurk/api/logs", json={"event": "join", "room_id": room_id}
+        )
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+
+        response = client.get(
+            "/slurk/api/logs/stats",
+            query_string={"room_id": room_id, "group_by": "room_id,event"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+
+        stats = {entry["event"]: entry for entry in response.json}
+        assert set(stats.keys()) == {"join", "text_message"}
+        assert stats["text_message"]["room_id"] == room_id
+        assert stats["text_message"]["count"] == 2
+        assert stats["text_message"]["message_length"] == len("Hello") + len(
+            "How are you?"
+        )
+        assert stats["text_message"]["first"] <= stats["text_message"]["last"]
+        assert stats["join"]["count"] == 1
+        assert stats["join"]["message_length"] == 0
+
+        response = client.get(
+            "/slurk/api/logs/stats",
+            query_string={"room_id": room_id, "bucket": "1d"},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert sum(entry["count"] for entry in response.json) == 3
+        for entry in response.json:
+            assert entry["bucket"] <= entry["first"]
+            assert "event" not in entry
+
+    @pytest.mark.parametrize(
+        "query_string",
+        [{"group_by": "data"}, {"bucket": "1y"}, {"bucket": "0m"}, {"room_id": -42}],
+    )
+    def test_invalid_request(self, client, query_string):
+        response = client.get("/slurk/api/logs/stats", query_string=query_string)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY, parse_error(
+            response
+        )
@@ -880,3 +880,56 @@ class TestGetLogsByUserByRoomByIdInvalid:
             headers={"Authorization": f'Bearer {tokens.json["id"]}'},
         )
         assert response.status_code == HTTPStatus.UNAUTHORIZED, parse_error(response)
+
+
+@pytest.mark.depends(
+    on=[
+        f"{PREFIX}::TestPostValid",
+        f"{PREFIX}::TestPatchValid",
+        "tests/api/test_users.py::TestPostValid",
+        "tests/api/test_permissions.py::TestPatchValid",
+    ]
+)
+class TestChatCache:
+    def test_membership_and_permissions(self, app, client, rooms, users, permissions):
+        from slurk.views.chat.cache import chat_cache
+
+        room_id = rooms.json["id"]
+        user_id = users.json["id"]
+        with app.app_context():
+            assert user_id in chat_cache.room(room_id).users
+            assert room_id in chat_cache.user(user_id).rooms
+            assert chat_cache.user(user_id).permissions.send_message
+            assert not chat_cache.room(room_id).read_only
+
+        user = client.get(f"/slurk/api/users/{user_id}")
+        response = client.delete(
+            f"/slurk/api/users/{user_id}/rooms/{room_id}",
+            headers={"If-Match": user.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT, parse_error(response)
+        with app.app_context():
+            assert user_id not in chat_cache.room(room_id).users
+            assert room_id not in chat_cache.user(user_id).rooms
+
+        response = client.post(f"/slurk/api/users/{user_id}/rooms/{room_id}")
+        assert response.status_code == HTTPStatus.CREATED, parse_error(response)
+        with app.app_context():
+            assert user_id in chat_cache.room(room_id).users
+            assert room_id in chat_cache.user(user_id).rooms
+
+        response = client.patch(
+            f'/slurk/api/permissions/{permissions.json["id"]}',
+            json={"send_message": False},
+            headers={"If-Match": permissions.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        response = client.patch(
+            f"/slurk/api/rooms/{room_id}",
+            json={"read_only": True},
+            headers={"If-Match": rooms.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        with app.app_context():
+            assert not chat_cache.user(user_id).permissions.send_message
+            assert chat_cache.room(room_id).read_only
@@ -424,3 +424,76 @@ class TestPatchInvalid(TokensTable, InvalidWithEtagTemplate):
 
         response = client.patch(f'/slurk/api/tokens/{tokens.json["id"]}', **content)
         assert response.status_code == status, parse_error(response)
+
+
+@pytest.mark.depends(on=[f"{PREFIX}::TestPostValid", f"{PREFIX}::TestPatchValid"])
+class TestAuthCache:
+    @pytest.fixture
+    def api_token(self, client):
+        permissions = client.post("/slurk/api/permissions", json={"api": True})
+        token = client.post(
+            "/slurk/api/tokens", json={"permissions_id": permissions.json["id"]}
+        )
+        return token, permissions
+
+    @staticmethod
+    def authorized(client, token):
+        response = client.get(
+            "/slurk/api/tokens",
+            headers={"Authorization": f'Bearer {token.json["id"]}'},
+        )
+        return response.status_code != HTTPStatus.UNAUTHORIZED
+
+    def test_cached(self, client, api_token, engine):
+        from sqlalchemy import event
+
+        token, _ = api_token
+        assert self.authorized(client, token)
+
+        statements = []
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", count)
+        try:
+            assert self.authorized(client, token)
+        finally:
+            event.remove(engine, "before_cursor_execute", count)
+        assert not any('JOIN "Token"' in statement for statement in statements)
+
+    def test_patch_permissions(self, client, api_token):
+        token, permissions = api_token
+        assert self.authorized(client, token)
+
+        response = client.patch(
+            f'/slurk/api/permissions/{permissions.json["id"]}',
+            json={"api": False},
+            headers={"If-Match": permissions.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert not self.authorized(client, token)
+
+    def test_patch_token(self, client, api_token):
+        token, _ = api_token
+        assert self.authorized(client, token)
+
+        permissions = client.post("/slurk/api/permissions", json={"api": False})
+        response = client.patch(
+            f'/slurk/api/tokens/{token.json["id"]}',
+            json={"permissions_id": permissions.json["id"]},
+            headers={"If-Match": token.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+        assert not self.authorized(client, token)
+
+    def test_delete_token(self, client, api_token):
+        token, _ = api_token
+        assert self.authorized(client, token)
+
+        response = client.delete(
+            f'/slurk/api/tokens/{token.json["id"]}',
+            headers={"If-Match": token.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT, parse_error(response)
+        assert not self.authorized(client, token)
@@ -0,0 +1,92 @@
+"""Benchmarks, which are skipped unless `SLURK_BENCHMARK` is set.
+
+They rebind the database used by slurk, so run them separately from the other tests:
+
+    $ SLURK_BENCHMARK=1 pytest tests/benchmarks
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import closing, contextmanager
+
+import pytest
+import requests
+
+
+benchmark = pytest.mark.skipif(
+    os.environ.get("SLURK_BENCHMARK") is None,
+    reason="Benchmarks are only run when `SLURK_BENCHMARK` is set",
+)
+
+
+def free_port():
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def run_server(uri, timeout=30, **env):
+    """Runs `tests.benchmarks.socket_server` and yields its URL and admin token
+
+    Additional `SLURK_*` environment variables can be passed as keyword arguments."""
+    env = dict(os.environ, SLURK_SECRET_KEY="benchmark", SLURK_DATABASE_URI=uri, **env)
+    env.pop("SLURK_DEBUG", None)
+
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "tests.benchmarks.socket_server", str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        for line in process.stdout:
+            if line.startswith("admin token:"):
+                admin_token = process.stdout.readline().strip()
+                break
+        else:
+            pytest.fail("Server did not start")
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                requests.get(f"{url}/benchmark/stats", timeout=1)
+                break
+            except requests.ConnectionError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    pytest.fail("Server did not start")
+                time.sleep(0.1)
+        yield url, admin_token
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def api(url, admin_token, method, path, **kwargs):
+    response = requests.request(
+        method,
+        f"{url}/gaelic/slurk/api/{path}",
+        headers={"Authorization": f"Bearer {admin_token}"},
+        **kwargs,
+    )
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+def percentiles(values):
+    """Returns percentiles of durations in seconds as milliseconds"""
+    values = sorted(values)
+    if not values:
+        return {}
+    result = {
+        f"p{p}": round(values[min(len(values) - 1, len(values) * p // 100)] * 1000, 3)
+        for p in (50, 90, 95, 99)
+    }
+    result["max"] = round(values[-1] * 1000, 3)
+    return result
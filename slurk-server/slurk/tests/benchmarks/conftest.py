@@ -0,0 +1,51 @@
+"""Benchmark fixtures."""
+
+import os
+
+import pytest
+
+from slurk import create_app
+
+
+@pytest.fixture(scope="session", params=["sqlite", "postgresql"])
+def bench_engine(request, tmp_path_factory):
+    from sqlalchemy import create_engine
+
+    if request.param == "sqlite":
+        path = tmp_path_factory.mktemp("benchmark") / "slurk.db"
+        engine = create_engine(f"sqlite:///{path}")
+    else:
+        uri = os.environ.get("SLURK_BENCHMARK_POSTGRES_URI")
+        if uri is None:
+            pytest.skip("Pass `SLURK_BENCHMARK_POSTGRES_URI` to benchmark PostgreSQL")
+        engine = create_engine(uri)
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def bench_app(bench_engine):
+    from slurk.extensions.database import Base
+
+    Base.metadata.drop_all(bind=bench_engine)
+    app = create_app(
+        test_config=dict(TESTING=True, SECRET_KEY="benchmark"), engine=bench_engine
+    )
+    yield app
+    Base.metadata.drop_all(bind=bench_engine)
+
+
+@pytest.fixture(scope="session")
+def bench_admin_token(bench_app):
+    from slurk.extensions.database import db
+    from slurk.models import Token
+
+    return Token.get_admin_token(db)
+
+
+@pytest.fixture(scope="session")
+def bench_client(bench_app, bench_admin_token):
+    client = bench_app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {bench_admin_token}"
+    return client
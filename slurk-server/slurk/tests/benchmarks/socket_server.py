@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Runs slurk like the gunicorn gevent worker does and counts its database queries.
+
+    $ python -m tests.benchmarks.socket_server <port>
+
+The configuration is read from the `SLURK_*` environment variables. The number of
+queries executed so far is served as JSON at `/benchmark/stats`. On PostgreSQL,
+`/benchmark/sleep?seconds=<n>` runs a query taking `n` seconds.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import json  # noqa: E402
+import sys  # noqa: E402
+from urllib.parse import parse_qs  # noqa: E402
+
+from gevent import pywsgi  # noqa: E402
+from geventwebsocket.handler import WebSocketHandler  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from slurk import create_app  # noqa: E402
+from slurk.extensions.database import db  # noqa: E402
+
+
+STATS_PATH = "/benchmark/stats"
+SLEEP_PATH = "/benchmark/sleep"
+
+queries = 0
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    global queries
+    queries += 1
+
+
+def with_stats(app):
+    def wrapper(environ, start_response):
+        path = environ.get("PATH_INFO")
+        if path == STATS_PATH:
+            data = dict(queries=queries)
+        elif path == SLEEP_PATH:
+            query = parse_qs(environ.get("QUERY_STRING", ""))
+            seconds = float(query.get("seconds", ["1"])[0])
+            with db.engine.connect() as connection:
+                connection.execute(
+                    text("SELECT pg_sleep(:seconds)"), {"seconds": seconds}
+                )
+            data = dict(seconds=seconds)
+        else:
+            return app(environ, start_response)
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [json.dumps(data).encode()]
+
+    return wrapper
+
+
+if __name__ == "__main__":
+    server = pywsgi.WSGIServer(
+        ("127.0.0.1", int(sys.argv[1])),
+        with_stats(create_app()),
+        handler_class=WebSocketHandler,
+        log=None,
+    )
+    server.serve_forever()
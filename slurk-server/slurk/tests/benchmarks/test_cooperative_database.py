@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Check that socket events are handled while a long query runs on PostgreSQL.
+
+A worker runs a query taking `SLEEP` seconds, while one user sends text messages to
+another one. With `SLURK_DB_COOPERATIVE`, psycopg2 yields to other greenlets and the
+messages are delivered right away. Without it, they wait until the query finished:
+
+    $ SLURK_BENCHMARK=1 SLURK_BENCHMARK_POSTGRES_URI=postgresql://... \\
+        pytest tests/benchmarks/test_cooperative_database.py -s
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+import requests
+import socketio
+
+from . import api, benchmark, percentiles, run_server
+
+
+SLEEP = 3
+# Seconds between two messages while the query runs
+INTERVAL = 0.1
+
+
+def connect(url, token, user, on_message=None):
+    client = socketio.Client()
+    if on_message is not None:
+        client.on("text_message", on_message)
+    client.connect(
+        url,
+        headers={"Authorization": f"Bearer {token}", "user": str(user)},
+        transports=["websocket"],
+        socketio_path="/gaelic/socket.io",
+    )
+    return client
+
+
+def measure(url, admin_token):
+    """Sends messages during a long query and returns their delivery latencies"""
+    layout = api(url, admin_token, "POST", "layouts", json={"title": "Cooperative"})
+    room = api(url, admin_token, "POST", "rooms", json={"layout_id": layout["id"]})
+    permissions = api(
+        url, admin_token, "POST", "permissions", json={"send_message": True}
+    )
+    users = []
+    for name in ("Sender", "Receiver"):
+        token = api(
+            url,
+            admin_token,
+            "POST",
+            "tokens",
+            json={"permissions_id": permissions["id"], "room_id": room["id"]},
+        )
+        user = api(
+            url,
+            admin_token,
+            "POST",
+            "users",
+            json={"name": name, "token_id": token["id"]},
+        )
+        users.append((token["id"], user["id"]))
+
+    latencies = []
+
+    def on_message(data):
+        latencies.append(time.time() - float(data["message"]))
+
+    sender = connect(url, *users[0])
+    receiver = connect(url, *users[1], on_message=on_message)
+    try:
+        query = threading.Thread(
+            target=requests.get,
+            args=(f"{url}/benchmark/sleep",),
+            kwargs=dict(params={"seconds": SLEEP}),
+        )
+        start = time.monotonic()
+        query.start()
+        # Give the query time to start
+        time.sleep(0.5)
+        sent = 0
+        while time.monotonic() - start < SLEEP - 0.5:
+            sender.emit("text", {"room": room["id"], "message": str(time.time())})
+            sent += 1
+            time.sleep(INTERVAL)
+        query.join()
+        time.sleep(1)
+    finally:
+        sender.disconnect()
+        receiver.disconnect()
+
+    return dict(sent=sent, delivered=len(latencies), latency_ms=percentiles(latencies))
+
+
+@benchmark
+def test_cooperative_database():
+    uri = os.environ.get("SLURK_BENCHMARK_POSTGRES_URI")
+    if uri is None:
+        pytest.skip("Pass `SLURK_BENCHMARK_POSTGRES_URI` to benchmark PostgreSQL")
+
+    report = {"query_seconds": SLEEP}
+    for name, cooperative in (("cooperative", "1"), ("blocking", "0")):
+        with run_server(uri, SLURK_DB_COOPERATIVE=cooperative) as (url, admin_token):
+            report[name] = measure(url, admin_token)
+    print(json.dumps(report, indent=2))
+
+    cooperative = report["cooperative"]
+    assert cooperative["delivered"] == cooperative["sent"]
+    # Messages are not held back until the query finished
+    assert cooperative["latency_ms"]["max"] < SLEEP * 1000 / 2
+    assert report["blocking"]["latency_ms"]["max"] > cooperative["latency_ms"]["max"]
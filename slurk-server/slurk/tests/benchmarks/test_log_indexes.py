@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""Check that the log endpoints are answered from an index on a large `Log` table."""
+
+from datetime import datetime, timedelta
+from http import HTTPStatus
+import os
+import random
+import time
+
+import pytest
+
+from .. import parse_error
+from . import benchmark
+
+
+LOG_ROWS = int(os.environ.get("SLURK_BENCHMARK_LOG_ROWS", "2000000"))
+ROOMS = 1000
+USERS = 2000
+CHUNK_SIZE = 50000
+
+
+@pytest.fixture(scope="module")
+def seeded(bench_app, bench_engine):
+    from slurk.models import Layout, Log, Permissions, Room, Token, User
+
+    rng = random.Random(42)
+    with bench_engine.begin() as connection:
+        connection.execute(
+            Layout.__table__.insert(),
+            dict(
+                id=1,
+                title="Benchmark",
+                show_users=True,
+                show_latency=True,
+                read_only=False,
+                openvidu_settings={},
+            ),
+        )
+        connection.execute(
+            Room.__table__.insert(),
+            [dict(id=i, layout_id=1, read_only=False) for i in range(1, ROOMS + 1)],
+        )
+        permissions_id = connection.execute(
+            Permissions.__table__.insert(),
+            dict(
+                api=False,
+                send_message=True,
+                send_html_message=False,
+                send_image=False,
+                send_command=False,
+                send_privately=True,
+                receive_bounding_box=False,
+                broadcast=False,
+            ),
+        ).inserted_primary_key[0]
+        connection.execute(
+            Token.__table__.insert(),
+            dict(
+                id="benchmark",
+                permissions_id=permissions_id,
+                registrations_left=-1,
+                openvidu_settings={},
+            ),
+        )
+        connection.execute(
+            User.__table__.insert(),
+            [
+                dict(id=i, name=f"User {i}", token_id="benchmark")
+                for i in range(1, USERS + 1)
+            ],
+        )
+
+    start = datetime(2022, 1, 1)
+    for offset in range(0, LOG_ROWS, CHUNK_SIZE):
+        rows = []
+        for i in range(offset, min(offset + CHUNK_SIZE, LOG_ROWS)):
+            private = rng.random() < 0.1
+            rows.append(
+                dict(
+                    event="text_message",
+                    user_id=rng.randint(1, USERS),
+                    room_id=rng.randint(1, ROOMS),
+                    receiver_id=rng.randint(1, USERS) if private else None,
+                    data=dict(message=f"Message {i}", html=False),
+                    date_created=start + timedelta(milliseconds=i),
+                )
+            )
+        with bench_engine.begin() as connection:
+            connection.execute(Log.__table__.insert(), rows)
+
+    with bench_engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    return dict(
+        room_id=rng.randint(1, ROOMS),
+        user_id=rng.randint(1, USERS),
+        log_id=rng.randint(1, LOG_ROWS),
+    )
+
+
+@pytest.fixture
+def log_statements(bench_engine):
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        if statement.lstrip().upper().startswith("SELECT") and '"Log"' in statement:
+            statements.append((statement, parameters))
+
+    event.listen(bench_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(bench_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def query_plan(engine, statement, parameters):
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            )
+            return [row[-1] for row in rows]
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+        return [row[0] for row in rows]
+
+
+def assert_index_backed(engine, plan):
+    for line in plan:
+        if engine.dialect.name == "sqlite":
+            assert not (
+                line.startswith("SCAN") and "Log" in line and "INDEX" not in line
+            ), plan
+            assert "TEMP B-TREE" not in line, plan
+        else:
+            assert 'Seq Scan on "Log"' not in line, plan
+
+
+@benchmark
+class TestLogIndexes:
+    URLS = [
+        "/slurk/api/logs",
+        "/slurk/api/logs?after_id={log_id}",
+        "/slurk/api/rooms/{room_id}/users/{user_id}/logs",
+        "/slurk/api/logs?room_id={room_id}",
+        "/slurk/api/logs?user_id={user_id}",
+        "/slurk/api/logs?receiver_id={user_id}",
+    ]
+
+    @pytest.mark.parametrize("url", URLS)
+    def test_index_backed(
+        self, bench_client, bench_engine, seeded, log_statements, url
+    ):
+        start = time.perf_counter()
+        response = bench_client.get(url.format(**seeded))
+        duration = time.perf_counter() - start
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+
+        print(
+            f"{bench_engine.dialect.name} {url}: {len(response.json)} logs in {duration * 1000:.1f}ms"
+        )
+
+        assert len(log_statements) > 0
+        for statement, parameters in log_statements:
+            assert_index_backed(
+                bench_engine, query_plan(bench_engine, statement, parameters)
+            )
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""Measure how many concurrent rooms a single slurk worker sustains.
+
+A worker is started against a local database and clients log in with tokens, connect
+through Socket.IO and send a mix of `text`, `keypress` and `mouse` events. The report
+is printed as JSON and written to `SLURK_BENCHMARK_REPORT` if it is set, so runs can be
+compared across commits:
+
+    $ SLURK_BENCHMARK=1 SLURK_BENCHMARK_CLIENTS=200 SLURK_BENCHMARK_ROOMS=100 \\
+        SLURK_BENCHMARK_REPORT=load.json pytest tests/benchmarks/test_socket_load.py -s
+"""
+
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+
+import pytest
+import requests
+import socketio
+
+from . import api, benchmark, percentiles, run_server
+
+
+CLIENTS = int(os.environ.get("SLURK_BENCHMARK_CLIENTS", "50"))
+ROOMS = int(os.environ.get("SLURK_BENCHMARK_ROOMS", "10"))
+DURATION = float(os.environ.get("SLURK_BENCHMARK_DURATION", "10"))
+# Events sent by every client per second
+RATE = float(os.environ.get("SLURK_BENCHMARK_RATE", "5"))
+# Share of the sent events, typing sends a keypress for starting and stopping
+MIX = {"text": 0.2, "keypress": 0.5, "mouse": 0.3}
+# Time to wait for events in flight after the clients stopped sending
+SETTLE = 2
+
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    uri = os.environ.get("SLURK_BENCHMARK_DATABASE_URI")
+    if uri is None:
+        uri = f"sqlite:///{tmp_path_factory.mktemp('load') / 'slurk.db'}"
+    with run_server(uri) as (url, admin_token):
+        yield url, admin_token, uri.split(":", 1)[0]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class LoadClient:
+    """A user logging in with a token and sending events to its room"""
+
+    def __init__(self, url, token, name, room_id, stats):
+        self.url = url
+        self.room_id = room_id
+        self.name = name
+        self.stats = stats
+        self.random = random.Random(name)
+
+        # Logging in sets the session cookie used by the Socket.IO connection
+        session = requests.Session()
+        response = session.get(
+            f"{url}/gaelic/login/",
+            params={"token": token, "name": name},
+            allow_redirects=False,
+        )
+        assert response.status_code == 302, f"Login failed for {name}"
+        self.cookie = "; ".join(f"{k}={v}" for k, v in session.cookies.items())
+
+        self.client = socketio.Client()
+        for event in ("text_message", "mouse", "start_typing", "stop_typing"):
+            self.client.on(event, lambda data, event=event: self.receive(event, data))
+
+    def connect(self):
+        self.client.connect(
+            self.url,
+            headers={"Cookie": self.cookie},
+            transports=["websocket"],
+            socketio_path="/gaelic/socket.io",
+        )
+
+    def receive(self, event, data):
+        now = time.time()
+        with self.stats["lock"]:
+            self.stats["delivered"][event] += 1
+        sent = None
+        if event == "text_message":
+            sent = data.get("message", "")
+        elif event == "mouse":
+            sent = data.get("element_id") or ""
+        if sent and sent.startswith("sent:"):
+            self.stats["latencies"].append(now - float(sent[5:]))
+
+    def run(self, until):
+        events, weights = zip(*MIX.items())
+        typing = False
+        next_send = time.monotonic() + self.random.random() / RATE
+        while next_send < until:
+            time.sleep(max(next_send - time.monotonic(), 0))
+            event = self.random.choices(events, weights)[0]
+            stamp = f"sent:{time.time()}"
+            if event == "text":
+                payload = {"room": self.room_id, "message": stamp}
+            elif event == "keypress":
+                typing = not typing
+                payload = {"typing": typing}
+            else:
+                payload = {
+                    "room": self.room_id,
+                    "type": "move",
+                    "coordinates": {
+                        "x": self.random.randrange(800),
+                        "y": self.random.randrange(600),
+                    },
+                    "element_id": stamp,
+                }
+            self.client.emit(event, payload)
+            with self.stats["lock"]:
+                self.stats["sent"][event] += 1
+            next_send += self.random.expovariate(RATE)
+        if typing:
+            self.client.emit("keypress", {"typing": False})
+            with self.stats["lock"]:
+                self.stats["sent"]["keypress"] += 1
+
+
+@benchmark
+def test_socket_load(server):
+    url, admin_token, database = server
+
+    layout = api(url, admin_token, "POST", "layouts", json={"title": "Load"})
+    permissions = api(
+        url, admin_token, "POST", "permissions", json={"send_message": True}
+    )
+    rooms = [
+        api(url, admin_token, "POST", "rooms", json={"layout_id": layout["id"]})["id"]
+        for _ in range(ROOMS)
+    ]
+
+    stats = {
+        "sent": dict.fromkeys(MIX, 0),
+        "delivered": dict.fromkeys(
+            ("text_message", "mouse", "start_typing", "stop_typing"), 0
+        ),
+        "latencies": [],
+        "lock": threading.Lock(),
+    }
+    clients = []
+    for i in range(CLIENTS):
+        room_id = rooms[i % ROOMS]
+        token = api(
+            url,
+            admin_token,
+            "POST",
+            "tokens",
+            json={"permissions_id": permissions["id"], "room_id": room_id},
+        )
+        clients.append(LoadClient(url, token["id"], f"Client {i}", room_id, stats))
+
+    start = time.monotonic()
+    for client in clients:
+        client.connect()
+    connect_seconds = time.monotonic() - start
+
+    try:
+        queries = requests.get(f"{url}/benchmark/stats").json()["queries"]
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=client.run, args=(start + DURATION,))
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+        time.sleep(SETTLE)
+        queries = requests.get(f"{url}/benchmark/stats").json()["queries"] - queries
+    finally:
+        for client in clients:
+            client.client.disconnect()
+
+    sent = sum(stats["sent"].values())
+    delivered = sum(stats["delivered"].values())
+    report = {
+        "commit": git_commit(),
+        "database": database,
+        "clients": CLIENTS,
+        "rooms": ROOMS,
+        "duration": DURATION,
+        "rate": RATE,
+        "mix": MIX,
+        "connect_seconds": round(connect_seconds, 3),
+        "sent": stats["sent"],
+        "delivered": stats["delivered"],
+        "sent_per_second": round(sent / elapsed, 1),
+        "delivered_per_second": round(delivered / elapsed, 1),
+        "latency_ms": percentiles(stats["latencies"]),
+        "queries": queries,
+        "queries_per_event": round(queries / sent, 3) if sent else None,
+    }
+
+    print(json.dumps(report, indent=2))
+    path = os.environ.get("SLURK_BENCHMARK_REPORT")
+    if path:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    assert sent > 0
+    assert stats["delivered"]["text_message"] > 0
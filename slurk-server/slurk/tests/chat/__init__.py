@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""Tests for the Socket.IO events of the chat."""
+
+
+def create_user(client, rooms, **permissions):
+    """Creates a user in `rooms` with `permissions` and returns its token and ID"""
+    permissions = client.post("/slurk/api/permissions", json=permissions)
+    token = client.post(
+        "/slurk/api/tokens",
+        json={"permissions_id": permissions.json["id"], "room_id": rooms.json["id"]},
+    )
+    user = client.post(
+        "/slurk/api/users", json={"name": "Bot", "token_id": token.json["id"]}
+    )
+    return token.json["id"], user.json["id"]
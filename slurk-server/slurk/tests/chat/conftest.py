@@ -0,0 +1,50 @@
+"""Socket.IO test fixtures."""
+
+import pytest
+
+
+@pytest.fixture
+def connect(app, monkeypatch):
+    """Returns a function connecting a Socket.IO test client as a user"""
+    from slurk.extensions.events import socketio
+
+    # Newer versions of python-socketio send events to rooms as encoded Engine.IO
+    # packets, which are not recorded by the test client
+    server = socketio.server
+
+    def send_eio_packet(eio_sid, eio_packet):
+        server._send_packet(
+            eio_sid, server.packet_class(encoded_packet=eio_packet.data)
+        )
+
+    monkeypatch.setattr(server, "_send_eio_packet", send_eio_packet, raising=False)
+
+    clients = []
+
+    def connect(token, user):
+        client = socketio.test_client(
+            app, headers={"Authorization": f"Bearer {token}", "user": str(user)}
+        )
+        clients.append(client)
+        return client
+
+    yield connect
+
+    for client in clients:
+        if client.is_connected():
+            client.disconnect()
+
+
+@pytest.fixture
+def statements(engine):
+    """Records the SQL statements executed while the test runs"""
+    from sqlalchemy import event
+
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(engine, "before_cursor_execute", record)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""Test the delivery of `bounding_box` to users with `receive_bounding_box`."""
+
+from http import HTTPStatus
+
+import pytest
+
+from .. import parse_error
+from . import create_user
+
+
+def bounding_boxes(socket):
+    return [
+        message["args"][0]
+        for message in socket.get_received()
+        if message["name"] == "bounding_box"
+    ]
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+class TestBoundingBox:
+    @pytest.fixture
+    def users(self, client, rooms):
+        return dict(
+            sender=create_user(client, rooms, send_message=True),
+            receiver=create_user(client, rooms, receive_bounding_box=True),
+            other=create_user(client, rooms, send_message=True),
+        )
+
+    @pytest.fixture
+    def sockets(self, connect, users):
+        sockets = {name: connect(*user) for name, user in users.items()}
+        for socket in sockets.values():
+            assert socket.is_connected()
+            socket.get_received()
+        return sockets
+
+    @staticmethod
+    def add_box(socket, room_id):
+        coordinates = dict(left=0.1, top=0.1, bottom=0.2, right=0.2)
+        assert (
+            socket.emit(
+                "bounding_box",
+                {"room": room_id, "type": "add", "coordinates": coordinates},
+                callback=True,
+            )
+            is True
+        )
+
+    def test_receive_permission(self, sockets, rooms):
+        room_id = rooms.json["id"]
+        self.add_box(sockets["sender"], room_id)
+
+        boxes = bounding_boxes(sockets["receiver"])
+        assert len(boxes) == 1
+        assert boxes[0]["room"] == room_id
+        assert boxes[0]["type"] == "add"
+        assert bounding_boxes(sockets["sender"]) == []
+        assert bounding_boxes(sockets["other"]) == []
+
+    def test_leave_room(self, client, sockets, users, rooms):
+        room_id = rooms.json["id"]
+        _, receiver_id = users["receiver"]
+        response = client.get(f"/slurk/api/users/{receiver_id}")
+        response = client.delete(
+            f"/slurk/api/users/{receiver_id}/rooms/{room_id}",
+            headers={"If-Match": response.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT, parse_error(response)
+
+        self.add_box(sockets["sender"], room_id)
+        assert bounding_boxes(sockets["receiver"]) == []
+
+    def test_update_permissions(self, client, sockets, users, rooms):
+        room_id = rooms.json["id"]
+        token_id, _ = users["other"]
+        permissions_id = client.get(f"/slurk/api/tokens/{token_id}").json[
+            "permissions_id"
+        ]
+        response = client.get(f"/slurk/api/permissions/{permissions_id}")
+        response = client.patch(
+            f"/slurk/api/permissions/{permissions_id}",
+            json={"receive_bounding_box": True},
+            headers={"If-Match": response.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+
+        self.add_box(sockets["sender"], room_id)
+        assert len(bounding_boxes(sockets["other"])) == 1
+
+    @pytest.mark.parametrize("method", ["put", "patch"])
+    def test_update_token(self, client, sockets, users, rooms, method):
+        room_id = rooms.json["id"]
+        _, user_id = users["other"]
+        permissions = client.post(
+            "/slurk/api/permissions", json={"receive_bounding_box": True}
+        )
+        token = client.post(
+            "/slurk/api/tokens",
+            json={"permissions_id": permissions.json["id"], "room_id": room_id},
+        )
+        response = client.get(f"/slurk/api/users/{user_id}")
+        response = getattr(client, method)(
+            f"/slurk/api/users/{user_id}",
+            json={"name": "Bot", "token_id": token.json["id"]},
+            headers={"If-Match": response.headers["ETag"]},
+        )
+        assert response.status_code == HTTPStatus.OK, parse_error(response)
+
+        self.add_box(sockets["sender"], room_id)
+        assert len(bounding_boxes(sockets["other"])) == 1
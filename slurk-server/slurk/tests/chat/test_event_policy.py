@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Test the batching of events configured by the event policy of a layout."""
+
+import time
+from unittest import mock
+
+import pytest
+
+from . import create_user
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+def test_idle_batch_is_flushed(app, client, connect):
+    from slurk.views.chat.policy import event_policy
+
+    layout = client.post(
+        "/slurk/api/layouts",
+        json={"title": "Batched", "event_policy": {"mouse": {"batch_interval": 1}}},
+    )
+    room = client.post("/slurk/api/rooms", json={"layout_id": layout.json["id"]})
+    socket = connect(*create_user(client, room))
+    for x in range(3):
+        socket.emit(
+            "mouse",
+            {"room": room.json["id"], "type": "move", "coordinates": {"x": x}},
+        )
+
+    def mouse_logs():
+        response = client.get(
+            "/slurk/api/logs",
+            query_string={"room_id": room.json["id"], "event": "mouse"},
+        )
+        return response.json
+
+    with app.app_context():
+        event_policy.flush_expired()
+    assert mouse_logs() == []
+
+    # The user stays idle, the batch is written once its interval has passed
+    later = time.monotonic() + 2
+    with app.app_context(), mock.patch("time.monotonic", return_value=later):
+        event_policy.flush_expired()
+    (log,) = mouse_logs()
+    assert [s["coordinates"]["x"] for s in log["data"]["samples"]] == [0, 1, 2]
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Test the delta encoding of typed messages."""
+
+from unittest import mock
+
+import pytest
+
+from slurk.views.chat.live_typing import apply_ops, diff_ops
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        ("", ""),
+        ("", "Hello"),
+        ("Hello", ""),
+        ("Hello", "Hello World"),
+        ("Hello World", "Hello"),
+        ("Hello World", "Hello new World"),
+        ("aaaa", "aa"),
+        ("abc", "xyz"),
+        ("Hi 😀 there", "Hi 😁 there"),
+        ("😀", ""),
+    ],
+)
+def test_diff_ops(old, new):
+    assert apply_ops(old, diff_ops(old, new)) == new
+
+
+def test_utf16_positions():
+    # positions are counted like `String.length` in the JavaScript plugin, which
+    # counts the emoji twice
+    assert diff_ops("😀 a", "😀 ab") == [dict(op="insert", pos=4, text="b")]
+    assert apply_ops("😀 a", [dict(op="insert", pos=4, text="b")]) == "😀 ab"
+    assert apply_ops("😀 a", [dict(op="delete", pos=0, count=2)]) == " a"
+    # the plugin may split surrogate pairs, e.g. when replacing 😀 by 😁
+    ops = [dict(op="delete", pos=1, count=1), dict(op="insert", pos=1, text="\ude01")]
+    assert apply_ops("😀", ops) == "😁"
+    with pytest.raises(ValueError):
+        apply_ops("😀", [dict(op="insert", pos=3, text="a")])
+
+
+@pytest.mark.parametrize(
+    "ops",
+    [
+        "insert",
+        ["insert"],
+        [dict(op="insert", pos=6, text="a")],
+        [dict(op="insert", pos=0, text=1)],
+        [dict(op="delete", pos=0, count=6)],
+        [dict(op="delete", pos=True, count=1)],
+        [dict(op="replace", pos=0, text="a")],
+    ],
+)
+def test_apply_invalid_ops(ops):
+    with pytest.raises(ValueError):
+        apply_ops("Hello", ops)
+
+
+@pytest.mark.depends(on=["tests/api/test_users.py::TestPostValid"])
+class TestLiveTyping:
+    @pytest.fixture
+    def live_typing(self, app, users, rooms, monkeypatch):
+        from slurk.models import User
+        from slurk.views.chat.live_typing import LiveTyping
+
+        monkeypatch.setitem(app.config, "TYPED_MESSAGE_RATE", 10)
+        monkeypatch.setitem(app.config, "TYPED_MESSAGE_SNAPSHOT_INTERVAL", 3)
+        with app.app_context():
+            user = app.session.query(User).get(users.json["id"])
+            with mock.patch("slurk.views.chat.live_typing.socketio") as socketio_mock:
+                yield LiveTyping(), user, socketio_mock
+
+    @staticmethod
+    def sent(socketio_mock):
+        return [call.args[1] for call in socketio_mock.emit.call_args_list]
+
+    def test_deltas_and_snapshots(self, live_typing):
+        live_typing, user, socketio_mock = live_typing
+
+        def insert(pos, text):
+            return dict(op="insert", pos=pos, text=text)
+
+        with mock.patch("slurk.views.chat.live_typing.time.monotonic") as monotonic:
+            for seq, (time, op) in enumerate(
+                [(1, insert(0, "Hi")), (2, insert(2, " a")), (3, insert(4, "ll"))],
+                start=1,
+            ):
+                monotonic.return_value = time
+                assert live_typing.update(user, dict(seq=seq, ops=[op])) is True
+
+            monotonic.return_value = 4
+            assert live_typing.update(user, dict(seq=4, ops=[insert(6, "!")])) is True
+
+        sent = self.sent(socketio_mock)
+        assert [message["seq"] for message in sent] == [1, 2, 3, 4]
+        assert sent[0]["text"] == "Hi"
+        assert sent[1]["ops"] == [insert(2, " a")]
+        assert sent[2]["ops"] == [insert(4, "ll")]
+        assert sent[3]["text"] == "Hi all!"
+
+    def test_out_of_sequence(self, live_typing):
+        live_typing, user, socketio_mock = live_typing
+        ops = [dict(op="insert", pos=0, text="Hi")]
+
+        assert live_typing.update(user, dict(seq=2, ops=ops)) == (
+            False,
+            "Expected sequence number 1",
+        )
+        assert live_typing.update(user, dict(seq=5, text="Hi")) is True
+        assert live_typing.update(user, dict(seq=6, ops=ops)) is True
+        assert live_typing.text(user.id) == "HiHi"
+
+    def test_throttle(self, live_typing):
+        live_typing, user, socketio_mock = live_typing
+
+        with mock.patch("slurk.views.chat.live_typing.time.monotonic") as monotonic:
+            monotonic.return_value = 10
+            live_typing.update(user, dict(text="H"))
+            for i, char in enumerate("ello", start=1):
+                monotonic.return_value = 10 + i * 0.01
+                live_typing.update(
+                    user, dict(ops=[dict(op="insert", pos=i, text=char)])
+                )
+
+            assert len(socketio_mock.emit.call_args_list) == 1
+            socketio_mock.start_background_task.assert_called_once()
+            task, *args = socketio_mock.start_background_task.call_args.args
+            task(*args)
+
+        sent = self.sent(socketio_mock)
+        assert len(sent) == 2
+        assert sent[1]["ops"] == [dict(op="insert", pos=1, text="ello")]
+
+        # Clearing the text is sent immediately
+        live_typing.update(user, dict(text=""))
+        assert self.sent(socketio_mock)[-1]["text"] == ""
+
+    def test_forget(self, live_typing):
+        live_typing, user, socketio_mock = live_typing
+
+        with mock.patch("slurk.views.chat.live_typing.time.monotonic") as monotonic:
+            monotonic.return_value = 10
+            live_typing.update(user, dict(text="H"))
+            monotonic.return_value = 10.01
+            live_typing.update(user, dict(ops=[dict(op="insert", pos=1, text="i")]))
+            task, *args = socketio_mock.start_background_task.call_args.args
+
+            # the user left a room before the pending update was sent
+            live_typing.forget(user.id)
+            task(*args)
+
+        assert len(self.sent(socketio_mock)) == 1
+        assert live_typing.text(user.id) == ""
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Test sharing events between workers through a message queue."""
+
+import os
+import queue
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from unittest import mock
+
+import pytest
+import requests
+import socketio
+
+from slurk.extensions.message_queue import LocalQueue, client_manager, on_message
+
+ADMIN_TOKEN = "00000000-0000-0000-0000-000000000000"
+TIMEOUT = 10
+
+
+@pytest.fixture
+def queue_url():
+    # Unix socket paths are limited to about 100 characters
+    path = tempfile.mkdtemp(prefix="slurk-")
+    yield f"local://{path}"
+    shutil.rmtree(path)
+
+
+def test_client_manager(queue_url):
+    assert client_manager(None) is None
+    assert isinstance(client_manager(queue_url), LocalQueue)
+    with pytest.raises(ValueError):
+        client_manager("amqp://localhost")
+
+
+def test_local_queue(queue_url, monkeypatch):
+    monkeypatch.setattr("slurk.extensions.message_queue._handlers", {})
+    receiver = LocalQueue(queue_url, channel="test")
+    other_channel = LocalQueue(queue_url, channel="other")
+    sender = LocalQueue(queue_url, channel="test")
+    messages = receiver._listen()
+
+    handler = mock.Mock()
+    on_message("test")(handler)
+
+    sender.publish_message("test", {"value": 42})
+    sender._publish({"method": "emit", "event": "text_message"})
+
+    assert next(messages) == {"method": "emit", "event": "text_message"}
+    handler.assert_called_once_with({"value": 42})
+
+    # Messages are not delivered to the sender or to other channels
+    sender.socket.settimeout(0.1)
+    other_channel.socket.settimeout(0.1)
+    with pytest.raises(socket.timeout):
+        sender.socket.recv(1024)
+    with pytest.raises(socket.timeout):
+        other_channel.socket.recv(1024)
+
+
+def free_port():
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_worker(env):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "tests.chat.worker", str(port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        try:
+            requests.get(f"{url}/gaelic/slurk/api/layouts", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                pytest.fail("Worker did not start")
+            time.sleep(0.1)
+
+
+@pytest.fixture
+def workers(queue_url, tmp_path):
+    env = dict(
+        os.environ,
+        SLURK_DEBUG="1",
+        SLURK_SECRET_KEY="message-queue",
+        SLURK_DATABASE_URI=f"sqlite:///{tmp_path / 'slurk.db'}",
+        SLURK_MESSAGE_QUEUE=queue_url,
+    )
+    # Workers are started one after another, so only the first one creates the tables
+    processes, urls = [], []
+    try:
+        for _ in range(3):
+            process, url = start_worker(env)
+            processes.append(process)
+            urls.append(url)
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+def api(url, method, path, **kwargs):
+    response = requests.request(
+        method,
+        f"{url}/gaelic/slurk/api/{path}",
+        headers={"Authorization": f"Bearer {ADMIN_TOKEN}"},
+        **kwargs,
+    )
+    response.raise_for_status()
+    return response.json() if response.content else None
+
+
+def connect(url, token, user):
+    events = queue.Queue()
+    client = socketio.Client()
+    for event in ("joined_room", "text_message"):
+        client.on(event, lambda data, event=event: events.put((event, data)))
+    client.connect(
+        url,
+        headers={"Authorization": f"Bearer {token}", "user": str(user)},
+        transports=["websocket"],
+        socketio_path="/gaelic/socket.io",
+    )
+    return client, events
+
+
+def wait_for(events, event, **expected):
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        name, data = events.get(timeout=max(deadline - time.monotonic(), 0))
+        if name == event and expected.items() <= data.items():
+            return data
+
+
+def test_workers(workers):
+    first, second, third = workers
+
+    layout = api(first, "POST", "layouts", json={"title": "Queue"})
+    room = api(first, "POST", "rooms", json={"layout_id": layout["id"]})
+    permissions = api(first, "POST", "permissions", json={"send_message": True})
+    users = []
+    for i in range(2):
+        token = api(
+            first,
+            "POST",
+            "tokens",
+            json={"permissions_id": permissions["id"], "room_id": room["id"]},
+        )
+        user = api(
+            first, "POST", "users", json={"name": f"User {i}", "token_id": token["id"]}
+        )
+        users.append((token["id"], user["id"]))
+
+    sender, sender_events = connect(first, *users[0])
+    receiver, receiver_events = connect(second, *users[1])
+    try:
+        # `emit(..., room=...)` reaches users connected to other workers
+        assert sender.call("text", {"room": room["id"], "message": "Hello"}) is True
+        wait_for(receiver_events, "text_message", room=room["id"], message="Hello")
+
+        # `join_room` works for users connected to other workers
+        other_room = api(third, "POST", "rooms", json={"layout_id": layout["id"]})
+        api(third, "POST", f"users/{users[0][1]}/rooms/{other_room['id']}")
+        api(third, "POST", f"users/{users[1][1]}/rooms/{other_room['id']}")
+        wait_for(sender_events, "joined_room", room=other_room["id"])
+        wait_for(receiver_events, "joined_room", room=other_room["id"])
+
+        assert (
+            sender.call("text", {"room": other_room["id"], "message": "Moved"}) is True
+        )
+        wait_for(
+            receiver_events, "text_message", room=other_room["id"], message="Moved"
+        )
+    finally:
+        sender.disconnect()
+        receiver.disconnect()
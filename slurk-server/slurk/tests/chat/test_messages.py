@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Test the IDs passed with messages."""
+
+import pytest
+
+from . import create_user
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+class TestMessageIds:
+    @pytest.fixture
+    def room(self, client, rooms):
+        return client.post(
+            "/slurk/api/rooms", json={"layout_id": rooms.json["layout_id"]}
+        )
+
+    def test_left_room(self, client, room, connect):
+        token_id, user_id = create_user(client, room, send_message=True)
+        socket = connect(token_id, user_id)
+        room_id = room.json["id"]
+
+        def send(room):
+            payload = {"room": room, "message": "Hello"}
+            return socket.emit("text", payload, callback=True)
+
+        assert send(room_id) is True
+        # cache a room entry for the string
+        assert send(str(room_id)) is not True
+
+        user = client.get(f"/slurk/api/users/{user_id}")
+        response = client.delete(
+            f"/slurk/api/users/{user_id}/rooms/{room_id}",
+            headers={"If-Match": user.headers["ETag"]},
+        )
+        assert response.status_code == 204, response.json
+
+        for room in (room_id, str(room_id), float(room_id), [room_id]):
+            assert send(room) is not True
+
+    @pytest.mark.parametrize("key", ["receiver_id", "impersonate"])
+    @pytest.mark.parametrize("value", ["1", [1], {"id": 1}, True])
+    def test_invalid_user(self, client, room, connect, key, value):
+        socket = connect(
+            *create_user(client, room, send_message=True, send_privately=True)
+        )
+        payload = {"room": room.json["id"], "message": "Hello", key: value}
+        assert socket.emit("text", payload, callback=True) == [
+            False,
+            f'"{key}" must be an ID',
+        ]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""Test the handler metrics served at `/metrics`."""
+
+from http import HTTPStatus
+import re
+
+import pytest
+
+from . import create_user
+
+
+@pytest.fixture
+def metrics(app):
+    from slurk.extensions.events import socketio
+    from slurk.extensions.metrics import metrics
+
+    metrics.clear()
+    metrics.enable(app, socketio)
+    yield metrics
+    metrics.disable()
+    metrics.clear()
+
+
+def sample(text, name, **labels):
+    """Returns the value of the sample `name` with `labels` in the Prometheus `text`"""
+    for line in text.splitlines():
+        match = re.fullmatch(r"([a-z_]+)(?:\{(.*)\})? (\S+)", line)
+        if match is None or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'([a-z_]+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if found == labels:
+            return float(match.group(3))
+    return None
+
+
+def test_disabled(client):
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.NOT_FOUND, response.data
+
+
+def test_http(client, metrics):
+    assert client.get("/slurk/api/layouts").status_code == HTTPStatus.OK
+
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK, response.data
+    assert response.mimetype == "text/plain"
+
+    text = response.get_data(as_text=True)
+    labels = dict(method="GET", rule="/slurk/api/layouts")
+    assert sample(text, "slurk_http_duration_seconds_count", **labels) == 1
+    assert sample(text, "slurk_http_database_seconds_sum", **labels) > 0
+    assert sample(text, "slurk_http_emits_sum", **labels) == 0
+    assert (
+        sample(text, "slurk_http_payload_bytes_bucket", le="+Inf", **labels)
+        == sample(text, "slurk_http_payload_bytes_bucket", le="64", **labels)
+        == 1
+    )
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+def test_socket(client, rooms, connect, metrics):
+    socket = connect(*create_user(client, rooms, send_message=True))
+    assert socket.is_connected()
+    assert (
+        socket.emit(
+            "text", {"room": rooms.json["id"], "message": "Hello"}, callback=True
+        )
+        is True
+    )
+
+    text = client.get("/metrics").get_data(as_text=True)
+    assert sample(text, "slurk_socket_duration_seconds_count", event="connect") == 1
+    assert sample(text, "slurk_socket_duration_seconds_count", event="text") == 1
+    assert sample(text, "slurk_socket_database_seconds_sum", event="text") > 0
+    assert sample(text, "slurk_socket_emits_sum", event="text") == 1
+    assert sample(text, "slurk_socket_emits_bucket", event="text", le="0") == 0
+    assert sample(text, "slurk_socket_emits_bucket", event="text", le="1") == 1
+    size = len('[{"room":%d,"message":"Hello"}]' % rooms.json["id"])
+    assert sample(text, "slurk_socket_payload_bytes_sum", event="text") == size
+
+
+def test_disable(client, metrics):
+    metrics.disable()
+    client.get("/slurk/api/layouts")
+
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.NOT_FOUND, response.data
+    metrics.enabled = True
+    assert "/slurk/api/layouts" not in client.get("/metrics").get_data(as_text=True)
+
+
+def test_pool_config():
+    from slurk.extensions.database import Database, TimedQueuePool
+
+    config = dict(
+        DB_POOL_SIZE=3,
+        DB_MAX_OVERFLOW=2,
+        DB_POOL_TIMEOUT=5,
+        DB_POOL_RECYCLE=60,
+        DB_POOL_PRE_PING=True,
+        DB_STATEMENT_TIMEOUT=2.5,
+    )
+    database = Database()
+    database.apply_pool_config("postgresql://slurk@localhost/slurk", config)
+    assert database._poolclass is TimedQueuePool
+    assert database._pool_args == dict(
+        pool_size=3, max_overflow=2, pool_timeout=5, pool_recycle=60, pool_pre_ping=True
+    )
+    assert database._connect_args == {"options": "-c statement_timeout=2500"}
+
+    # SQLite files are not pooled, only the generic options apply
+    database = Database()
+    database.apply_pool_config("sqlite:///slurk.db", config)
+    assert database._poolclass is None
+    assert database._pool_args == dict(pool_recycle=60, pool_pre_ping=True)
+    assert database._connect_args == {}
+
+
+def test_pool_metrics(client, metrics, tmp_path, monkeypatch):
+    import sqlite3
+
+    from slurk.extensions.database import TimedQueuePool, db
+
+    pool = TimedQueuePool(
+        lambda: sqlite3.connect(tmp_path / "pool.db"), pool_size=2, max_overflow=2
+    )
+    monkeypatch.setattr(db.engine, "pool", pool)
+
+    connections = [pool.connect() for _ in range(3)]
+    text = client.get("/metrics").get_data(as_text=True)
+    for connection in connections:
+        connection.close()
+
+    assert sample(text, "slurk_database_pool_wait_seconds_count") == 3
+    assert sample(text, "slurk_database_pool_size") == 2
+    assert sample(text, "slurk_database_pool_max_overflow") == 2
+    assert sample(text, "slurk_database_pool_checked_out") == 3
+    assert sample(text, "slurk_database_pool_saturation") == 0.75
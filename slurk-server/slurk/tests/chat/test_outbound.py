@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""Test the bounded outbound queues of Socket.IO sessions."""
+
+import json
+import queue
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from engineio import packet as eio_packet
+from socketio import packet
+
+from slurk.extensions.outbound import OutboundQueues, event_name
+from slurk.views.chat.live_typing import apply_ops
+
+
+@pytest.mark.parametrize(
+    "encoded, name",
+    [
+        ('2["mouse",{"type":"move"}]', "mouse"),
+        ('2/chat,["text_message",{}]', "text_message"),
+        ('212["typed_message",{}]', "typed_message"),
+        ('51-["image",{"_placeholder":true,"num":0}]', "image"),
+        ("3[true]", None),
+        (b"\x00", None),
+    ],
+)
+def test_event_name(encoded, name):
+    assert event_name(encoded) == name
+
+
+class FakeServer:
+    def __init__(self):
+        self.sent = []
+        self.tasks = []
+        self.eio = SimpleNamespace(
+            sockets={"client": SimpleNamespace(queue=queue.Queue())}
+        )
+        self.eio.disconnect = mock.Mock(side_effect=self.eio.sockets.pop)
+
+    def _send_packet(self, eio_sid, pkt):
+        self.sent.append(pkt.data)
+
+    def _send_eio_packet(self, eio_sid, eio_pkt):
+        self.sent.append(eio_pkt.data)
+
+    def start_background_task(self, target, *args):
+        self.tasks.append((target, args))
+
+    def sleep(self, seconds):
+        pass
+
+    def run_tasks(self):
+        while self.tasks:
+            target, args = self.tasks.pop(0)
+            target(*args)
+
+    def fill(self, size):
+        socket_queue = self.eio.sockets["client"].queue
+        while not socket_queue.empty():
+            socket_queue.get()
+        for _ in range(size):
+            socket_queue.put(None)
+
+
+@pytest.fixture
+def server(app, monkeypatch):
+    monkeypatch.setitem(app.config, "OUTBOUND_DROPPABLE_BACKLOG", 2)
+    monkeypatch.setitem(app.config, "OUTBOUND_QUEUE_SIZE", 4)
+    server = FakeServer()
+    OutboundQueues().init_app(app, server)
+    return server
+
+
+def emit(server, event, user_id, value=None, **payload):
+    data = [event, {"user": {"id": user_id}, "value": value, **payload}]
+    encoded = packet.Packet(packet.EVENT, data=data).encode()
+    server._send_eio_packet("client", eio_packet.Packet(eio_packet.MESSAGE, encoded))
+
+
+def events(server):
+    return [event_name(encoded) for encoded in server.sent]
+
+
+def test_droppable(server):
+    emit(server, "mouse", 1)
+    assert events(server) == ["mouse"]
+
+    server.fill(2)
+    emit(server, "mouse", 1, "first")
+    emit(server, "start_typing", 2)
+    emit(server, "mouse", 2)
+    emit(server, "mouse", 1, "last")
+    emit(server, "stop_typing", 2)
+    # Reliable events are not held back
+    emit(server, "text_message", 1)
+    assert events(server) == ["mouse", "text_message"]
+
+    # Held back events are sent in order of their latest update
+    server.fill(1)
+    server.run_tasks()
+    assert events(server)[2:] == ["start_typing", "mouse", "mouse", "stop_typing"]
+    assert '"last"' in server.sent[-2]
+
+
+def test_reliable(server):
+    server.fill(3)
+    emit(server, "text_message", 1)
+    assert events(server) == ["text_message"]
+
+    server.fill(4)
+    emit(server, "text_message", 1)
+    emit(server, "mouse", 1)
+    server.run_tasks()
+    server.eio.disconnect.assert_called_once_with("client")
+    assert events(server) == ["text_message"]
+
+
+def test_send_packet(server):
+    server.fill(2)
+    server._send_packet("client", packet.Packet(packet.EVENT, data=["mouse", {}]))
+    server._send_packet("client", packet.Packet(packet.ACK, data=[True], id=1))
+    assert server.sent == [[True]]
+
+
+def test_typed_message(server):
+    server.fill(2)
+    emit(server, "typed_message", 1, seq=1, text="H")
+    emit(server, "typed_message", 1, seq=2, ops=[dict(op="insert", pos=1, text="i")])
+    emit(server, "typed_message", 1, seq=3, ops=[dict(op="insert", pos=2, text="!")])
+    server.run_tasks()
+
+    # Deltas are not coalesced, so the client can apply all of them
+    text = None
+    for encoded in server.sent:
+        update = json.loads(encoded[encoded.index("[") :])[1]
+        text = update["text"] if "text" in update else apply_ops(text, update["ops"])
+    assert [event_name(encoded) for encoded in server.sent] == ["typed_message"] * 3
+    assert text == "Hi!"
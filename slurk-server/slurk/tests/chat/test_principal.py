@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Test the cached principal of Socket.IO sessions."""
+
+import pytest
+
+from . import create_user
+
+
+def user_queries(statements):
+    return [s for s in statements if 'FROM "User"' in s]
+
+
+def principal_of(user_id):
+    from slurk.views.login.principal import principals
+
+    (principal,) = [p for p in principals._principals.values() if p.id == user_id]
+    return principal
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+class TestPrincipal:
+    def test_events(self, client, rooms, connect, statements):
+        socket = connect(*create_user(client, rooms, send_message=True))
+        assert socket.is_connected()
+
+        statements.clear()
+        for _ in range(3):
+            assert socket.emit("keypress", {"typing": True}, callback=True) == []
+            assert (
+                socket.emit(
+                    "text", {"room": rooms.json["id"], "message": "Hi"}, callback=True
+                )
+                is True
+            )
+        assert user_queries(statements) == []
+
+    def test_rooms(self, app, client, rooms, connect):
+        from slurk.views.login.principal import principals
+
+        token_id, user_id = create_user(client, rooms, send_message=True)
+        socket = connect(token_id, user_id)
+        assert socket.is_connected()
+        # Entries dropped from the cache are reloaded from the database
+        with app.app_context():
+            sid = principal_of(user_id).session_id
+
+            principal = principals.get(sid, user_id)
+            assert principal.name == "Bot"
+            assert principal.token_id == token_id
+            assert principal.permissions.send_message
+            assert principal.room_ids == {rooms.json["id"]}
+
+            room = client.post(
+                "/slurk/api/rooms", json={"layout_id": rooms.json["layout_id"]}
+            )
+            user = client.get(f"/slurk/api/users/{user_id}")
+            response = client.post(
+                f'/slurk/api/users/{user_id}/rooms/{room.json["id"]}',
+                headers={"If-Match": user.headers["ETag"]},
+            )
+            assert response.status_code == 201, response.json
+            assert principal.room_ids == {rooms.json["id"], room.json["id"]}
+
+            user = client.get(f"/slurk/api/users/{user_id}")
+            client.delete(
+                f'/slurk/api/users/{user_id}/rooms/{room.json["id"]}',
+                headers={"If-Match": user.headers["ETag"]},
+            )
+            assert principal.room_ids == {rooms.json["id"]}
+
+            socket.disconnect()
+            assert principals.get(sid) is None
+
+    def test_deleted(self, app, client, rooms, connect):
+        from slurk.views.login.principal import principals
+
+        token_id, user_id = create_user(client, rooms, send_message=True)
+        socket = connect(token_id, user_id)
+        principal = principal_of(user_id)
+
+        user = client.get(f"/slurk/api/users/{user_id}")
+        client.delete(
+            f"/slurk/api/users/{user_id}", headers={"If-Match": user.headers["ETag"]}
+        )
+        with app.app_context():
+            assert principals.get(principal.session_id) is None
+        assert (
+            socket.emit(
+                "text", {"room": rooms.json["id"], "message": "Hi"}, callback=True
+            )
+            is not True
+        )
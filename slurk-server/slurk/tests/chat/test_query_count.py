@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Pin the number of SQL statements emitted by the handlers of the chat.
+
+Relationships read by a handler are loaded by the profiles in `slurk.models.loading`.
+If one of these tests fails because a handler emits more statements, a relationship is
+probably lazy-loaded, which should be added to the profile of the handler instead."""
+
+import pytest
+
+from . import create_user
+
+
+def count(statements, call):
+    """Returns the number of statements emitted by `call`"""
+    statements.clear()
+    call()
+    return len(statements)
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+class TestQueryCount:
+    @pytest.fixture
+    def room(self, client, rooms):
+        return client.post(
+            "/slurk/api/rooms", json={"layout_id": rooms.json["layout_id"]}
+        )
+
+    @pytest.fixture
+    def user(self, client, room):
+        return create_user(client, room, send_message=True)
+
+    def test_connect(self, connect, user, statements):
+        # Load the user with its token and permissions, store the session, reload the
+        # user, load its room with layout, session and members, load the user into the
+        # chat cache, and log the join and the connect
+        assert count(statements, lambda: connect(*user)) == 10
+
+    def test_text(self, room, connect, user, statements):
+        socket = connect(*user)
+
+        def send():
+            payload = {"room": room.json["id"], "message": "Hello"}
+            assert socket.emit("text", payload, callback=True) is True
+
+        send()
+        # Log the message, everything else is cached
+        assert count(statements, send) == 1
+
+    def test_mouse(self, room, connect, user, statements):
+        socket = connect(*user)
+
+        def move():
+            payload = {"room": room.json["id"], "type": "click", "coordinates": {}}
+            socket.emit("mouse", payload)
+
+        move()
+        # Load the room with its layout and log the event
+        assert count(statements, move) == 2
+
+    def test_room_created(self, room, connect, user, statements):
+        socket = connect(*user)
+
+        def created():
+            payload = {"room": room.json["id"]}
+            assert socket.emit("room_created", payload, callback=True) is True
+
+        # Load the room with its members
+        assert count(statements, created) == 1
+
+    def test_room_users(self, client, room, user, statements):
+        def get():
+            response = client.get(f'/slurk/api/rooms/{room.json["id"]}/users')
+            assert response.status_code == 200, response.json
+
+        # Load the room with its members
+        assert count(statements, get) == 1
+
+    def test_join(self, client, rooms, connect, user, statements):
+        _, user_id = user
+        connect(*user)
+        etag = client.get(f"/slurk/api/users/{user_id}").headers["ETag"]
+
+        def join():
+            response = client.post(
+                f'/slurk/api/users/{user_id}/rooms/{rooms.json["id"]}',
+                headers={"If-Match": etag},
+            )
+            assert response.status_code == 201, response.json
+
+        # Load the user with its token and permissions and the room with its layout,
+        # session and members, add the membership, reload both, log the join, and
+        # reload the user for the response
+        assert count(statements, join) == 8
+
+    def test_leave(self, client, room, connect, user, statements):
+        _, user_id = user
+        connect(*user)
+        etag = client.get(f"/slurk/api/users/{user_id}").headers["ETag"]
+
+        def leave():
+            response = client.delete(
+                f'/slurk/api/users/{user_id}/rooms/{room.json["id"]}',
+                headers={"If-Match": etag},
+            )
+            assert response.status_code == 204, response.json
+
+        # Load the user and the room with its layout, session and members, remove the
+        # membership, reload both, and log the leave
+        assert count(statements, leave) == 7
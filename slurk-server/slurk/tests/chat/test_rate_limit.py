@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""Test the rate limits of Socket.IO events."""
+
+from unittest import mock
+
+import pytest
+
+from . import create_user
+
+
+def test_token_bucket(app, monkeypatch):
+    from slurk.views.chat.rate_limit import RateLimiter
+
+    monkeypatch.setitem(
+        app.config, "RATE_LIMITS", {"text": {"rate_limit": 2, "burst": 3}}
+    )
+    with app.app_context(), mock.patch("time.monotonic", return_value=100.0) as now:
+        limiter = RateLimiter()
+        assert [limiter.acquire(1, "text") for _ in range(3)] == [None] * 3
+        assert limiter.acquire(1, "text").endswith("retry in 0.50 seconds")
+
+        # Other users and events have their own buckets
+        assert limiter.acquire(2, "text") is None
+        assert limiter.acquire(1, "mouse") is None
+
+        now.return_value = 100.5
+        assert limiter.acquire(1, "text") is None
+        assert limiter.acquire(1, "text") is not None
+
+        # Full buckets are not filled further
+        now.return_value = 200.0
+        assert [limiter.acquire(1, "text") for _ in range(3)] == [None] * 3
+        assert limiter.acquire(1, "text") is not None
+
+        # Buckets which are full again are removed
+        now.return_value = 201.0
+        limiter.acquire(2, "text")
+        assert (1, "text") in limiter._buckets
+        now.return_value = 300.0
+        limiter.acquire(2, "text")
+        assert (1, "text") not in limiter._buckets
+        assert (1, "mouse") not in limiter._buckets
+
+
+@pytest.mark.depends(on=["tests/api/test_rooms.py::TestPostValid"])
+class TestRateLimit:
+    @pytest.fixture(autouse=True)
+    def rate_limits(self, app, monkeypatch):
+        from slurk.views.chat.rate_limit import rate_limiter
+
+        monkeypatch.setattr(rate_limiter, "_buckets", {})
+        monkeypatch.setitem(
+            app.config, "RATE_LIMITS", {"text": {"rate_limit": 0.01, "burst": 2}}
+        )
+
+    @staticmethod
+    def send(socket, room_id):
+        return socket.emit("text", {"room": room_id, "message": "Hi"}, callback=True)
+
+    def test_reject(self, client, rooms, connect):
+        room_id = rooms.json["id"]
+        sender = connect(*create_user(client, rooms, send_message=True))
+        other = connect(*create_user(client, rooms, send_message=True))
+        sender.get_received()
+
+        assert self.send(sender, room_id) is True
+        assert self.send(sender, room_id) is True
+        ack = self.send(sender, room_id)
+        assert ack[0] is False
+        assert ack[1].startswith('Rate limit for "text" exceeded')
+
+        # Rejected messages are not sent, other users are not limited
+        messages = [m for m in sender.get_received() if m["name"] == "text_message"]
+        assert len(messages) == 2
+        assert self.send(other, room_id) is True
+
+        # Keypresses have their own limit
+        assert sender.emit("keypress", {"typing": False}, callback=True) == []
+
+    def test_reconnect(self, client, rooms, connect):
+        room_id = rooms.json["id"]
+        user = create_user(client, rooms, send_message=True)
+        socket = connect(*user)
+        assert self.send(socket, room_id) is True
+        assert self.send(socket, room_id) is True
+        socket.disconnect()
+
+        # Reconnecting does not refill the bucket
+        socket = connect(*user)
+        assert self.send(socket, room_id)[0] is False
+
+    def test_layout(self, client, connect):
+        layout = client.post(
+            "/slurk/api/layouts",
+            json={
+                "title": "Rate limited",
+                "event_policy": {"text": {"rate_limit": 0.01, "burst": 1}},
+            },
+        )
+        room = client.post("/slurk/api/rooms", json={"layout_id": layout.json["id"]})
+        socket = connect(*create_user(client, room, send_message=True))
+
+        assert self.send(socket, room.json["id"]) is True
+        assert self.send(socket, room.json["id"])[0] is False
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Test the delivery of `new_task_room` to subscribed sessions."""
+
+import pytest
+
+from . import create_user
+
+
+def received(socket):
+    """Returns the arguments of the received events by event name"""
+    events = {}
+    for message in socket.get_received():
+        events.setdefault(message["name"], []).append(message["args"][0])
+    return events
+
+
+@pytest.mark.depends(on=["tests/api/test_tasks.py::TestPostValid"])
+class TestTaskSubscription:
+    @pytest.fixture
+    def sockets(self, connect, client, rooms):
+        sockets = dict(
+            bot=connect(*create_user(client, rooms, api=True)),
+            other_bot=connect(*create_user(client, rooms, api=True)),
+            all_tasks_bot=connect(*create_user(client, rooms, api=True)),
+            participant=connect(*create_user(client, rooms, send_message=True)),
+        )
+        for socket in sockets.values():
+            assert socket.is_connected()
+            socket.get_received()
+        return sockets
+
+    def test_subscribe(self, sockets, tasks, rooms):
+        task_id = tasks.json["id"]
+        room_id = rooms.json["id"]
+
+        assert sockets["bot"].emit("subscribe_task", {"task": task_id}, callback=True)
+        assert sockets["other_bot"].emit(
+            "subscribe_task", {"task": task_id + 1000}, callback=True
+        ) == [False, f'Task "{task_id + 1000}" does not exist']
+        # Subscribing to all tasks replaces the subscription to a single task
+        all_tasks_bot = sockets["all_tasks_bot"]
+        assert all_tasks_bot.emit("subscribe_task", {"task": task_id}, callback=True)
+        assert all_tasks_bot.emit("subscribe_task", {"task": None}, callback=True)
+        assert sockets["participant"].emit(
+            "subscribe_task", {"task": task_id}, callback=True
+        ) == [False, "insufficient rights"]
+
+        assert sockets["bot"].emit(
+            "room_created", {"room": room_id, "task": task_id}, callback=True
+        )
+
+        events = {name: received(socket) for name, socket in sockets.items()}
+        # `new_room` is sent to every session
+        for name in sockets:
+            assert events[name].pop("new_room") == [{"room": room_id}]
+
+        expected = {"room": room_id, "task": task_id}
+        for name in ("bot", "all_tasks_bot"):
+            assert len(events[name]["new_task_room"]) == 1
+            assert expected.items() <= events[name]["new_task_room"][0].items()
+
+        assert events["other_bot"] == {}
+        assert events["participant"] == {}
+
+    def test_unsubscribe(self, sockets, tasks, rooms):
+        task_id = tasks.json["id"]
+        bot = sockets["bot"]
+
+        assert bot.emit("subscribe_task", {"task": task_id}, callback=True)
+        assert bot.emit("unsubscribe_task", {"task": task_id}, callback=True)
+        assert bot.emit(
+            "room_created", {"room": rooms.json["id"], "task": task_id}, callback=True
+        )
+        assert "new_task_room" not in received(bot)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Test the typing state of users."""
+
+from unittest import mock
+
+import pytest
+
+
+@pytest.mark.depends(on=["tests/api/test_users.py::TestPostValid"])
+class TestTypingTracker:
+    @pytest.fixture
+    def tracker(self, app, users, rooms):
+        from slurk.models import User
+        from slurk.views.chat.typing import TypingTracker
+
+        with app.app_context():
+            user = app.session.query(User).get(users.json["id"])
+            with mock.patch("slurk.views.chat.typing.socketio") as socketio_mock:
+                yield TypingTracker(), user, str(rooms.json["id"]), socketio_mock
+
+    def test_transitions(self, tracker):
+        tracker, user, room, socketio_mock = tracker
+        sender = {"user": {"id": user.id, "name": user.name}}
+
+        tracker.update(user, True)
+        tracker.update(user, True)
+        socketio_mock.emit.assert_called_once_with("start_typing", sender, room=room)
+
+        socketio_mock.emit.reset_mock()
+        tracker.update(user, False)
+        tracker.update(user, False)
+        socketio_mock.emit.assert_called_once_with("stop_typing", sender, room=room)
+
+    def test_expire(self, tracker, app, monkeypatch):
+        tracker, user, room, socketio_mock = tracker
+        monkeypatch.setitem(app.config, "TYPING_TIMEOUT", 5)
+
+        with mock.patch("slurk.views.chat.typing.time.monotonic", return_value=100):
+            tracker.update(user, True)
+        socketio_mock.emit.reset_mock()
+
+        with mock.patch("slurk.views.chat.typing.time.monotonic", return_value=104):
+            tracker.expire()
+        socketio_mock.emit.assert_not_called()
+
+        with mock.patch("slurk.views.chat.typing.time.monotonic", return_value=105):
+            tracker.expire()
+        socketio_mock.emit.assert_called_once_with(
+            "stop_typing", {"user": {"id": user.id, "name": user.name}}, room=room
+        )
+        assert not tracker.is_typing(user.id, int(room))
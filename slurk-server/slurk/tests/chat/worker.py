@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Runs a single slurk worker like the gunicorn gevent worker does.
+
+    $ python -m tests.chat.worker <port>
+
+The configuration is read from the `SLURK_*` environment variables.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+import sys  # noqa: E402
+
+from gevent import pywsgi  # noqa: E402
+from geventwebsocket.handler import WebSocketHandler  # noqa: E402
+
+from slurk import create_app  # noqa: E402
+
+
+if __name__ == "__main__":
+    server = pywsgi.WSGIServer(
+        ("127.0.0.1", int(sys.argv[1])),
+        create_app(),
+        handler_class=WebSocketHandler,
+        log=None,
+    )
+    server.serve_forever()